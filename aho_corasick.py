@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск множества идентификаторов за один проход по тексту (автомат Ахо-Корасик)
+
+Имена приводятся к нижнему регистру, совпадение засчитывается только на границах
+идентификатора (как \\b в регулярных выражениях). Используется в find_object_usage.py
+и подходит любому скрипту, которому нужно искать тысячи имен сразу.
+
+Если все имена - цельные идентификаторы (имена объектов метаданных), текст просто разбивается
+на слова и слова подсчитываются по словарю; автомат строится только при первом поиске имен
+с другими символами (точки, пробелы).
+"""
+
+import re
+from collections import Counter, deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Regex для разбиения текста на идентификаторы
+WORD_REGEX = re.compile(r'\w+')
+
+
+def is_identifier_char(ch: str) -> bool:
+    """Проверяет, может ли символ входить в идентификатор (как \\w)."""
+    return ch.isalnum() or ch == '_'
+
+
+class IdentifierMatcher:
+    """Автомат Ахо-Корасик по набору имен с проверкой границ идентификатора"""
+
+    def __init__(self, names: Iterable[str]):
+        """
+        Строит автомат
+
+        Args:
+            names: Искомые имена (регистр не важен, дубликаты допускаются)
+        """
+        self.names = list(names)
+        # Индекс имени -> индекс уникального шаблона (одинаковые без учета регистра имена совпадают)
+        self._pattern_ids: List[int] = []
+        self.patterns: List[str] = []
+        pattern_index: Dict[str, int] = {}
+        for name in self.names:
+            key = name.lower()
+            if key not in pattern_index:
+                pattern_index[key] = len(self.patterns)
+                self.patterns.append(key)
+            self._pattern_ids.append(pattern_index[key])
+        self._pattern_index = pattern_index
+
+        # Если все имена - цельные идентификаторы, достаточно разбить текст на слова
+        self.words_only = all(WORD_REGEX.fullmatch(p) for p in self.patterns)
+
+        # Автомат строится при первом вызове iter_matches (см. _build)
+        self._goto: Optional[List[Dict[str, int]]] = None
+        self._fail: List[int] = []
+        self._out: List[List[int]] = []
+
+    def _build(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            if pattern:
+                self._add(pattern, pattern_id)
+        self._build_fail_links()
+
+    def _add(self, pattern: str, pattern_id: int):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(pattern_id)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def iter_matches(self, text: str, folded: bool = False) -> Iterator[Tuple[int, int, int]]:
+        """
+        Находит все вхождения имен за один проход
+
+        Args:
+            text: Текст для поиска
+            folded: True, если текст уже приведен к нижнему регистру
+
+        Returns:
+            Итератор кортежей (начало, конец, индекс_шаблона в self.patterns)
+        """
+        if not folded:
+            text = text.lower()
+        if self._goto is None:
+            self._build()
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        patterns = self.patterns
+        text_len = len(text)
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = i + 1
+            for pattern_id in out[state]:
+                pattern = patterns[pattern_id]
+                start = end - len(pattern)
+                # Проверяем границы идентификатора только там, где шаблон начинается/заканчивается словом
+                if start > 0 and is_identifier_char(pattern[0]) and is_identifier_char(text[start - 1]):
+                    continue
+                if end < text_len and is_identifier_char(pattern[-1]) and is_identifier_char(text[end]):
+                    continue
+                yield start, end, pattern_id
+
+    def count_patterns(self, text: str, folded: bool = False) -> Counter:
+        """Количество вхождений шаблонов в тексте: индекс шаблона -> количество (только найденные)."""
+        counts: Counter = Counter()
+        if not folded:
+            text = text.lower()
+        if self.words_only:
+            for word, count in Counter(WORD_REGEX.findall(text)).items():
+                pattern_id = self._pattern_index.get(word)
+                if pattern_id is not None:
+                    counts[pattern_id] += count
+        else:
+            for _, _, pattern_id in self.iter_matches(text, folded=True):
+                counts[pattern_id] += 1
+        return counts
+
+    def count_all(self, texts: Iterable[str], folded: bool = False) -> Dict[str, int]:
+        """
+        Подсчитывает вхождения всех имен по набору текстов (каждый текст - один проход)
+
+        Returns:
+            Словарь имя -> количество вхождений (по исходным именам)
+        """
+        totals: Counter = Counter()
+        for text in texts:
+            totals.update(self.count_patterns(text, folded))
+        return {name: totals[pattern_id] for name, pattern_id in zip(self.names, self._pattern_ids)}
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замеры времени работы скриптов на синтетических выгрузках разного размера
+
+Для каждого масштаба генерируется выгрузка (generate_test_config.py). Каждый скрипт
+запускается на свежей копии выгрузки (скрипты копируются в ее каталог Refactoring1C,
+как при обычной работе), время измеряется по часам. Результаты пишутся в JSON,
+чтобы сравнивать запуски между версиями и замечать регрессии.
+
+Запуск:
+    python benchmark.py [--scales 50,200,1000] [--repeat N] [--only имя1,имя2] [--output файл.json] [--keep каталог]
+"""
+
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from generate_test_config import generate_configuration
+
+SCRIPTS_DIR = Path(__file__).parent
+RESULTS_FILE_NAME = "benchmark_results.json"
+DEFAULT_SCALES = [50, 200, 1000]
+
+# Замеры: имя -> аргументы командной строки (скрипт запускается из корня выгрузки)
+BENCHMARKS: Dict[str, List[str]] = {
+    "delete_metods": ["Refactoring1C/delete_metods.py"],
+    "delete_empty_metods": ["Refactoring1C/delete_empty_metods.py"],
+    "cleanup_return_1c": ["Refactoring1C/cleanup_return_1c.py", "."],
+    "find_and_remove_comments": ["Refactoring1C/find_and_remove_comments.py"],
+    "find_and_remove_empty": ["Refactoring1C/find_and_remove_empty.py"],
+    "cleanup_pipeline": ["Refactoring1C/cleanup_pipeline.py", "."],
+    "find_object_usage": ["Refactoring1C/find_object_usage.py"],
+}
+
+# Файлы, которые копируются в Refactoring1C выгрузки (все скрипты и v8unpack, если он есть)
+SCRIPT_PATTERNS = ["*.py", "v8unpack_local.exe"]
+
+
+def copy_scripts(target_dir: Path):
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for pattern in SCRIPT_PATTERNS:
+        for path in SCRIPTS_DIR.glob(pattern):
+            shutil.copy2(path, target_dir / path.name)
+
+
+def run_benchmark(work_root: Path, args: List[str]) -> Dict:
+    """Запускает скрипт в каталоге выгрузки и возвращает время и код возврата."""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "utf8"] + args, cwd=str(work_root),
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    seconds = time.perf_counter() - start
+    result = {"seconds": round(seconds, 4), "returncode": completed.returncode}
+    if completed.returncode != 0:
+        result["stderr"] = completed.stderr.decode('utf-8', errors='replace')[-2000:]
+    return result
+
+
+def run_scale(objects: int, names: List[str], repeat: int, base_dir: Path, seed: int = 0) -> Dict:
+    """Генерирует выгрузку заданного размера и замеряет все скрипты."""
+    pristine = base_dir / f"config_{objects}"
+    if pristine.exists():
+        shutil.rmtree(pristine)
+    print(f"Генерация выгрузки: {objects} объектов...")
+    start = time.perf_counter()
+    stats = generate_configuration(str(pristine), objects, seed)
+    stats["generate_seconds"] = round(time.perf_counter() - start, 4)
+
+    timings = {}
+    for name in names:
+        runs = []
+        for _ in range(repeat):
+            work_root = base_dir / f"work_{objects}_{name}"
+            if work_root.exists():
+                shutil.rmtree(work_root)
+            shutil.copytree(pristine, work_root)
+            copy_scripts(work_root / "Refactoring1C")
+            runs.append(run_benchmark(work_root, BENCHMARKS[name]))
+            shutil.rmtree(work_root)
+        best = min(run["seconds"] for run in runs)
+        timings[name] = {"seconds": best, "runs": runs}
+        failed = [run for run in runs if run["returncode"] != 0]
+        status = f"ОШИБКА (код {failed[0]['returncode']})" if failed else ""
+        print(f"  {name}: {best:.3f} с {status}")
+    return {"objects": objects, "config": stats, "benchmarks": timings}
+
+
+def parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main():
+    """Основная функция"""
+    args = sys.argv[1:]
+    scales = list(DEFAULT_SCALES)
+    names = list(BENCHMARKS)
+    repeat = 1
+    output = SCRIPTS_DIR / RESULTS_FILE_NAME
+    keep_dir: Optional[Path] = None
+    i = 0
+    while i < len(args):
+        option = args[i]
+        value = args[i + 1] if i + 1 < len(args) else ""
+        if option == "--scales":
+            scales = [int(item) for item in parse_list(value)]
+        elif option == "--only":
+            names = [name for name in parse_list(value) if name in BENCHMARKS]
+        elif option == "--repeat":
+            repeat = max(1, int(value))
+        elif option == "--output":
+            output = Path(value)
+        elif option == "--keep":
+            keep_dir = Path(value)
+        else:
+            print(f"Неизвестный параметр: {option}")
+            return
+        i += 2
+
+    base_dir = keep_dir if keep_dir else Path(tempfile.mkdtemp(prefix="bench1c_"))
+    base_dir.mkdir(parents=True, exist_ok=True)
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "scales": [],
+    }
+    try:
+        for objects in scales:
+            results["scales"].append(run_scale(objects, names, repeat, base_dir))
+    finally:
+        if keep_dir is None:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в файл: {output}")
+
+
+if __name__ == "__main__":
+    main()
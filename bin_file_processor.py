@@ -1,10 +1,25 @@
 import re
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
 import subprocess
 import shutil
 import tempfile
 import os
+import io
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import redirect_stdout
+from v8container import V8ModuleFile
+from profiling import count, phase
+from dry_run import BIN_MODULE_SUFFIX, is_dry_run, record_change
+
+# Способ работы с .bin:
+#   "v8unpack" - распаковка/упаковка через v8unpack_local.exe
+#   "native"   - встроенный разбор контейнера в памяти (v8container.py), без временных каталогов;
+#                пока не проверен на Form.bin, выгруженных платформой (tests/fixtures/form_bin)
+BIN_BACKEND = "v8unpack"
 
 # -----------------------------
 # Universal helpers for 1C .bin
@@ -44,6 +59,7 @@ def unpack_bin_to_temp(file_path: str) -> Tuple[Optional[Path], Optional[str]]:
             return None, err
         temp_dir = Path(tempfile.mkdtemp(prefix="v8unpack_temp_"))
         unpack_command = [exe_path, "-unpack", str(original_file_path), str(temp_dir)]
+        count("v8unpack_calls")
         result = subprocess.run(
             unpack_command,
             capture_output=True,
@@ -99,6 +115,24 @@ def write_module_text(unpacked_dir: Path, content: str, encoding: str = 'utf-8')
         return f"Ошибка записи {module_path}: {e}"
 
 
+def read_bin_module(file_path: str) -> Tuple[Optional[V8ModuleFile], Optional[str]]:
+    """Parse a .bin in memory and locate its module element (native backend)."""
+    try:
+        return V8ModuleFile(Path(file_path).read_bytes()), None
+    except Exception as e:
+        return None, f"Ошибка при разборе файла {file_path}: {e}"
+
+
+def read_bin_module_text(file_path: str, encoding: str = 'utf-8') -> Tuple[Optional[str], Optional[str]]:
+    """Return module text of a .bin without unpacking it to disk."""
+    if not Path(file_path).exists():
+        return None, f"Файл не найден: {file_path}"
+    module_file, err = read_bin_module(file_path)
+    if err:
+        return None, err
+    return module_file.read_text(encoding), None
+
+
 def pack_temp_to_bin(unpacked_dir: Path, out_bin_path: Path) -> Optional[str]:
     """Pack unpacked directory back to .bin using v8unpack_local.exe."""
     try:
@@ -106,6 +140,7 @@ def pack_temp_to_bin(unpacked_dir: Path, out_bin_path: Path) -> Optional[str]:
         if err:
             return err
         pack_command = [exe_path, "-pack", str(unpacked_dir), str(out_bin_path)]
+        count("v8unpack_calls")
         result = subprocess.run(
             pack_command,
             capture_output=True,
@@ -125,57 +160,302 @@ def pack_temp_to_bin(unpacked_dir: Path, out_bin_path: Path) -> Optional[str]:
 # High-level processor (kept stable)
 # ---------------------------------
 
-def process_bin_file(file_path: str, modification_func) -> Tuple[bool, Optional[str]]:
+class BinModuleSession:
     """
-    Unpacks a .bin file, reads module text, applies modification_func(content)->(new_content, was_modified),
-    repacks into a new .bin, replaces the original on success, and cleans up temporaries.
+    Opens a .bin once (natively or via v8unpack, see BIN_BACKEND), applies any number of
+    modification_func(content)->(new_content, was_modified) to its module text in memory and
+    repacks once on commit(). Use as a context manager so temporaries are always removed:
+
+        with BinModuleSession(path) as session:
+            session.apply(func1)
+            session.apply(func2)
+            was_modified, err = session.commit()
     """
-    original_file_path = Path(file_path)
-    if not original_file_path.exists():
-        return False, f"Файл не найден: {file_path}"
 
-    temp_dir: Optional[Path] = None
-    temp_new_bin_path: Optional[Path] = None
-    try:
-        # Unpack
-        temp_dir, err = unpack_bin_to_temp(file_path)
-        if err:
-            return False, err
+    def __init__(self, file_path: str):
+        self.file_path = Path(file_path)
+        self.temp_dir: Optional[Path] = None
+        self.module_file: Optional[V8ModuleFile] = None
+        self.module_text: Optional[str] = None
+        self.original_text: Optional[str] = None
+        self.modified = False
+        self.error: Optional[str] = None
 
-        # Read module text
-        module_text, err = read_module_text(temp_dir)
+    def open(self) -> Optional[str]:
+        """Unpack the .bin and read module text. Returns error message or None."""
+        if not self.file_path.exists():
+            self.error = f"Файл не найден: {self.file_path}"
+            return self.error
+        with phase("unpack", str(self.file_path)):
+            if BIN_BACKEND == "native":
+                self.module_file, err = read_bin_module(str(self.file_path))
+                if not err:
+                    self.module_text = self.module_file.read_text()
+            else:
+                self.temp_dir, err = unpack_bin_to_temp(str(self.file_path))
+                if not err:
+                    self.module_text, err = read_module_text(self.temp_dir)
         if err:
-            return False, err
+            self.error = err
+        self.original_text = self.module_text
+        return err
 
-        # Modify
-        modified_text, was_modified = modification_func(module_text)
-        if not was_modified:
+    def apply(self, modification_func) -> Tuple[bool, Optional[str]]:
+        """Apply one modification to the in-memory module text."""
+        if self.error:
+            return False, self.error
+        try:
+            with phase("transform", str(self.file_path)):
+                modified_text, was_modified = modification_func(self.module_text)
+        except Exception as e:
+            return False, f"Ошибка при обработке файла {self.file_path}: {e}"
+        if was_modified:
+            self.module_text = modified_text
+            self.modified = True
+        return was_modified, None
+
+    def commit(self) -> Tuple[bool, Optional[str]]:
+        """Write module text back and repack into the original .bin if anything changed.
+        In --dry-run mode only the module text diff is recorded, nothing is packed."""
+        if self.error:
+            return False, self.error
+        if not self.modified:
             return False, None
+        if not self.record():
+            return True, None
+        return self.pack()
 
-        # Write module text
-        err = write_module_text(temp_dir, modified_text)
-        if err:
-            return False, err
+    def record(self) -> bool:
+        """Record the module text diff (see dry_run). Returns False in --dry-run mode,
+        where the .bin must not be packed."""
+        record_change(str(self.file_path) + BIN_MODULE_SUFFIX, self.original_text, self.module_text)
+        if is_dry_run():
+            self.modified = False
+            return False
+        return True
+
+    def pack(self) -> Tuple[bool, Optional[str]]:
+        """Repack the modified module text and replace the original .bin."""
+        temp_new_bin_path = self.file_path.parent / (self.file_path.stem + ".new.bin")
+        try:
+            with phase("pack", str(self.file_path)):
+                if self.module_file is not None:
+                    temp_new_bin_path.write_bytes(self.module_file.to_bytes(self.module_text))
+                else:
+                    err = write_module_text(self.temp_dir, self.module_text)
+                    if err:
+                        return False, err
 
-        # Pack
-        temp_new_bin_path = original_file_path.parent / (original_file_path.stem + ".new.bin")
-        err = pack_temp_to_bin(temp_dir, temp_new_bin_path)
+                    err = pack_temp_to_bin(self.temp_dir, temp_new_bin_path)
+                    if err:
+                        return False, err
+
+            with phase("write", str(self.file_path)):
+                shutil.copy(str(temp_new_bin_path), str(self.file_path))
+            self.modified = False
+            return True, None
+        except Exception as e:
+            return False, f"Ошибка при обработке файла {self.file_path}: {e}"
+        finally:
+            if temp_new_bin_path.exists():
+                try:
+                    os.remove(temp_new_bin_path)
+                except Exception:
+                    pass
+
+    def close(self):
+        """Remove temporaries."""
+        if self.temp_dir and self.temp_dir.exists():
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+        self.temp_dir = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def process_bin_file_batch(file_path: str, modification_funcs) -> Tuple[List[bool], Optional[str]]:
+    """
+    Applies several modification functions to one .bin with a single unpack/repack.
+    Returns per-function was_modified flags and an error message (if any).
+    """
+    with BinModuleSession(file_path) as session:
+        if session.error:
+            return [False] * len(modification_funcs), session.error
+        results = []
+        for modification_func in modification_funcs:
+            was_modified, err = session.apply(modification_func)
+            if err:
+                return [False] * len(modification_funcs), err
+            results.append(was_modified)
+        committed, err = session.commit()
         if err:
+            return [False] * len(modification_funcs), err
+        return results, None
+
+
+def process_bin_file(file_path: str, modification_func) -> Tuple[bool, Optional[str]]:
+    """
+    Unpacks a .bin file, reads module text, applies modification_func(content)->(new_content, was_modified),
+    repacks into a new .bin, replaces the original on success, and cleans up temporaries.
+    """
+    results, err = process_bin_file_batch(file_path, [modification_func])
+    if err:
+        return False, err
+    return results[0], None
+
+
+# ---------------------------------
+# Concurrent processing of many .bin
+# ---------------------------------
+
+# Default number of .bin files unpacked/packed at the same time by BinJobPool
+DEFAULT_BIN_WORKERS = 4
+
+BIN_JOB_CANCELLED = "Обработка отменена"
+
+
+class BinJobPool:
+    """
+    Runs unpack -> transform -> pack for many .bin files concurrently: at most max_workers
+    files are unpacked or packed at a time in worker threads (the work is mostly waiting for
+    v8unpack processes and disk I/O). Transforms run in the calling thread in input order and
+    their output is replayed in that order, so output and --dry-run diffs are the same as with
+    sequential process_bin_file() calls:
+
+        with BinJobPool(4) as pool:
+            for path, (was_modified, err) in pool.process(paths, modification_func):
+                ...
+
+    Temporary directories are removed for every file, also when the iteration is abandoned or
+    interrupted (Ctrl+C): pending jobs are cancelled and running ones finish and clean up.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_BIN_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bin")
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._sessions: Set[BinModuleSession] = set()
+
+    def _open(self, file_path: str) -> BinModuleSession:
+        session = BinModuleSession(file_path)
+        with self._lock:
+            self._sessions.add(session)
+        if self._cancelled.is_set():
+            session.error = BIN_JOB_CANCELLED
+        else:
+            session.open()
+        return session
+
+    def _release(self, session: BinModuleSession):
+        session.close()
+        with self._lock:
+            self._sessions.discard(session)
+
+    def _pack(self, session: BinModuleSession, was_modified) -> Tuple[bool, Optional[str]]:
+        try:
+            if self._cancelled.is_set():
+                return False, BIN_JOB_CANCELLED
+            packed, err = session.pack()
+            return (was_modified, None) if packed else (False, err)
+        finally:
+            self._release(session)
+
+    def _transform(self, session: BinModuleSession, modification_func):
+        """Applies the transform; returns the result or a Future of the pack job."""
+        if session.error:
+            self._release(session)
+            return False, session.error
+        was_modified, err = session.apply(modification_func)
+        if err or not session.modified:
+            self._release(session)
             return False, err
+        if not session.record():
+            self._release(session)
+            return was_modified, None
+        return self._executor.submit(self._pack, session, was_modified)
 
-        # Replace original
-        shutil.copy(str(temp_new_bin_path), str(original_file_path))
-        #print(f"+ {original_file_path}     Успешно обработан и обновлен.")
-        return True, None
+    @staticmethod
+    def _result(job) -> Tuple[bool, Optional[str]]:
+        if not isinstance(job, Future):
+            return job
+        try:
+            return job.result()
+        except Exception as e:
+            return False, f"Ошибка при обработке файла: {e}"
 
-    except Exception as e:
-        return False, f"Ошибка при обработке файла {original_file_path}: {e}"
-    finally:
-        # Cleanup
-        if temp_dir and temp_dir.exists():
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        if temp_new_bin_path and temp_new_bin_path.exists():
-            try:
-                os.remove(temp_new_bin_path)
-            except Exception:
-                pass
+    def process(self, file_paths: Iterable[str], modification_func) -> Iterator[Tuple[str, Tuple[bool, Optional[str]]]]:
+        """
+        Processes .bin files with modification_func(content)->(new_content, was_modified).
+        Unpacking starts immediately; results are yielded in the order of file_paths as
+        (path, (was_modified, error_message)), like process_bin_file() returns (was_modified is
+        the value modification_func returned when the file was changed).
+        """
+        file_paths = list(file_paths)
+        # Files unpacked ahead of the transform (bounds the number of temporary directories)
+        window = 2 * self.max_workers
+        opened = deque(self._executor.submit(self._open, path) for path in file_paths[:window])
+        return self._results(file_paths, modification_func, opened, window)
+
+    def _results(self, file_paths: List[str], modification_func, opened: deque, next_idx: int):
+        pending = deque()
+        finished = False
+        try:
+            for path in file_paths:
+                try:
+                    session = opened.popleft().result()
+                except Exception as e:
+                    session = BinModuleSession(path)
+                    session.error = f"Ошибка при обработке файла {path}: {e}"
+                if next_idx < len(file_paths):
+                    opened.append(self._executor.submit(self._open, file_paths[next_idx]))
+                    next_idx += 1
+                output = io.StringIO()
+                with redirect_stdout(output):
+                    job = self._transform(session, modification_func)
+                pending.append((path, output.getvalue(), job))
+                while pending and (len(pending) > self.max_workers or
+                                   not isinstance(pending[0][2], Future) or pending[0][2].done()):
+                    path, text, job = pending.popleft()
+                    sys.stdout.write(text)
+                    yield path, self._result(job)
+            while pending:
+                path, text, job = pending.popleft()
+                sys.stdout.write(text)
+                yield path, self._result(job)
+            finished = True
+        finally:
+            if not finished:
+                self.cancel()
+
+    def cancel(self):
+        """Cancels pending jobs, waits for running ones and removes all temporaries."""
+        self._cancelled.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._cleanup()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._cleanup()
+
+    def _cleanup(self):
+        with self._lock:
+            sessions = list(self._sessions)
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.cancel()
+        else:
+            self.close()
+        return False
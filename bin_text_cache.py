@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кэш текста модулей Form.bin для скриптов, которые только читают выгрузку
+
+Текст модуля (module.data) каждого Form.bin сохраняется в каталоге bin_text_cache рядом со скриптами
+в файле с именем SHA-256 содержимого контейнера. Повторное чтение того же Form.bin - хеш и чтение
+готового текста, без разбора контейнера (и без вызова v8unpack при BIN_BACKEND = "v8unpack").
+Изменившийся Form.bin получает другой хеш, поэтому устаревшие записи просто не используются;
+prune() удаляет записи, к которым не обращались в текущем запуске.
+
+Скрипты, изменяющие Form.bin, кэш не используют - они работают через BinModuleSession.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional, Set, Tuple
+
+import bin_file_processor
+from bin_file_processor import read_module_text, unpack_bin_to_temp
+from profiling import count
+from v8container import V8ModuleFile
+
+CACHE_DIR_NAME = "bin_text_cache"
+
+
+def default_cache_dir() -> Path:
+    """Кэш хранится рядом со скриптами."""
+    return Path(__file__).parent / CACHE_DIR_NAME
+
+
+def extract_module_text(file_path: str, data: bytes) -> Tuple[Optional[str], Optional[str]]:
+    """Текст модуля Form.bin выбранным способом работы с .bin (см. BIN_BACKEND)."""
+    if bin_file_processor.BIN_BACKEND == "v8unpack":
+        temp_dir, err = unpack_bin_to_temp(file_path)
+        if err:
+            return None, err
+        try:
+            return read_module_text(temp_dir)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    try:
+        return V8ModuleFile(data).read_text(), None
+    except Exception as e:
+        return None, f"Ошибка при разборе файла {file_path}: {e}"
+
+
+class BinTextCache:
+    """Текст модулей Form.bin по SHA-256 контейнера"""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        # Хеши, к которым обращались в этом запуске (для prune)
+        self.used: Set[str] = set()
+
+    def _entry_path(self, sha256: str) -> Path:
+        return self.cache_dir / sha256[:2] / f"{sha256}.txt"
+
+    def read_module_text(self, file_path: str, data: Optional[bytes] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Текст модуля Form.bin: из кэша или извлеченный из контейнера (и сохраненный в кэш)
+
+        Args:
+            file_path: Путь к Form.bin
+            data: Содержимое файла, если уже прочитано
+
+        Returns:
+            Кортеж (текст, ошибка)
+        """
+        if data is None:
+            try:
+                data = Path(file_path).read_bytes()
+            except OSError as e:
+                return None, f"Ошибка при чтении файла {file_path}: {e}"
+        sha256 = hashlib.sha256(data).hexdigest()
+        self.used.add(sha256)
+        entry_path = self._entry_path(sha256)
+        try:
+            with open(entry_path, 'r', encoding='utf-8', newline='') as f:
+                text = f.read()
+            count("bin_cache_hits")
+            return text, None
+        except OSError:
+            pass
+
+        count("bin_cache_misses")
+        text, err = extract_module_text(file_path, data)
+        if err:
+            return None, err
+        self._store(entry_path, text)
+        return text, None
+
+    def _store(self, entry_path: Path, text: str):
+        # Запись через временный файл: параллельные процессы не увидят недописанный текст
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=entry_path.parent, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+            os.replace(temp_path, entry_path)
+        except OSError as e:
+            print(f"Не удалось сохранить кэш {entry_path}: {e}")
+
+    def prune(self) -> int:
+        """
+        Удаляет записи, к которым не обращались в этом запуске (после полного обхода выгрузки)
+
+        Returns:
+            Количество удаленных записей
+        """
+        removed = 0
+        if not self.cache_dir.is_dir():
+            return removed
+        for entry_dir in self.cache_dir.iterdir():
+            if not entry_dir.is_dir():
+                continue
+            for entry_path in entry_dir.iterdir():
+                if entry_path.stem not in self.used:
+                    try:
+                        entry_path.unlink()
+                        removed += 1
+                    except OSError:
+                        pass
+        return removed
+
+
+BIN_TEXT_CACHE = BinTextCache()
+
+
+def read_form_module_text(file_path: str, data: Optional[bytes] = None) -> Tuple[Optional[str], Optional[str]]:
+    """Текст модуля Form.bin через общий кэш (см. BinTextCache.read_module_text)."""
+    return BIN_TEXT_CACHE.read_module_text(file_path, data)
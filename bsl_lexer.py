@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Общий построчный лексер модулей 1С (.bsl, .os, модули Form.bin)
+
+Модуль один раз разбирается в компактный поток классов строк: пустые строки, комментарии,
+инструкции препроцессора, аннотации (&НаСервере), продолжения строковых литералов (|...),
+заголовки методов (имя, параметры, Экспорт), концы методов и ключевые слова блоков
+(Если/Попытка/Для/Пока/#Если и их окончания). Скрипты очистки работают с этим потоком,
+а не классифицируют строки каждый своими регулярными выражениями.
+"""
+
+import re
+from typing import List, Optional
+
+from profiling import phase
+
+# Классы строк
+LINE_BLANK = 0
+LINE_COMMENT = 1
+LINE_PREPROCESSOR = 2
+LINE_ANNOTATION = 3
+LINE_CONTINUATION = 4
+LINE_METHOD_START = 5
+LINE_METHOD_END = 6
+LINE_CODE = 7
+
+START_METHOD_TOKENS = ["Процедура", "Функция"]
+END_METHOD_TOKENS = ["КонецПроцедуры", "КонецФункции"]
+
+# Ключевые слова, открывающие и закрывающие вложенность (с учетом препроцессора #Если/#КонецЕсли)
+BLOCK_OPEN_TOKENS = [
+    "Если",
+    "Попытка",
+    #"Цикл",
+    "Для",
+    "Пока",
+    "#Если",
+]
+BLOCK_CLOSE_TOKENS = [
+    "КонецЕсли",
+    "КонецПопытки",
+    "КонецЦикла",
+    "#КонецЕсли",
+]
+
+
+def _alternation(tokens: List[str]) -> str:
+    return "|".join(map(re.escape, tokens))
+
+
+# Строковый литерал 1С: "..." с удвоенными кавычками внутри; незакрытый тянется до конца строки
+_STRING_LITERAL_RE = re.compile(r'"(?:""|[^"])*"?')
+# Строковый литерал или начало // комментария
+_STRING_OR_COMMENT_RE = re.compile(r'"(?:""|[^"])*"?|(?P<comment>//)')
+# Литерал, продолжение литерала (|... до закрывающей кавычки) или начало // комментария
+_LITERAL_OR_COMMENT_RE = re.compile(r'^[ \t]*(?P<cont>\|(?:""|[^"])*"?)|"(?:""|[^"])*"?|(?P<comment>//)')
+
+# Ключевое слово в начале строки (по тексту без литералов и комментариев)
+_LEADING_KEYWORD_RE = re.compile(
+    r"^\s*(?:(?P<end>" + _alternation(END_METHOD_TOKENS) + r")"
+    r"|(?P<start>" + _alternation(START_METHOD_TOKENS) + r")"
+    r"|(?P<close>" + _alternation(BLOCK_CLOSE_TOKENS) + r")"
+    r"|(?P<open>" + _alternation(BLOCK_OPEN_TOKENS) + r"))\b",
+    re.IGNORECASE,
+)
+# Объявление метода, в том числе с аннотацией в той же строке
+_DECLARATION_RE = re.compile(
+    r"^\s*(?:&\w+\s*)?(?P<kind>" + _alternation(START_METHOD_TOKENS) + r")\s+(?P<name>\w+)\s*(?P<params>\(.*)?",
+    re.IGNORECASE,
+)
+_EXPORT_RE = re.compile(r"\)\s*Экспорт\b", re.IGNORECASE)
+
+
+def _blank(match: re.Match) -> str:
+    return ' ' * (match.end() - match.start())
+
+
+def remove_string_literals(code: str) -> str:
+    '''Удаляет строковые литералы 1С (двойные кавычки, с экранированием "") для упрощения поиска токенов.
+    Содержимое строк заменяется пробелами той же длины, чтобы не ломать позиции.'''
+    if '"' not in code:
+        return code
+    return _STRING_LITERAL_RE.sub(_blank, code)
+
+
+def strip_inline_comment(code: str) -> str:
+    """Удаляет // комментарий вне строк."""
+    if '//' not in code:
+        return code
+    for match in _STRING_OR_COMMENT_RE.finditer(code):
+        if match.group('comment'):
+            return code[:match.start()]
+    return code
+
+
+def strip_comment(code: str) -> str:
+    """Удаляет // комментарий вне строк, литералы сохраняются (строка-продолжение |... - внутри литерала)."""
+    if '//' not in code:
+        return code
+    for match in _LITERAL_OR_COMMENT_RE.finditer(code):
+        if match.group('comment'):
+            return code[:match.start()]
+    return code
+
+
+def strip_literals_and_comment(code: str) -> str:
+    '''Гасит строковые литералы пробелами и отрезает // комментарий за один вызов.
+    Строка-продолжение (начинается с |) считается находящейся внутри литерала до закрывающей кавычки.
+    Позиции оставшихся символов не меняются.'''
+    if '"' not in code and '//' not in code and '|' not in code:
+        return code
+    parts = []
+    pos = 0
+    for match in _LITERAL_OR_COMMENT_RE.finditer(code):
+        if match.group('comment'):
+            parts.append(code[pos:match.start()])
+            return ''.join(parts)
+        start = match.start('cont') if match.group('cont') is not None else match.start()
+        parts.append(code[pos:start])
+        parts.append(' ' * (match.end() - start))
+        pos = match.end()
+    parts.append(code[pos:])
+    return ''.join(parts)
+
+
+class MethodHeader:
+    """Заголовок метода: имя, текст параметров, признак Экспорт, последняя строка заголовка и вид (функция)"""
+
+    __slots__ = ('name', 'params', 'export', 'end_line', 'function')
+
+    def __init__(self, name: str, params: str, export: bool, end_line: int, function: bool = False):
+        self.name = name
+        self.params = params
+        self.export = export
+        self.end_line = end_line
+        self.function = function
+
+
+class LineToken:
+    """Класс строки и данные, нужные скриптам очистки"""
+
+    __slots__ = ('kind', 'code', 'declares_method', 'block_open', 'block_close', 'method')
+
+    def __init__(self, kind: int, code: str = '', declares_method: bool = False,
+                 block_open: bool = False, block_close: bool = False, method: Optional[MethodHeader] = None):
+        self.kind = kind
+        # Текст строки без литералов и комментария (позиции символов сохранены)
+        self.code = code
+        # Строка объявляет метод (допускается аннотация перед Процедура/Функция в той же строке)
+        self.declares_method = declares_method
+        self.block_open = block_open
+        self.block_close = block_close
+        # Для строк, объявляющих метод, - разобранный заголовок
+        self.method = method
+
+    @property
+    def is_blank(self) -> bool:
+        return self.kind == LINE_BLANK
+
+    @property
+    def is_comment(self) -> bool:
+        return self.kind == LINE_COMMENT
+
+    @property
+    def is_blank_or_comment(self) -> bool:
+        return self.kind == LINE_BLANK or self.kind == LINE_COMMENT
+
+
+_BLANK_TOKEN = LineToken(LINE_BLANK)
+_COMMENT_TOKEN = LineToken(LINE_COMMENT)
+
+
+def classify_line(line: str) -> LineToken:
+    """Классифицирует одну строку (без учета соседних строк)."""
+    stripped = line.lstrip()
+    if not stripped:
+        return _BLANK_TOKEN
+    if stripped.startswith('//'):
+        return _COMMENT_TOKEN
+
+    first = stripped[0]
+    if first == '#':
+        kind = LINE_PREPROCESSOR
+    elif first == '&':
+        kind = LINE_ANNOTATION
+    elif first == '|':
+        kind = LINE_CONTINUATION
+    else:
+        kind = LINE_CODE
+
+    code = strip_literals_and_comment(line)
+    if kind == LINE_CONTINUATION:
+        return LineToken(kind, code)
+
+    block_open = block_close = declares_method = False
+    keyword = _LEADING_KEYWORD_RE.match(code)
+    if keyword:
+        if keyword.group('open'):
+            block_open = True
+        elif keyword.group('close'):
+            block_close = True
+        elif kind == LINE_CODE:
+            kind = LINE_METHOD_END if keyword.group('end') else LINE_METHOD_START
+    if kind == LINE_METHOD_START or kind == LINE_ANNOTATION:
+        declares_method = _DECLARATION_RE.match(code) is not None
+    return LineToken(kind, code, declares_method, block_open, block_close)
+
+
+def _parse_header(tokens: List[LineToken], start: int) -> Optional[MethodHeader]:
+    """Разбирает заголовок метода, начинающийся в строке start (параметры могут занимать несколько строк)."""
+    match = _DECLARATION_RE.match(tokens[start].code)
+    if not match:
+        return None
+    header_text = match.group('params') or ''
+    end = start
+    if header_text and ')' not in header_text:
+        # Параметры продолжаются на следующих строках
+        j = start + 1
+        while j < len(tokens) and tokens[j].kind not in (LINE_METHOD_START, LINE_METHOD_END):
+            header_text += '\n' + tokens[j].code
+            if ')' in tokens[j].code:
+                end = j
+                break
+            j += 1
+    # Параметры - до парной закрывающей скобки (значения по умолчанию могут содержать скобки)
+    depth = 0
+    params_end = len(header_text)
+    for pos, ch in enumerate(header_text):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth == 0:
+                params_end = pos
+                break
+    params = header_text[1:params_end]
+    return MethodHeader(match.group('name'), params.strip(), _EXPORT_RE.search(header_text) is not None, end,
+                        match.group('kind').lower() == START_METHOD_TOKENS[1].lower())
+
+
+def find_method_end(tokens: List[LineToken], start: int) -> int:
+    """Индекс строки КонецПроцедуры/КонецФункции для метода, объявленного в строке start (или -1)."""
+    for idx in range(start + 1, len(tokens)):
+        if tokens[idx].kind == LINE_METHOD_END:
+            return idx
+    return -1
+
+
+def method_prefix_start(tokens: List[LineToken], start: int) -> int:
+    """Первая строка непрерывного блока комментариев и аннотаций непосредственно над объявлением метода."""
+    idx = start
+    while idx > 0:
+        token = tokens[idx - 1]
+        if token.kind == LINE_COMMENT or (token.kind == LINE_ANNOTATION and not token.declares_method):
+            idx -= 1
+        else:
+            break
+    return idx
+
+
+def lex_lines(lines: List[str]) -> List[LineToken]:
+    """
+    Разбирает строки модуля в поток токенов (по одному на строку)
+
+    Args:
+        lines: Строки модуля (с переводами строк или без)
+
+    Returns:
+        Список LineToken той же длины
+    """
+    with phase("parse"):
+        tokens = [classify_line(line) for line in lines]
+        for idx, token in enumerate(tokens):
+            if token.declares_method:
+                token.method = _parse_header(tokens, idx)
+    return tokens
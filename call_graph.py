@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Граф ссылок на методы по выгрузке конфигурации 1С (модули .bsl и модули Form.bin)
+
+Каждый модуль разбирается лексером один раз (ModuleIndex). Ссылкой на метод считается:
+  - имя метода в коде своего модуля, в том числе в строках (ОписаниеОповещения("Имя", ЭтотОбъект),
+    ПодключитьОбработчикОжидания("Имя", 1)) и через ЭтотОбъект./ЭтаФорма.;
+  - ОбщийМодуль.Метод (и "ОбщийМодуль.Метод" в строках); экспортные методы глобальных общих модулей
+    и модулей приложения - и без имени модуля;
+  - Объект.Метод для экспортных методов: тип объекта в коде неизвестен, поэтому это ссылка на все
+    экспортные методы с таким именем;
+  - привязка в описании формы (события и команды Form.xml или описание формы внутри Form.bin),
+    в XML объекта (операции Web- и HTTP-сервисов) и в Flowchart.xml бизнес-процесса;
+  - обработчик подписки на событие (<Handler>) и регламентного задания (<MethodName>);
+  - предопределенное имя обработчика события модуля объекта, менеджера, команды, сеанса, приложения.
+Ссылки хранятся счетчиками "вызывающий -> вызываемый"; код модуля вне методов - отдельная
+корневая вершина модуля. Такой граф нужен для поиска неиспользуемых методов и для их удаления
+до неподвижной точки (после удаления метода уменьшаются счетчики вызываемых им методов).
+"""
+
+import os
+import re
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set
+
+from bin_file_processor import read_bin_module
+from bin_text_cache import read_form_module_text
+from bsl_lexer import LINE_BLANK, LINE_COMMENT, strip_inline_comment
+from file_enumerator import iter_files
+from find_code_file import CodeFileFinder
+from module_index import MethodEntry, ModuleIndex
+from profiling import phase
+
+# Предопределенные обработчики событий модулей (вызываются платформой по имени, без привязки в XML)
+PLATFORM_EVENT_HANDLERS = {name.lower() for name in [
+    # Модули объектов, наборов записей, менеджеров значения
+    "ПередЗаписью", "ПриЗаписи", "ПередУдалением", "ПриКопировании", "ОбработкаЗаполнения",
+    "ОбработкаПроверкиЗаполнения", "ОбработкаПроведения", "ОбработкаУдаленияПроведения",
+    "ПриУстановкеНовогоНомера", "ПриУстановкеНовогоКода", "ПриКомпоновкеРезультата",
+    "ПередСозданиемЗадач", "ПриСозданииЗадач", "ПередВыполнением", "ПриВыполнении",
+    "ПриОтправкеДанныхПодчиненному", "ПриОтправкеДанныхГлавному",
+    "ПриПолученииДанныхОтПодчиненного", "ПриПолученииДанныхОтГлавного",
+    "BeforeWrite", "OnWrite", "BeforeDelete", "OnCopy", "Filling", "FillCheckProcessing", "Posting",
+    "UndoPosting", "OnSetNewNumber", "OnSetNewCode", "OnComposeResult", "BeforeCreateTasks", "OnCreateTasks",
+    "BeforeExecute", "OnExecute", "OnSendDataToSlave", "OnSendDataToMaster",
+    "OnReceiveDataFromSlave", "OnReceiveDataFromMaster",
+    # Модули менеджеров и хранилищ настроек
+    "ОбработкаПолученияДанныхВыбора", "ОбработкаПолученияФормы", "ОбработкаПолученияПредставления",
+    "ОбработкаПолученияПолейПредставления", "ОбработкаСохранения", "ОбработкаЗагрузки",
+    "ОбработкаПолученияОписания", "ОбработкаУстановкиОписания",
+    "ChoiceDataGetProcessing", "FormGetProcessing", "PresentationGetProcessing",
+    "PresentationFieldsGetProcessing", "SaveProcessing", "LoadProcessing",
+    "GetDescriptionProcessing", "SetDescriptionProcessing",
+    # Модули команд
+    "ОбработкаКоманды", "CommandProcessing",
+    # Модули сеанса, приложения и внешнего соединения
+    "УстановкаПараметровСеанса", "ПередНачаломРаботыСистемы", "ПриНачалеРаботыСистемы",
+    "ПередЗавершениемРаботыСистемы", "ПриЗавершенииРаботыСистемы", "ОбработкаВнешнегоСобытия",
+    "ОбработкаОтображенияОшибки", "ОбработкаПереходаПоНавигационнойСсылке", "ОбработкаЗапускаПриложения",
+    "SessionParametersSetting", "BeforeStart", "OnStart", "BeforeExit", "OnExit", "ExternalEventProcessing",
+    "ErrorDisplayProcessing", "URLProcessing",
+]}
+
+# Причины, по которым метод используется без ссылок из кода
+BOUND_MODULE_CODE = "код модуля"
+BOUND_FORM = "обработчик в описании формы"
+BOUND_FORM_UNKNOWN = "описание формы не прочитано"
+BOUND_OBJECT_XML = "обработчик в XML объекта"
+BOUND_PLATFORM_EVENT = "обработчик события платформы"
+BOUND_SUBSCRIPTION = "обработчик подписки на событие"
+BOUND_SCHEDULED_JOB = "обработчик регламентного задания"
+
+# Вид объекта метаданных с обработчиком (CommonModule.Модуль.Метод) -> причина привязки
+HANDLER_REASONS = {"EventSubscription": BOUND_SUBSCRIPTION, "ScheduledJob": BOUND_SCHEDULED_JOB}
+
+# Цепочка имен через точку (Модуль.Метод, Справочники.Товары.Метод); dot - цепочка начинается с точки (...).Метод
+_CHAIN_RE = re.compile(r'(?P<dot>\.\s*)?(?P<chain>[^\W\d]\w*(?:\s*\.\s*[^\W\d]\w*)*)')
+_WORD_RE = re.compile(r'[^\W\d]\w*')
+_GLOBAL_RE = re.compile(r'<Global>\s*true\s*</Global>', re.IGNORECASE)
+
+
+def iter_module_files(root: str) -> Iterator[str]:
+    """Модули выгрузки: все .bsl и Form.bin (служебные каталоги пропускаются, см. file_enumerator)."""
+    return iter_files(root, {'.bsl'}, {'Form.bin'})
+
+
+def _read_text_file(path) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8-sig', errors='ignore') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _path_key(path) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _words(text: str) -> Set[str]:
+    return {word.lower() for word in _WORD_RE.findall(text)}
+
+
+class ObjectPathBuilder:
+    """Описание модуля в формате конфигуратора (ОбщийМодуль.Имя.Модуль) по пути к файлу - обратно CodeFileFinder"""
+
+    def __init__(self, finder: CodeFileFinder):
+        self.base_path = finder.base_path
+        # Русские имена идут в словарях CodeFileFinder первыми
+        self.first: Dict[str, str] = {}
+        for name, folder in finder.first_object_mapping.items():
+            if folder:
+                self.first.setdefault(folder.lower(), name)
+        self.intermediate: Dict[str, str] = {}
+        for name, folder in finder.intermediate_object_mapping.items():
+            self.intermediate.setdefault(folder.lower(), name)
+        self.last: Dict[str, str] = {}
+        for name, files in finder.last_object_mapping.items():
+            for file_name in files:
+                self.last.setdefault(file_name.lower(), name)
+
+    def relative_parts(self, file_path: str) -> List[str]:
+        try:
+            return list(Path(os.path.relpath(file_path, self.base_path)).parts)
+        except ValueError:
+            return []
+
+    def object_path(self, parts: List[str]) -> Optional[str]:
+        """
+        Описание объекта по частям относительного пути
+
+        Args:
+            parts: Части пути относительно корня выгрузки (Catalogs, Товары, Forms, ФормаЭлемента, Ext, Form.bin)
+
+        Returns:
+            Описание (Справочник.Товары.Форма.ФормаЭлемента.Форма) или None, если модуль не описывается
+        """
+        ext_idx = next((i for i in range(2, len(parts)) if parts[i].lower() == 'ext'), None)
+        if ext_idx is None:
+            return None
+        kind = self.first.get(parts[0].lower())
+        if not kind:
+            return None
+        names = [kind, parts[1]]
+        i = 2
+        while i < ext_idx:
+            intermediate = self.intermediate.get(parts[i].lower())
+            if intermediate is None or i + 1 >= ext_idx:
+                return None
+            names += [intermediate, parts[i + 1]]
+            i += 2
+        last = self.last.get('/'.join(parts[ext_idx:]).lower())
+        if last is None:
+            return None
+        names.append(last)
+        return '.'.join(names)
+
+
+class ModuleInfo:
+    """Модуль выгрузки: файл, описание объекта, разобранный текст и методы по именам"""
+
+    def __init__(self, path: str, parts: List[str], object_path: Optional[str], index: ModuleIndex):
+        self.path = path
+        self.parts = parts
+        self.object_path = object_path
+        self.index = index
+        self.methods: Dict[str, List['MethodNode']] = {}
+        self.nodes: List['MethodNode'] = []
+        self._node_by_entry: Dict[int, 'MethodNode'] = {}
+        for entry in index.methods:
+            node = MethodNode(self, entry)
+            self.nodes.append(node)
+            self.methods.setdefault(entry.name.lower(), []).append(node)
+            self._node_by_entry[id(entry)] = node
+        # Вершина для кода модуля вне методов (объявления переменных, операторы в конце модуля)
+        self.root = MethodNode(self, None)
+        self.root.bound = BOUND_MODULE_CODE
+        # Экспортные методы доступны без имени модуля (глобальный общий модуль, модули приложения)
+        self.is_global = len(parts) == 2 and parts[0].lower() == 'ext'
+
+    @property
+    def is_form(self) -> bool:
+        lowered = [part.lower() for part in self.parts[-3:]]
+        return lowered[-1] == 'form.bin' or lowered == ['ext', 'form', 'module.bsl']
+
+    @property
+    def is_common_module(self) -> bool:
+        return len(self.parts) == 4 and self.parts[0].lower() == 'commonmodules'
+
+    @property
+    def object_dir(self) -> Optional[Path]:
+        """Каталог объекта метаданных (Catalogs/Товары)."""
+        if len(self.parts) < 3:
+            return None
+        return Path(self.path).parents[len(self.parts) - 3]
+
+    def node_at_line(self, line: int) -> 'MethodNode':
+        """Метод, которому принадлежит строка, или корневая вершина модуля."""
+        entry = self.index.method_at_line(line)
+        return self._node_by_entry[id(entry)] if entry is not None else self.root
+
+
+class MethodNode:
+    """Метод в графе: ссылки на него (callers) и из него (callees) со счетчиками"""
+
+    __slots__ = ('module', 'entry', 'callers', 'callees', 'bound')
+
+    def __init__(self, module: ModuleInfo, entry: Optional[MethodEntry]):
+        self.module = module
+        self.entry = entry
+        self.callers: Dict['MethodNode', int] = {}
+        self.callees: Dict['MethodNode', int] = {}
+        # Причина, по которой метод используется без ссылок из кода (BOUND_*), или None
+        self.bound: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.entry.name if self.entry is not None else ""
+
+    @property
+    def export(self) -> bool:
+        return self.entry is not None and self.entry.export
+
+    @property
+    def referenced(self) -> bool:
+        return bool(self.callers) or self.bound is not None
+
+    def __repr__(self):
+        return f"MethodNode({self.module.object_path or self.module.path}, {self.name or '<модуль>'})"
+
+
+class CallGraph:
+    """Граф ссылок на методы всех модулей выгрузки"""
+
+    def __init__(self, root: str = ".", finder: Optional[CodeFileFinder] = None):
+        """
+        Args:
+            root: Корень выгрузки конфигурации
+            finder: Поисковик файлов (для соответствия каталогов и видов объектов)
+        """
+        self.root = root
+        self.finder = finder or CodeFileFinder(root)
+        self.paths = ObjectPathBuilder(self.finder)
+        self.modules: List[ModuleInfo] = []
+        self.errors: List[str] = []
+        self._by_path: Dict[str, ModuleInfo] = {}
+        self._common_modules: Dict[str, ModuleInfo] = {}
+        self._exports_by_name: Dict[str, List[MethodNode]] = {}
+        self._global_exports: Dict[str, List[MethodNode]] = {}
+        self._known_names: Set[str] = set()
+
+    def build(self) -> 'CallGraph':
+        """Читает и разбирает все модули, затем связывает ссылки и привязки обработчиков."""
+        with phase("enumerate"):
+            files = sorted(iter_module_files(self.root))
+        for path in files:
+            self._load_module(path)
+        self._index_names()
+        with phase("resolve"):
+            for module in self.modules:
+                self._link_module(module)
+            self._bind_handlers()
+        return self
+
+    # Загрузка модулей
+
+    def _read_module_text(self, path: str) -> Optional[str]:
+        if path.lower().endswith('.bin'):
+            text, err = read_form_module_text(path)
+            if err:
+                self.errors.append(f"!! {path}     {err}")
+                return None
+            return text.lstrip('\ufeff')
+        text = _read_text_file(path)
+        if text is None:
+            self.errors.append(f"!! {path}     Не удалось прочитать файл")
+        return text
+
+    def _load_module(self, path: str):
+        with phase("read", path):
+            text = self._read_module_text(path)
+        if text is None:
+            return
+        parts = self.paths.relative_parts(path)
+        module = ModuleInfo(path, parts, self.paths.object_path(parts), ModuleIndex(text))
+        self.modules.append(module)
+        self._by_path[_path_key(path)] = module
+
+    def _index_names(self):
+        for module in self.modules:
+            if module.is_common_module:
+                self._common_modules[module.parts[1].lower()] = module
+                xml_text = _read_text_file(module.object_dir.parent / f"{module.parts[1]}.xml")
+                if xml_text and _GLOBAL_RE.search(xml_text):
+                    module.is_global = True
+        for module in self.modules:
+            for name, nodes in module.methods.items():
+                self._known_names.add(name)
+                for node in nodes:
+                    if node.export:
+                        self._exports_by_name.setdefault(name, []).append(node)
+                        if module.is_global:
+                            self._global_exports.setdefault(name, []).append(node)
+        self._known_names.update(self._common_modules)
+
+    # Ссылки из кода
+
+    def _resolve(self, module: ModuleInfo, dot: bool, names: List[str]) -> Set[MethodNode]:
+        """Методы, на которые может ссылаться цепочка имен names (в нижнем регистре)."""
+        targets: Set[MethodNode] = set()
+        start = 0
+        if not dot:
+            first = names[0]
+            targets.update(module.methods.get(first, ()))
+            targets.update(self._global_exports.get(first, ()))
+            common = self._common_modules.get(first)
+            if common is not None and len(names) > 1:
+                # ОбщийМодуль.Метод - только экспортный метод этого модуля
+                targets.update(node for node in common.methods.get(names[1], ()) if node.export)
+                start = 2
+            else:
+                start = 1
+        for name in names[start:]:
+            # ЭтотОбъект.Метод / ЭтаФорма.Метод и Объект.Метод (тип объекта неизвестен)
+            targets.update(module.methods.get(name, ()))
+            targets.update(self._exports_by_name.get(name, ()))
+        return targets
+
+    def _link_module(self, module: ModuleInfo):
+        index = module.index
+        known = self._known_names
+        headers = set()
+        for entry in index.methods:
+            headers.update(range(entry.start_line, entry.header_end_line + 1))
+        for line_idx, line in enumerate(index.lines):
+            if index.tokens[line_idx].kind in (LINE_BLANK, LINE_COMMENT) or line_idx in headers:
+                continue
+            text = strip_inline_comment(line).lower()
+            # Большинство строк не упоминает ни одного метода - их цепочки не разбираем
+            if known.isdisjoint(_WORD_RE.findall(text)):
+                continue
+            caller = None
+            for match in _CHAIN_RE.finditer(text):
+                names = [name.strip() for name in match.group('chain').split('.')]
+                if known.isdisjoint(names):
+                    continue
+                if caller is None:
+                    caller = module.node_at_line(line_idx)
+                for callee in self._resolve(module, match.group('dot') is not None, names):
+                    if callee is not caller:
+                        add_reference(caller, callee)
+
+    # Привязки обработчиков
+
+    def _form_description(self, module: ModuleInfo) -> Optional[str]:
+        """Текст описания формы: Form.xml рядом с модулем или элемент form внутри Form.bin."""
+        if module.path.lower().endswith('.bin'):
+            module_file, err = read_bin_module(module.path)
+            if err:
+                return None
+            paths = module_file.container.find_paths("form")
+            if not paths:
+                return None
+            return module_file.container.get_payload(paths[0]).decode('utf-8', errors='ignore')
+        return _read_text_file(Path(module.path).parent.parent / "Form.xml")
+
+    def _object_descriptions(self, module: ModuleInfo) -> List[str]:
+        """XML объекта метаданных модуля и схема бизнес-процесса (Ext/Flowchart.xml)."""
+        object_dir = module.object_dir
+        if object_dir is None:
+            return []
+        texts = [_read_text_file(object_dir.parent / f"{object_dir.name}.xml"),
+                 _read_text_file(object_dir / "Ext" / "Flowchart.xml")]
+        return [text for text in texts if text]
+
+    def _bind_handlers(self):
+        for module in self.modules:
+            if not module.nodes:
+                continue
+            if module.is_form:
+                description = self._form_description(module)
+                if description is None:
+                    # Привязки неизвестны - не считаем неиспользуемым ни один неэкспортный метод формы
+                    for node in module.nodes:
+                        node.bound = node.bound or BOUND_FORM_UNKNOWN
+                    continue
+                bound_names = _words(description)
+                for node in module.nodes:
+                    if node.name.lower() in bound_names:
+                        node.bound = node.bound or BOUND_FORM
+                continue
+            bound_names = set()
+            for text in self._object_descriptions(module):
+                bound_names |= _words(text)
+            for node in module.nodes:
+                name = node.name.lower()
+                if name in PLATFORM_EVENT_HANDLERS:
+                    node.bound = node.bound or BOUND_PLATFORM_EVENT
+                elif name in bound_names:
+                    node.bound = node.bound or BOUND_OBJECT_XML
+
+        # Обработчики подписок и регламентных заданий - из каталога метаданных
+        # (каталог поисковика загружается от его base_path при первом обращении)
+        for obj, handler in self.finder.catalog.handlers():
+            reason = HANDLER_REASONS.get(obj.kind)
+            parts = handler.split('.')
+            if reason is None or len(parts) != 3 or parts[0] != "CommonModule":
+                continue
+            common = self._common_modules.get(parts[1].lower())
+            if common is None:
+                continue
+            for node in common.methods.get(parts[2].lower(), ()):
+                node.bound = node.bound or reason
+
+    # Запросы к графу
+
+    def iter_methods(self) -> Iterator[MethodNode]:
+        for module in self.modules:
+            yield from module.nodes
+
+    def unreferenced(self, include_export: bool = False) -> List[MethodNode]:
+        """Методы без ссылок и привязок (экспортные - только если include_export)."""
+        return [node for node in self.iter_methods()
+                if not node.referenced and (include_export or not node.export)]
+
+    def find_module(self, file_path: str) -> Optional[ModuleInfo]:
+        """Модуль по пути к файлу (или None, если файл не разобран)."""
+        return self._by_path.get(_path_key(file_path))
+
+    def eliminate(self, removed: List[MethodNode]) -> List[MethodNode]:
+        """
+        Удаляет методы из графа и повторяет, пока не останется новых методов без ссылок
+
+        После удаления метода счетчики ссылок вызываемых им методов уменьшаются; метод,
+        у которого не осталось ссылок и привязок, удаляется следующим (если он не экспортный).
+
+        Args:
+            removed: Удаляемые методы (например, из МетодыКУдалению.txt)
+
+        Returns:
+            Методы, ставшие неиспользуемыми после удаления (в порядке обнаружения)
+        """
+        dead = set(removed)
+        queue = deque(removed)
+        found = []
+        while queue:
+            for callee in remove_node(queue.popleft()):
+                if callee not in dead and not callee.export and callee.entry is not None:
+                    dead.add(callee)
+                    found.append(callee)
+                    queue.append(callee)
+        return found
+
+
+def add_reference(caller: MethodNode, callee: MethodNode, count: int = 1):
+    callee.callers[caller] = callee.callers.get(caller, 0) + count
+    caller.callees[callee] = caller.callees.get(callee, 0) + count
+
+
+def remove_node(node: MethodNode) -> List[MethodNode]:
+    """
+    Убирает метод из графа вместе со ссылками из него и на него
+
+    Returns:
+        Вызываемые методы, у которых после этого не осталось ссылок и привязок
+    """
+    for caller in node.callers:
+        del caller.callees[node]
+    node.callers.clear()
+    orphaned = []
+    for callee in node.callees:
+        del callee.callers[node]
+        if not callee.referenced:
+            orphaned.append(callee)
+    node.callees.clear()
+    return orphaned
+
+
+def build_call_graph(root: str = ".", finder: Optional[CodeFileFinder] = None) -> CallGraph:
+    """Строит граф ссылок на методы по выгрузке в каталоге root."""
+    return CallGraph(root, finder).build()
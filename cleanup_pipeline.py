@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Полная очистка за один проход: каждый файл читается (Form.bin распаковывается) один раз,
+к тексту модуля по порядку применяются правила очистки, результат записывается один раз.
+
+Правила (по умолчанию все, в этом порядке):
+  returns  - код после безусловного Возврат (cleanup_return_1c.py)
+  comments - большие блоки комментариев (find_and_remove_comments.py)
+  empty    - большие блоки пустых строк (find_and_remove_empty.py)
+
+Запуск:
+    python -X utf8 "Refactoring1C\\cleanup_pipeline.py" "." [--rules returns,comments,empty] [--jobs N]
+        [--incremental] [--since <rev>]
+"""
+
+import os
+import sys
+from functools import partial
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from bin_file_processor import process_bin_file
+from file_enumerator import iter_files
+from cleanup_return_1c import RULE_KEY as RETURNS_RULE_KEY, _cleanup_returns_in_content
+from find_and_remove_comments import RULE_KEY as COMMENTS_RULE_KEY, _remove_comments_from_content
+from find_and_remove_empty import RULE_KEY as EMPTY_RULE_KEY, _remove_empty_blocks_from_content
+from incremental import IncrementalFilter, parse_incremental_args
+from parallel_runner import parse_jobs_args, run_files
+from profiling import parse_profile_args, phase, report
+from dry_run import finish as finish_dry_run, parse_dry_run_args, write_text
+
+# Правило: имя -> (функция преобразования текста, расширения файлов, к которым оно применяется,
+# ключ правила в манифесте инкрементального режима - общий с отдельным скриптом)
+RULES: Dict[str, Tuple[Callable[[str], Tuple[str, bool]], Set[str], str]] = {
+    "returns": (_cleanup_returns_in_content, {".os", ".bsl", ".bin"}, RETURNS_RULE_KEY),
+    "comments": (_remove_comments_from_content, {".os", ".bsl", ".bin"}, COMMENTS_RULE_KEY),
+    "empty": (_remove_empty_blocks_from_content, {".os", ".bsl", ".prc", ".bin"}, EMPTY_RULE_KEY),
+}
+DEFAULT_RULES = ["returns", "comments", "empty"]
+
+
+def parse_rules(value: str) -> List[str]:
+    """Разбирает список правил через запятую; неизвестные правила пропускаются с предупреждением."""
+    rules = []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name in RULES:
+            rules.append(name)
+        else:
+            print(f"Неизвестное правило: {name}. Доступные: {', '.join(RULES)}")
+    return rules
+
+
+def rules_for_file(path: str, rule_names: List[str]) -> List[str]:
+    ext = os.path.splitext(path)[1].lower()
+    return [name for name in rule_names if ext in RULES[name][1]]
+
+
+def apply_rules(content: str, rule_names: List[str]) -> Tuple[str, List[str]]:
+    """
+    Применяет цепочку правил к тексту модуля в памяти
+
+    Returns:
+        Кортеж (новый_текст, имена_сработавших_правил)
+    """
+    applied = []
+    for name in rule_names:
+        new_content, changed = RULES[name][0](content)
+        # Как и отдельный скрипт, правило без изменений текст не трогает (даже переводы строк)
+        if changed:
+            content = new_content
+            applied.append(name)
+    return content, applied
+
+
+def process_file(path: str, rule_names: Optional[List[str]] = None) -> Optional[List[str]]:
+    """
+    Обрабатывает файл всей цепочкой правил: одно чтение и одна запись (одна распаковка/упаковка Form.bin)
+
+    Args:
+        path: Путь к файлу
+        rule_names: Цепочка правил (по умолчанию DEFAULT_RULES)
+
+    Returns:
+        Имена правил, изменивших файл; None - при ошибке обработки
+    """
+    rule_names = rules_for_file(path, rule_names or DEFAULT_RULES)
+    if not rule_names:
+        return []
+    applied: List[str] = []
+
+    def _apply_chain(content: str) -> Tuple[str, bool]:
+        nonlocal applied
+        content, applied = apply_rules(content, rule_names)
+        return content, bool(applied)
+
+    try:
+        if path.lower().endswith('.bin'):
+            # Only process form binaries
+            if os.path.basename(path).lower() != 'form.bin':
+                return []
+            was_modified, error_message = process_bin_file(path, _apply_chain)
+            if error_message:
+                print(f"!! {path}     {error_message}")
+                return None
+            return applied if was_modified else []
+        else:
+            with phase("read", path), open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+
+            with phase("transform", path):
+                modified_content, changed = _apply_chain(content)
+
+            if changed:
+                print(f"  Changes detected, writing to file: {path}")
+                with phase("write", path):
+                    write_text(path, content, modified_content)
+            return applied
+    except Exception as e:
+        print(f"!!  {path}    Ошибка при обработке файла: {e}")
+        return None
+
+
+def _bin_result(path: str, applied, error_message: Optional[str]) -> Optional[List[str]]:
+    """Результат обработки Form.bin конвейером BinJobPool (--bin-jobs) в формате process_file."""
+    if error_message:
+        print(f"!! {path}     {error_message}")
+        return None
+    return applied or []
+
+
+def rule_keys_for_file(path: str, rule_names: List[str]) -> List[str]:
+    return [RULES[name][2] for name in rules_for_file(path, rule_names)]
+
+
+def iter_source_files(root: str, rule_names: List[str], file_filter: Optional[IncrementalFilter] = None):
+    """Перебирает файлы, к которым применимо хотя бы одно правило (один обход дерева);
+    file_filter отсекает неизмененные (--since) и уже чистые для всех своих правил (--incremental)."""
+    extensions = set()
+    for name in rule_names:
+        extensions |= RULES[name][1]
+
+    def _wanted(path: str) -> bool:
+        if os.path.splitext(path)[1].lower() not in extensions:
+            return False
+        return file_filter is None or file_filter.should_process(path, rule_keys_for_file(path, rule_names))
+
+    if os.path.isfile(root):
+        if _wanted(root):
+            yield root
+        return
+    for path in iter_files(root, extensions):
+        if _wanted(path):
+            yield path
+
+
+def main():
+    jobs, bin_jobs, args = parse_jobs_args(sys.argv[1:])
+    incremental, since, args = parse_incremental_args(args)
+    args = parse_profile_args(args)
+    args = parse_dry_run_args(args)
+    rule_names = list(DEFAULT_RULES)
+    rest = []
+    i = 0
+    while i < len(args):
+        option, _, value = args[i].partition('=')
+        if option == '--rules':
+            if not value and i + 1 < len(args):
+                i += 1
+                value = args[i]
+            rule_names = parse_rules(value)
+        else:
+            rest.append(args[i])
+        i += 1
+    if not rule_names:
+        print("Не задано ни одного правила")
+        return
+
+    root = rest[0] if rest else os.getcwd()
+    print(f"Rules: {', '.join(rule_names)}")
+    file_filter = IncrementalFilter([RULES[name][2] for name in rule_names], incremental, since, root)
+    total_files = 0
+    changed_files = 0
+    changed_by_rule = {name: 0 for name in rule_names}
+    with phase("enumerate"):
+        paths = list(iter_source_files(root, rule_names, file_filter))
+    bin_rules = partial(apply_rules, rule_names=rules_for_file("Form.bin", rule_names))
+    for path, applied in run_files(paths, partial(process_file, rule_names=rule_names), jobs, bin_jobs,
+                                   (bin_rules, _bin_result)):
+        total_files += 1
+        file_filter.record(path, None if applied is None else bool(applied), rule_keys_for_file(path, rule_names))
+        if applied:
+            changed_files += 1
+            for name in applied:
+                changed_by_rule[name] += 1
+    print(f"Processed files: {total_files}")
+    print(f"Changed files: {changed_files}")
+    for name in rule_names:
+        print(f"  {name}: {changed_by_rule[name]}")
+    if file_filter.active:
+        print(f"Skipped files: {file_filter.skipped}")
+    file_filter.save()
+    finish_dry_run()
+    report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,28 @@
 import os
 import re
 import sys
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from bin_file_processor import process_bin_file
-
-
-START_METHOD_TOKENS = ["Процедура", "Функция"]
-END_METHOD_TOKENS = ["КонецПроцедуры", "КонецФункции"]
-
-# Tokens to track nesting where Возврат должен быть проигнорирован
-# Учет вложенности с учетом препроцессора: #Если/#ИначеЕсли/#КонецЕсли
-NEST_INC_TOKENS = [
-    "Если",
-    "Попытка", 
-    #"Цикл",
-    "Для",
-    "Пока",
-    "#Если",
-]
-NEST_DEC_TOKENS = [
-    "КонецЕсли",
-    "КонецПопытки", 
-    "КонецЦикла",
-    "#КонецЕсли",
-]
-
+from file_enumerator import iter_files
+from incremental import IncrementalFilter, parse_incremental_args
+from parallel_runner import parse_jobs_args, run_files
+from profiling import parse_profile_args, phase, report
+from dry_run import finish as finish_dry_run, parse_dry_run_args, write_text
+from bsl_lexer import (
+    LINE_BLANK, LINE_COMMENT, LINE_METHOD_END, LINE_METHOD_START, LineToken, lex_lines,
+    remove_string_literals, strip_inline_comment, strip_literals_and_comment,
+)
+
+
+# Классы строк и ключевые слова вложенности (Если/Попытка/Для/Пока/#Если) определяются в bsl_lexer.py
 FILE_EXTENSIONS = {".os", ".bsl", ".bin"}
 
+# Версия правила для манифеста инкрементального режима: увеличить при изменении логики очистки
+RULE_VERSION = "1"
+RULE_KEY = f"returns:{RULE_VERSION}"
+
 # Предкомпилированные паттерны (ускорение)
-_START_RE = re.compile(r"^\s*(?:" + "|".join(map(re.escape, START_METHOD_TOKENS)) + r")\b", re.IGNORECASE)
-_END_RE = re.compile(r"^\s*(?:" + "|".join(map(re.escape, END_METHOD_TOKENS)) + r")\b", re.IGNORECASE)
 _RETURN_STMT_RE = re.compile(r"^\s*Возврат(?:\s+[^;]+)?\s*;\s*$", re.IGNORECASE)
-_NEST_DEC_RE = re.compile(r"(^|\s)(?:" + "|".join(map(re.escape, NEST_DEC_TOKENS)) + r")(\s|$)")
-_NEST_INC_RE = re.compile(r"(^|\s)(?:" + "|".join(map(re.escape, NEST_INC_TOKENS)) + r")(\s|$)")
-_NEST_DEC_START_RE = re.compile(r"^\s*(?:" + "|".join(map(re.escape, NEST_DEC_TOKENS)) + r")\b", re.IGNORECASE)
-_NEST_INC_START_RE = re.compile(r"^\s*(?:" + "|".join(map(re.escape, NEST_INC_TOKENS)) + r")\b", re.IGNORECASE)
-
-
-def remove_string_literals(code: str) -> str:
-    '''Удаляет строковые литералы 1С (двойные кавычки, с экранированием "") для упрощения поиска токенов.'''
-    result = []
-    i = 0
-    in_str = False
-    while i < len(code):
-        ch = code[i]
-        if not in_str:
-            if ch == '"':
-                in_str = True
-                # заменяем содержимое строк на пробелы той же длины, чтобы не ломать позиции
-                result.append(' ')
-            else:
-                result.append(ch)
-            i += 1
-        else:
-            # внутри строки 1С, двойные кавычки удваиваются
-            if ch == '"':
-                if i + 1 < len(code) and code[i + 1] == '"':
-                    # это экранированная кавычка внутри строки
-                    result.append('  ')
-                    i += 2
-                else:
-                    in_str = False
-                    result.append(' ')
-                    i += 1
-            else:
-                # гасим содержимое строки пробелами
-                result.append(' ')
-                i += 1
-    return ''.join(result)
-
-
-def strip_inline_comment(code: str) -> str:
-    """Удаляет // комментарий вне строк."""
-    s = remove_string_literals(code)
-    idx = s.find("//")
-    if idx >= 0:
-        return code[:idx]
-    return code
 
 
 def is_preprocessor_line(line: str) -> bool:
@@ -95,33 +41,26 @@ def is_continuation_bar(line: str) -> bool:
 
 
 def normalize(s: str) -> str:
-    return remove_string_literals(strip_inline_comment(s))
+    return strip_literals_and_comment(s)
 
 
-def find_methods(lines: List[str]) -> List[Tuple[int, int]]:
+def find_methods(lines: List[str], tokens: Optional[List[LineToken]] = None) -> List[Tuple[int, int]]:
     """Возвращает список границ методов как (start_idx, end_idx), включительно по end_idx."""
+    if tokens is None:
+        tokens = lex_lines(lines)
     methods = []
     i = 0
     while i < len(lines):
-        line = lines[i]
-        if is_preprocessor_line(line):
-            i += 1
-            continue
-        nl = normalize(line)
-        # Старт метода должен быть в начале строки
-        starts = _START_RE.search(nl) is not None
-        if starts:
+        # Старт метода должен быть в начале строки (строки препроцессора лексер методами не считает)
+        if tokens[i].kind == LINE_METHOD_START:
             start_idx = i
             j = i + 1
             while j < len(lines):
-                if not is_preprocessor_line(lines[j]):
-                    nl2 = normalize(lines[j])
-                    # Конец метода тоже должен быть в начале строки
-                    ends = _END_RE.search(nl2) is not None
-                    if ends:
-                        methods.append((start_idx, j))
-                        i = j
-                        break
+                # Конец метода тоже должен быть в начале строки
+                if tokens[j].kind == LINE_METHOD_END:
+                    methods.append((start_idx, j))
+                    i = j
+                    break
                 j += 1
             else:
                 # Конца метода нет – считаем до конца файла
@@ -131,46 +70,34 @@ def find_methods(lines: List[str]) -> List[Tuple[int, int]]:
     return methods
 
 
-def should_ignore_return(line: str, nesting: int, lines: List[str] = None, current_idx: int = None, start_idx: int = None) -> bool:
+def should_ignore_return(line: str, nesting: int, normalized_line: Optional[str] = None) -> bool:
     # Игнор по правилам пользователя
     if is_comment_line(line):
         return True
     if is_continuation_bar(line):
         return True
+    # Вложенность считается инкрементально в process_method за один проход по методу:
+    # Возврат внутри открытых Если/Попытка/Для/Пока/#Если игнорируется
     if nesting > 0:
         return True
 
     # Проверяем, что это самостоятельный оператор Возврат;
-    before_comment = strip_inline_comment(line)
-    no_strings = remove_string_literals(before_comment)
+    no_strings = normalized_line if normalized_line is not None else normalize(line)
     # Запрещаем случаи вроде Object.Возврат
     # Должно начинаться с Возврат и заканчиваться ; (с пробелами)
     if not _RETURN_STMT_RE.match(no_strings):
         return True
     
-    # Дополнительная проверка: Возврат должен быть на корневом уровне метода
-    # Проверяем, что от начала метода до текущей строки не было открытых условных блоков
-    if lines is not None and current_idx is not None and start_idx is not None:
-        temp_nesting = 0
-        for k in range(start_idx + 1, current_idx + 1):
-            temp_line = lines[k]
-            temp_nl = normalize(temp_line)
-            if _NEST_DEC_START_RE.search(temp_nl):
-                temp_nesting = max(0, temp_nesting - 1)
-            if _NEST_INC_START_RE.search(temp_nl):
-                temp_nesting += 1
-        
-        # Если есть открытые условные блоки - игнорируем Возврат
-        if temp_nesting > 0:
-            return True
-    
     # Также исключим случаи, где перед Возврат есть не пробел (напр. буква/точка)
     # Уже покрыто ^\s*
     return False
 
 
-def process_method(lines: List[str], start_idx: int, end_idx: int) -> bool:
-    """Обрабатывает метод. Возвращает True, если были изменения."""
+def process_method(lines: List[str], start_idx: int, end_idx: int, tokens: Optional[List[LineToken]] = None) -> bool:
+    """Обрабатывает метод. Возвращает True, если были изменения.
+    tokens - поток лексера по строкам; при удалении строк синхронизируется с lines."""
+    if tokens is None:
+        tokens = lex_lines(lines)
     # Ищем первый безусловный Возврат;
     # Сканируем от первой строки тела до последней перед концом метода
     # Область удаления будет после строки с Возврат; до end_idx (не включая end токен)
@@ -180,20 +107,21 @@ def process_method(lines: List[str], start_idx: int, end_idx: int) -> bool:
     # Сканируем только строки тела: после объявления и до строки конца метода
     for i in range(start_idx + 1, end_idx):
         line = lines[i]
-        nl = normalize(line)
+        token = tokens[i]
+        nl = token.code
 
         if nl.strip() == "":
             continue
 
         # Сначала проверяем Возврат при текущем уровне вложенности
-        if not should_ignore_return(line, nesting, lines, i, start_idx):
+        if not should_ignore_return(line, nesting, nl):
             return_line_idx = i
             break  # Нашли первый безусловный Возврат; - выходим из поиска
 
         # Затем накапливаем изменения вложенности по мере прохода
-        if _NEST_DEC_START_RE.search(nl):
+        if token.block_close:
             nesting = max(0, nesting - 1)
-        if _NEST_INC_START_RE.search(nl):
+        if token.block_open:
             nesting += 1
 
     if return_line_idx is None:
@@ -211,10 +139,10 @@ def process_method(lines: List[str], start_idx: int, end_idx: int) -> bool:
     has_non_comment_non_empty = False
     non_empty_comment_count = 0
     for k in range(delete_from, delete_to + 1):
-        raw_line = lines[k]
-        if raw_line.strip() == "":
+        kind = tokens[k].kind
+        if kind == LINE_BLANK:
             continue
-        if is_comment_line(raw_line):
+        if kind == LINE_COMMENT:
             non_empty_comment_count += 1
         else:
             has_non_comment_non_empty = True
@@ -225,88 +153,108 @@ def process_method(lines: List[str], start_idx: int, end_idx: int) -> bool:
 
     # Удаляем строки
     del lines[delete_from:delete_to + 1]
+    del tokens[delete_from:delete_to + 1]
     return True
 
 
-def process_file(path: str) -> Tuple[bool, int]:
+def _cleanup_returns_in_content(content: str) -> Tuple[str, bool]:
+    # Нормализуем перевод строк к \n, сохраняя потом исходный стиль по первому вхождению
+    newline = '\n'
+    if '\r\n' in content:
+        newline = '\r\n'
+    lines = content.replace('\r\n', '\n').replace('\r', '\n').split('\n')
 
-    def _cleanup_returns_in_content(content: str) -> Tuple[str, bool]:
-        # Нормализуем перевод строк к \n, сохраняя потом исходный стиль по первому вхождению
-        newline = '\n'
-        if '\r\n' in content:
-            newline = '\r\n'
-        lines = content.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    tokens = lex_lines(lines)
+    methods = find_methods(lines, tokens)
+    if not methods:
+        return content, False
 
-        methods = find_methods(lines)
-        if not methods:
-            return content, False
+    changed = False
+    changes_cnt = 0
+
+    for start_idx, end_idx in reversed(methods):
+        if end_idx >= len(lines):
+            end_idx = len(lines) - 1
+        if start_idx < 0 or end_idx <= start_idx:
+            continue
+        if process_method(lines, start_idx, end_idx, tokens):
+            changed = True
+            changes_cnt += 1
+    
+    return newline.join(lines), changed
 
-        changed = False
-        changes_cnt = 0
 
-        for start_idx, end_idx in reversed(methods):
-            if end_idx >= len(lines):
-                end_idx = len(lines) - 1
-            if start_idx < 0 or end_idx <= start_idx:
-                continue
-            if process_method(lines, start_idx, end_idx):
-                changed = True
-                changes_cnt += 1
-        
-        return newline.join(lines), changed
+def _bin_result(path: str, was_modified: bool, error_message: Optional[str]) -> Tuple[Optional[bool], int]:
+    """Результат обработки Form.bin (process_bin_file или BinJobPool при --bin-jobs)."""
+    if error_message:
+        print(f"!! {path}     {error_message}")
+        return None, 0
+    return was_modified, (1 if was_modified else 0)
 
+
+def process_file(path: str) -> Tuple[Optional[bool], int]:
+    """Возвращает (изменен, количество_очищенных_методов); при ошибке обработки - (None, 0)."""
     try:
         if path.lower().endswith('.bin'):
             # Only process form binaries; harden against read/codec errors
             if os.path.basename(path).lower() != 'form.bin':
                 return False, 0
             try:
-                was_modified, error_message = process_bin_file(path, _cleanup_returns_in_content)
-                if error_message:
-                    print(f"!! {path}     {error_message}")
-                return was_modified, (1 if was_modified else 0)
+                return _bin_result(path, *process_bin_file(path, _cleanup_returns_in_content))
             except Exception as e:
                 # Skip problematic binaries silently to allow processing to continue
                 # print(f"!!  {path}    Ошибка обработки BIN: {e}")
-                return False, 0
+                return None, 0
         else:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            with phase("read", path), open(path, 'r', encoding='utf-8', errors='ignore') as f:
                 content = f.read()
 
-            modified_content, changed = _cleanup_returns_in_content(content)
+            with phase("transform", path):
+                modified_content, changed = _cleanup_returns_in_content(content)
 
             if changed:
-                with open(path, 'w', encoding='utf-8') as f:
-                    f.write(modified_content)
+                with phase("write", path):
+                    write_text(path, content, modified_content)
                 return True, 1
             else:
                 return False, 0
     except Exception as e:
         # print(f"!!  {path}    Ошибка при обработке файла: {e}") # Temporarily commented out to avoid excessive output
-        return False, 0
+        return None, 0
 
 
-def iter_source_files(root: str):
+def iter_source_files(root: str, file_filter: Optional[IncrementalFilter] = None):
+    """Перебирает файлы для обработки; file_filter отсекает неизмененные (--since) и уже чистые (--incremental)."""
     if os.path.isfile(root):
         ext = os.path.splitext(root)[1].lower()
-        if ext in FILE_EXTENSIONS:
+        if ext in FILE_EXTENSIONS and (file_filter is None or file_filter.should_process(root)):
             yield root
         return
-    for dirpath, dirnames, filenames in os.walk(root):
-        for name in filenames:
-            ext = os.path.splitext(name)[1].lower()
-            if ext in FILE_EXTENSIONS:
-                yield os.path.join(dirpath, name)
+    for path in iter_files(root, FILE_EXTENSIONS):
+        if file_filter is None or file_filter.should_process(path):
+            yield path
 
 
 def main():
-    root = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    # --jobs N: обработка в N процессах, --bin-jobs N: отдельный предел для Form.bin
+    jobs, bin_jobs, args = parse_jobs_args(sys.argv[1:])
+    # --incremental: пропуск уже чистых файлов, --since <rev>: только файлы, измененные с коммита
+    incremental, since, args = parse_incremental_args(args)
+    # --profile: сводка по фазам и самые медленные файлы
+    args = parse_profile_args(args)
+    # --dry-run: файлы не изменяются, --diff ФАЙЛ: изменения в формате unified diff
+    args = parse_dry_run_args(args)
+    root = args[0] if args else os.getcwd()
+    file_filter = IncrementalFilter([RULE_KEY], incremental, since, root)
     total_files = 0
     changed_files = 0
     total_methods_changed = 0
-    for path in iter_source_files(root):
+    with phase("enumerate"):
+        paths = list(iter_source_files(root, file_filter))
+    for path, (changed, cnt) in run_files(paths, process_file, jobs, bin_jobs,
+                                              (_cleanup_returns_in_content, _bin_result)):
         total_files += 1
-        changed, cnt = process_file(path)
+        file_filter.record(path, changed)
         if changed:
             changed_files += 1
             total_methods_changed += cnt
@@ -314,6 +262,11 @@ def main():
     print(f"Processed files: {total_files}")
     print(f"Changed files: {changed_files}")
     print(f"Methods cleaned: {total_methods_changed}")
+    if file_filter.active:
+        print(f"Skipped files: {file_filter.skipped}")
+    file_filter.save()
+    finish_dry_run()
+    report()
 
 
 if __name__ == "__main__":
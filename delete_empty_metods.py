@@ -6,10 +6,14 @@
 
 import re
 import os
+import sys
 from pathlib import Path
 from find_code_file import CodeFileFinder
 from bin_file_processor import process_bin_file
-from typing import Tuple
+from profiling import parse_profile_args, phase, report
+from dry_run import finish as finish_dry_run, parse_dry_run_args, write_text
+from module_index import ModuleIndex
+from typing import Dict, List, Tuple
 
 
 def parse_methods_file(file_path: str) -> list:
@@ -71,131 +75,117 @@ def extract_method_name(method_description: str) -> str:
     return ""
 
 
-def remove_method_from_file(file_path: str, method_name: str) -> bool:
+def delete_empty_methods_from_content(file_path: str, content: str, method_names: List[str]) -> Tuple[str, List[bool]]:
     """
-    Удаляет метод из файла, если он пустой (содержит только комментарии или пустые строки между началом и концом метода)
+    Удаляет из текста модуля пустые методы: модуль разбирается один раз,
+    пустота и экспорт проверяются по таблице методов
     
     Args:
-        file_path: Путь к файлу
-        method_name: Имя метода для удаления
+        file_path: Путь к файлу (для сообщений)
+        content: Текст модуля
+        method_names: Имена методов для удаления (в порядке записей)
         
     Returns:
-        True если метод был удален, False если не найден или не пуст
+        Кортеж (новый_текст, признаки удаления по каждому имени)
     """
+    module = ModuleIndex(content)
+
+    # Повторная запись с тем же именем берет следующее вхождение метода,
+    # как при последовательном удалении по одному
+    next_match_idx: Dict[str, int] = {}
+    results = []
+    removed = []
+    for method_name in method_names:
+        key = method_name.lower()
+        idx = next_match_idx.get(key, 0)
+        entry = module.find_method(method_name, idx)
+        if entry is None:
+            results.append(False)
+        elif not entry.empty:
+            print(f"!! {file_path}     Метод '{method_name}' НЕ удален - не является пустым")
+            results.append(False)
+        elif entry.export:
+            print(f"!! {file_path}     Метод '{method_name}' НЕ удален - является экспортным")
+            results.append(False)
+        else:
+            next_match_idx[key] = idx + 1
+            removed.append(entry)
+            print(f"+ {file_path}    Удален пустой метод: {method_name}")
+            results.append(True)
 
-    def _delete_empty_method_from_content(content: str) -> Tuple[str, bool]:
-        method_found_in_content = False
+    if not removed:
+        return content, results
 
-        # Regex to find the method block, including optional 'Экспорт' keyword
-        pattern = rf'(?:Процедура|Функция)\s+{re.escape(method_name)}\s*\([^)]*\).*?(?:КонецПроцедуры|КонецФункции)'
-        
-        # We need to search with DOTALL to match newlines within the method body
-        match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
+    # Вместе с методом удаляются комментарии и аннотации непосредственно над ним
+    return module.without_methods(removed), results
 
-        if match:
-            # Extract the method text to check for emptiness
-            method_text_full = match.group(0)
-            
-            # Extract the body for emptiness check (excluding the declaration and end lines)
-            body_pattern = rf'(?:Процедура|Функция)\s+{re.escape(method_name)}\s*\([^)]*\)(?:Экспорт)?\s*(.*?)(?:КонецПроцедуры|КонецФункции)'
-            body_match = re.search(body_pattern, method_text_full, re.DOTALL | re.IGNORECASE)
-            method_body = body_match.group(1) if body_match else ""
 
-            # Remove comments and empty lines from the method body
-            cleaned_body = re.sub(r'(?m)^\s*(?://.*|&.*)?$\n?', '', method_body).strip()
-            
-            if not cleaned_body: # If the cleaned body is empty, the method is empty
-                # Извлекаем первую строку объявления метода для проверки экспорта
-                first_line = method_text_full.split('\n')[0]
-                
-                # Проверяем, есть ли слово "Экспорт" в первой строке
-                if 'Экспорт' in first_line:
-                    print(f"!! {file_path}     Метод '{method_name}' НЕ удален - является экспортным")
-                    return content, False
-                else:
-                    all_lines = content.splitlines(keepends=True)
-                    
-                    # Find the line index of the method's start
-                    char_count = 0
-                    method_start_line_idx = -1
-                    for idx, line_text in enumerate(all_lines):
-                        if char_count == match.start(): # Exact start of line
-                            method_start_line_idx = idx
-                            break
-                        if char_count < match.start() < char_count + len(line_text): # Match starts within a line
-                            method_start_line_idx = idx
-                            break
-                        char_count += len(line_text)
-                    
-                    if method_start_line_idx == -1: # Should not happen if match is found
-                        print(f"Error: Could not find start line for method {method_name}")
-                        return content, False
-
-                    # Count comment lines directly above
-                    num_comment_lines_to_remove = 0
-                    for i in reversed(range(method_start_line_idx)):
-                        line = all_lines[i].strip()
-                        if line.startswith('//') or line.startswith('&'):
-                            num_comment_lines_to_remove += 1
-                        elif line == '': # Empty line, stop deleting comments
-                            break
-                        else: # Non-comment, non-empty line, stop deleting comments
-                            break
-                    
-                    # Calculate the effective start line index for deletion
-                    effective_start_line_idx = method_start_line_idx - num_comment_lines_to_remove
-                    
-                    # The end of the block to remove is the end of the method match.
-                    # Find the line index of the method's end (match.end())
-                    char_count = 0
-                    method_end_line_idx = -1
-                    for idx, line_text in enumerate(all_lines):
-                        char_count += len(line_text)
-                        if char_count >= match.end(): # Match ends within or at the end of this line
-                            method_end_line_idx = idx
-                            break
-                    
-                    if method_end_line_idx == -1: # Should not happen if match is found
-                        print(f"Error: Could not find end line for method {method_name}")
-                        return content, False
-                    
-                    # Reconstruct content, excluding the identified lines
-                    # This removes lines from effective_start_line_idx to method_end_line_idx (inclusive)
-                    content = "".join(all_lines[:effective_start_line_idx] + all_lines[method_end_line_idx + 1:])
-                    
-                    method_found_in_content = True
-                    print(f"+ {file_path}    Удален пустой метод: {method_name}")
-            else:
-                print(f"!! {file_path}     Метод '{method_name}' НЕ удален - не является пустым")
-        return content, method_found_in_content
+def remove_methods_from_file(file_path: str, method_names: List[str]) -> List[bool]:
+    """
+    Удаляет из файла пустые методы. Файл читается и записывается один раз,
+    Form.bin распаковывается и упаковывается один раз на все методы
+    
+    Args:
+        file_path: Путь к файлу
+        method_names: Имена методов для удаления
+        
+    Returns:
+        Список признаков удаления по каждому имени
+    """
+    results = [False] * len(method_names)
+
+    def _delete_empty_methods(content: str) -> Tuple[str, bool]:
+        nonlocal results
+        content, results = delete_empty_methods_from_content(file_path, content, method_names)
+        return content, any(results)
 
     try:
         if file_path.lower().endswith('.bin'):
-            was_modified, error_message = process_bin_file(file_path, _delete_empty_method_from_content)
+            was_modified, error_message = process_bin_file(file_path, _delete_empty_methods)
             if error_message:
                 print(f"!! {file_path}     {error_message}")
-            return was_modified
+                return [False] * len(method_names)
+            return results
         else:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-            
-            modified_content, method_found = _delete_empty_method_from_content(content)
-
-            if method_found:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(modified_content)
-                return True
-            else:
-                print(f"!! {file_path}     Метод не найден: {method_name}")
-                return False
+            with phase("read", file_path), open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                original_content = f.read()
+
+            with phase("transform", file_path):
+                content, was_modified = _delete_empty_methods(original_content)
+            for method_name, method_found in zip(method_names, results):
+                if not method_found:
+                    print(f"!! {file_path}     Метод не найден: {method_name}")
+
+            if was_modified:
+                with phase("write", file_path):
+                    write_text(file_path, original_content, content)
+            return results
             
     except Exception as e:
         print(f"!!  {file_path}    Ошибка при обработке файла: {e}")
-        return False
+        return [False] * len(method_names)
+
+
+def remove_method_from_file(file_path: str, method_name: str) -> bool:
+    """
+    Удаляет метод из файла, если он пустой (содержит только комментарии или пустые строки между началом и концом метода)
+    
+    Args:
+        file_path: Путь к файлу
+        method_name: Имя метода для удаления
+        
+    Returns:
+        True если метод был удален, False если не найден или не пуст
+    """
+    return remove_methods_from_file(file_path, [method_name])[0]
 
 
 def main():
     """Основная функция"""
+    # --profile: сводка по фазам и самые медленные файлы
+    args = parse_profile_args(sys.argv[1:])
+    # --dry-run: файлы не изменяются, --diff ФАЙЛ: изменения в формате unified diff
+    parse_dry_run_args(args)
     finder = CodeFileFinder()
     
     file_path = Path(".") / "Refactoring1C" / "ПустыеМетодыКУдалению.txt"
@@ -209,8 +199,10 @@ def main():
     print(f"Найдено {len(methods_to_delete)} записей для обработки")
     print("=" * 80)
     
+    # Группируем записи по файлу: каждый модуль и каждый Form.bin обрабатывается один раз
     processed_files = set()
     total_methods_removed = 0
+    methods_by_file: Dict[str, List[str]] = {}
     
     for i, (object_path, method_description, line_num) in enumerate(methods_to_delete, 1):
         #print(f"[{i}/{len(methods_to_delete)}] Обрабатываю: {object_path}")
@@ -228,22 +220,24 @@ def main():
             
             if method_name:
                 #print(f"  Метод для удаления: {method_name}")
-                
-                # Удаляем метод из файла
-                if remove_method_from_file(file_path_found, method_name):
-                    total_methods_removed += 1
-                
+                methods_by_file.setdefault(file_path_found, []).append(method_name)
                 processed_files.add(file_path_found)
             else:
                 print(f"!! {object_path}  Не удалось извлечь имя метода из: {method_description}")
         else:
             print(f"!! {object_path}  ❌ Файл не найден")
     
+    for file_path_found, method_names in methods_by_file.items():
+        removed = remove_methods_from_file(file_path_found, method_names)
+        total_methods_removed += sum(removed)
+    
     print("=" * 80)
     print(f"ИТОГО:")
     print(f"  Обработано записей: {len(methods_to_delete)}")
     print(f"  Обработано файлов: {len(processed_files)}")
     print(f"  Удалено методов: {total_methods_removed}")
+    finish_dry_run()
+    report()
 
 if __name__ == "__main__":
     main()
@@ -2,14 +2,23 @@
 # -*- coding: utf-8 -*-
 """
 Скрипт для поиска файлов и удаления методов из МетодыКУдалению.txt
+
+С ключом --iterative по модулям выгрузки строится граф ссылок (call_graph.py) и вместе с методами
+из списка удаляются методы, которые использовались только ими - до неподвижной точки, без
+повторной загрузки в конфигуратор и проверки.
 """
 
 import re
 import os
+import sys
 from pathlib import Path
 from find_code_file import CodeFileFinder
 from bin_file_processor import process_bin_file
-from typing import Tuple
+from module_index import ModuleIndex
+from call_graph import MethodNode, build_call_graph
+from profiling import parse_profile_args, phase, report
+from dry_run import finish as finish_dry_run, parse_dry_run_args, write_text
+from typing import Dict, List, Tuple
 
 
 def parse_methods_file(file_path: str) -> list:
@@ -71,116 +80,178 @@ def extract_method_name(method_description: str) -> str:
     return ""
 
 
-def remove_method_from_file(file_path: str, method_name: str) -> bool:
+# Статусы обработки записи из МетодыКУдалению.txt
+METHOD_REMOVED = "removed"
+METHOD_EXPORTED = "exported"
+METHOD_NOT_FOUND = "not_found"
+
+
+def delete_methods_from_content(content: str, method_names: List[str]) -> Tuple[str, List[str]]:
     """
-    Удаляет метод из файла
+    Удаляет из текста модуля сразу все указанные методы за один проход
     
     Args:
-        file_path: Путь к файлу
-        method_name: Имя метода для удаления
+        content: Текст модуля
+        method_names: Имена методов для удаления (в порядке записей)
         
     Returns:
-        True если метод был удален, False если не найден
+        Кортеж (новый_текст, статусы), где статусы - список METHOD_* по каждому имени
     """
+    if not method_names:
+        return content, []
 
-    def _delete_method_from_content(content: str) -> Tuple[str, bool]:
-        method_found_in_content = False
-        
-        # Простой и быстрый паттерн для поиска методов
-        pattern = rf'(?:Процедура|Функция)\s+{re.escape(method_name)}\s*\([^)]*\).*?(?:КонецПроцедуры|КонецФункции)'
-        
-        match = re.search(pattern, content, re.DOTALL | re.IGNORECASE)
-        
-        if match:
-            # Извлекаем первую строку объявления метода для проверки экспорта
-            method_text = match.group(0)
-            first_line = method_text.split('\n')[0]
-            
-            # Проверяем, есть ли слово "Экспорт" в первой строке
-            if 'Экспорт' in first_line:
-                print(f"!! {file_path}     Метод '{method_name}' НЕ удален - является экспортным")
-                return content, False
-            else:
-                all_lines = content.splitlines(keepends=True)
-                
-                char_count = 0
-                method_start_line_idx = -1
-                for idx, line_text in enumerate(all_lines):
-                    if char_count == match.start(): 
-                        method_start_line_idx = idx
-                        break
-                    if char_count < match.start() < char_count + len(line_text):
-                        method_start_line_idx = idx
-                        break
-                    char_count += len(line_text)
-                
-                if method_start_line_idx == -1:
-                    print(f"Error: Could not find start line for method {method_name}")
-                    return content, False
-
-                num_comment_lines_to_remove = 0
-                for i in reversed(range(method_start_line_idx)):
-                    line = all_lines[i].strip()
-                    if line.startswith('//') or line.startswith('&'):
-                        num_comment_lines_to_remove += 1
-                    elif line == '':
-                        break
-                    else:
-                        break
-                
-                effective_start_line_idx = method_start_line_idx - num_comment_lines_to_remove
-                
-                char_count = 0
-                method_end_line_idx = -1
-                for idx, line_text in enumerate(all_lines):
-                    char_count += len(line_text)
-                    if char_count >= match.end():
-                        method_end_line_idx = idx
-                        break
-                
-                if method_end_line_idx == -1:
-                    print(f"Error: Could not find end line for method {method_name}")
-                    return content, False
-                
-                content = "".join(all_lines[:effective_start_line_idx] + all_lines[method_end_line_idx + 1:])
-                method_found_in_content = True
-                # print(f"+ {file_path}    Удален метод: {method_name}")
+    # Модуль разбирается один раз; дальше - поиск по таблице методов
+    module = ModuleIndex(content)
+
+    # Повторная запись с тем же именем берет следующее вхождение метода,
+    # как при последовательном удалении по одному
+    next_match_idx: Dict[str, int] = {}
+    statuses = []
+    removed = []
+    for method_name in method_names:
+        key = method_name.lower()
+        idx = next_match_idx.get(key, 0)
+        entry = module.find_method(method_name, idx)
+        if entry is None:
+            statuses.append(METHOD_NOT_FOUND)
+        elif entry.export:
+            statuses.append(METHOD_EXPORTED)
+        else:
+            next_match_idx[key] = idx + 1
+            removed.append(entry)
+            statuses.append(METHOD_REMOVED)
+
+    if not removed:
+        return content, statuses
+
+    # Вместе с методом удаляются комментарии и аннотации непосредственно над ним
+    return module.without_methods(removed), statuses
+
+
+def remove_methods_from_file(file_path: str, method_names: List[str]) -> List[bool]:
+    """
+    Удаляет из файла все указанные методы: файл читается, изменяется и записывается один раз
+    
+    Args:
+        file_path: Путь к файлу
+        method_names: Имена методов для удаления
         
-        return content, method_found_in_content
+    Returns:
+        Список признаков удаления по каждому имени
+    """
+    statuses = [METHOD_NOT_FOUND] * len(method_names)
+
+    def _delete_methods(content: str) -> Tuple[str, bool]:
+        nonlocal statuses
+        content, statuses = delete_methods_from_content(content, method_names)
+        return content, METHOD_REMOVED in statuses
 
     try:
-        if file_path.lower().endswith('.bin'):
-            was_modified, error_message = process_bin_file(file_path, _delete_method_from_content)
+        is_bin = file_path.lower().endswith('.bin')
+        if is_bin:
+            was_modified, error_message = process_bin_file(file_path, _delete_methods)
             if error_message:
                 print(f"!! {file_path}     {error_message}")
-            return was_modified
+                return [False] * len(method_names)
         else:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            with phase("read", file_path), open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 content = f.read()
-            
-            modified_content, method_found = _delete_method_from_content(content)
 
-            if method_found:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(modified_content)
-                return True
-            else:
+            with phase("transform", file_path):
+                modified_content, was_modified = _delete_methods(content)
+
+            if was_modified:
+                with phase("write", file_path):
+                    write_text(file_path, content, modified_content)
+
+        for method_name, status in zip(method_names, statuses):
+            if status == METHOD_EXPORTED:
+                print(f"!! {file_path}     Метод '{method_name}' НЕ удален - является экспортным")
+            elif status == METHOD_NOT_FOUND and not is_bin:
                 print(f"!! {file_path}     Метод не найден: {method_name}")
-                return False
-            
+
+        return [status == METHOD_REMOVED for status in statuses]
+
     except Exception as e:
         print(f"!!  {file_path}    Ошибка при обработке файла: {e}")
-        return False
+        return [False] * len(method_names)
+
+
+def remove_method_from_file(file_path: str, method_name: str) -> bool:
+    """
+    Удаляет метод из файла
+    
+    Args:
+        file_path: Путь к файлу
+        method_name: Имя метода для удаления
+        
+    Returns:
+        True если метод был удален, False если не найден
+    """
+    return remove_methods_from_file(file_path, [method_name])[0]
+
+
+def add_unreferenced_methods(methods_by_file: Dict[str, List[str]], finder: CodeFileFinder) -> List[MethodNode]:
+    """
+    Дополняет список удаления методами, которые станут неиспользуемыми после удаления методов из списка
+
+    Граф ссылок строится один раз; после удаления метода уменьшаются счетчики ссылок вызываемых
+    им методов, и неэкспортные методы без ссылок удаляются следом, пока такие находятся.
+
+    Args:
+        methods_by_file: Имена методов для удаления по файлам (дополняется на месте)
+        finder: Поисковик файлов
+
+    Returns:
+        Добавленные методы
+    """
+    print("Построение графа ссылок...")
+    graph = build_call_graph(".", finder)
+    for error in graph.errors:
+        print(error)
+
+    # Записи списка сопоставляются методам графа так же, как при удалении:
+    # повторная запись с тем же именем берет следующее вхождение
+    removed = []
+    file_by_module = {}
+    for file_path, method_names in methods_by_file.items():
+        module = graph.find_module(file_path)
+        if module is None:
+            continue
+        file_by_module[module] = file_path
+        next_match_idx: Dict[str, int] = {}
+        for method_name in method_names:
+            key = method_name.lower()
+            idx = next_match_idx.get(key, 0)
+            nodes = module.methods.get(key, [])
+            if idx < len(nodes) and not nodes[idx].export:
+                next_match_idx[key] = idx + 1
+                removed.append(nodes[idx])
+
+    found = graph.eliminate(removed)
+    for node in found:
+        file_path = file_by_module.setdefault(node.module, node.module.path)
+        methods_by_file.setdefault(file_path, []).append(node.name)
+        print(f"  + {node.module.object_path or node.module.path} \"{node.name}\"")
+    print(f"Методов без ссылок после удаления списка: {len(found)}")
+    print("=" * 80)
+    return found
 
 
 def main():
     """Основная функция"""
+    # --profile: сводка по фазам и самые медленные файлы
+    args = parse_profile_args(sys.argv[1:])
+    # --dry-run: файлы не изменяются, --diff ФАЙЛ: изменения в формате unified diff
+    args = parse_dry_run_args(args)
+    # --iterative: удалять и методы, которые станут неиспользуемыми
+    iterative = "--iterative" in args
     # Создаем экземпляр поисковика
     finder = CodeFileFinder()
     
     # Парсим файл с методами
-    file_path = ".\Refactoring1C\МетодыКУдалению.txt"
-    if not Path(file_path).exists():
+    file_path = Path(".") / "Refactoring1C" / "МетодыКУдалению.txt"
+    if not file_path.exists():
         print(f"Файл {file_path} не найден!")
         return
     
@@ -190,9 +261,11 @@ def main():
     print(f"Найдено {len(methods)} записей для обработки")
     print("=" * 80)
     
-    # Обрабатываем каждую запись
+    # Группируем записи по найденному файлу, чтобы каждый модуль
+    # читать, изменять и записывать только один раз
     processed_files = set()  # Множество уже обработанных файлов
     total_methods_removed = 0
+    methods_by_file: Dict[str, List[str]] = {}
     
     for i, (object_path, method_description, line_num) in enumerate(methods, 1):
         #print(f"[{i}/{len(methods)}] Обрабатываю: {object_path}")
@@ -209,23 +282,33 @@ def main():
             method_name = extract_method_name(method_description)
             if method_name:
                 #print(f"  Метод для удаления: {method_name}")
-                
-                # Удаляем метод из файла
-                if remove_method_from_file(file_path, method_name):
-                    total_methods_removed += 1
-                
+                methods_by_file.setdefault(file_path, []).append(method_name)
                 processed_files.add(file_path)
             else:
                 print(f"!! {object_path}  Не удалось извлечь имя метода из: {method_description}")
         else:
             print(f"!! {object_path}  ❌ Файл не найден")
     
+    transitive = []
+    if iterative:
+        transitive = add_unreferenced_methods(methods_by_file, finder)
+        processed_files.update(methods_by_file)
+
+    # Удаляем методы пофайлово
+    for file_path, method_names in methods_by_file.items():
+        removed = remove_methods_from_file(file_path, method_names)
+        total_methods_removed += sum(removed)
+    
     # Итоговая статистика
     print("=" * 80)
     print(f"ИТОГО:")
     print(f"  Обработано записей: {len(methods)}")
     print(f"  Обработано файлов: {len(processed_files)}")
     print(f"  Удалено методов: {total_methods_removed}")
+    if iterative:
+        print(f"  Добавлено к списку (--iterative): {len(transitive)}")
+    finish_dry_run()
+    report()
     
 
 
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Пробный запуск скриптов очистки: изменения в виде unified diff вместо записи файлов
+
+Ключи командной строки:
+  --dry-run          файлы (и Form.bin) не изменяются, новый текст вычисляется только в памяти
+  --diff ФАЙЛ        записать изменения в ФАЙЛ в формате unified diff ("-" - в стандартный вывод);
+                     без --dry-run diff пишется вместе с обычной записью файлов
+
+Для Form.bin в diff попадает текст модуля формы (путь вида .../Form.bin/module), контейнер
+при --dry-run не упаковывается. Скрипты записывают измененный текст через write_text(),
+а BinModuleSession проверяет is_dry_run() перед упаковкой.
+"""
+
+import difflib
+import io
+import os
+import sys
+from typing import List, Optional, Tuple
+
+# Суффикс пути модуля Form.bin в diff
+BIN_MODULE_SUFFIX = "/module"
+
+
+def _display_path(path: str) -> str:
+    """Путь в заголовке diff: относительно текущего каталога и с прямыми слешами."""
+    try:
+        path = os.path.relpath(path)
+    except ValueError:
+        pass
+    return path.replace(os.sep, '/')
+
+
+def format_diff(path: str, original: str, modified: str) -> str:
+    """Unified diff одного файла (с пометкой об отсутствии перевода строки в конце, как у git)."""
+    name = _display_path(path)
+    lines: List[str] = []
+    for line in difflib.unified_diff(original.splitlines(True), modified.splitlines(True),
+                                     f"a/{name}", f"b/{name}"):
+        if line.endswith('\n'):
+            lines.append(line)
+        else:
+            lines.append(line + "\n\\ No newline at end of file\n")
+    return "".join(lines)
+
+
+class DryRun:
+    """Состояние пробного запуска и поток, в который пишется diff"""
+
+    def __init__(self):
+        self.enabled = False
+        self.diff_path: Optional[str] = None
+        self.files = 0
+        self._stream = None
+
+    @property
+    def collects_diff(self) -> bool:
+        return self.diff_path is not None
+
+    def _open(self):
+        if self._stream is None:
+            if self.diff_path == '-':
+                # Текущий sys.stdout: вывод может быть перехвачен (BinJobPool, parallel_runner)
+                return sys.stdout
+            self._stream = open(self.diff_path, 'w', encoding='utf-8')
+        return self._stream
+
+    def write(self, text: str):
+        if text:
+            self._open().write(text)
+
+    def record(self, path: str, original: str, modified: str):
+        self.files += 1
+        if self.collects_diff:
+            self.write(format_diff(path, original, modified))
+
+    def close(self):
+        if self._stream is not None and self._stream is not sys.stdout:
+            self._stream.close()
+        self._stream = None
+
+
+DRY_RUN = DryRun()
+
+
+def is_dry_run() -> bool:
+    return DRY_RUN.enabled
+
+
+def enable(dry_run: bool = True, diff_path: Optional[str] = None):
+    DRY_RUN.enabled = dry_run
+    DRY_RUN.diff_path = diff_path
+
+
+def parse_dry_run_args(argv: List[str]) -> List[str]:
+    """
+    Извлекает из аргументов --dry-run и --diff ФАЙЛ
+
+    Returns:
+        Остальные аргументы
+    """
+    dry_run = False
+    diff_path = None
+    rest = []
+    i = 0
+    while i < len(argv):
+        option, _, value = argv[i].partition('=')
+        if option == '--dry-run':
+            dry_run = True
+        elif option == '--diff':
+            if not value and i + 1 < len(argv):
+                i += 1
+                value = argv[i]
+            diff_path = value or '-'
+        else:
+            rest.append(argv[i])
+        i += 1
+    enable(dry_run, diff_path)
+    if diff_path and diff_path != '-':
+        # Файл создается сразу, чтобы пустой diff тоже был виден
+        DRY_RUN._open()
+    return rest
+
+
+def record_change(path: str, original: str, modified: str):
+    """Отмечает изменение файла (или модуля Form.bin) и пишет его diff, если задан --diff."""
+    if DRY_RUN.enabled or DRY_RUN.collects_diff:
+        DRY_RUN.record(path, original, modified)
+
+
+def write_text(path: str, original: str, modified: str):
+    """Записывает измененный текст модуля; при --dry-run только выводит diff."""
+    record_change(path, original, modified)
+    if not DRY_RUN.enabled:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(modified)
+
+
+def worker_settings() -> Optional[Tuple[bool, Optional[str]]]:
+    """Настройки для процесса-обработчика (см. parallel_runner) или None, если режим выключен."""
+    if DRY_RUN.enabled or DRY_RUN.collects_diff:
+        return DRY_RUN.enabled, DRY_RUN.diff_path
+    return None
+
+
+def begin_capture(settings: Tuple[bool, Optional[str]]):
+    """В процессе-обработчике: diff копится в памяти и возвращается основному процессу."""
+    enable(*settings)
+    DRY_RUN.files = 0
+    DRY_RUN._stream = io.StringIO()
+
+
+def end_capture() -> Tuple[int, str]:
+    stream = DRY_RUN._stream
+    DRY_RUN._stream = None
+    return DRY_RUN.files, stream.getvalue()
+
+
+def merge_captured(captured: Tuple[int, str]):
+    """В основном процессе: добавляет diff процесса-обработчика (в порядке файлов)."""
+    files, text = captured
+    DRY_RUN.files += files
+    if DRY_RUN.collects_diff:
+        DRY_RUN.write(text)
+
+
+def finish():
+    """Закрывает файл diff и печатает итог пробного запуска."""
+    if not (DRY_RUN.enabled or DRY_RUN.collects_diff):
+        return
+    DRY_RUN.close()
+    if DRY_RUN.enabled:
+        print(f"Пробный запуск (--dry-run): файлы не изменялись, изменилось бы файлов: {DRY_RUN.files}")
+    if DRY_RUN.collects_diff and DRY_RUN.diff_path != '-':
+        print(f"Diff сохранен в файл: {DRY_RUN.diff_path}")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Общий обход каталогов выгрузки для всех скриптов (os.scandir)
+
+Служебные каталоги (.git, Refactoring1C, __pycache__, а также EXTRA_SKIP_DIRECTORIES и skip_dirs)
+отсекаются при спуске - в них обход не заходит. Файлы отбираются по расширению и особым именам
+(Form.bin) за один проход по дереву. С with_entries=True возвращаются os.DirEntry: размер и время
+изменения берутся из entry.stat() (на Windows - без повторного обращения к диску).
+
+Порядок файлов такой же, как у os.walk: файлы каталога, затем подкаталоги по порядку.
+"""
+
+import os
+from typing import Iterable, Iterator, Optional, Union
+
+# Каталоги, которые никогда не относятся к выгрузке (имена без учета регистра)
+SKIP_DIRECTORIES = {'.git', 'refactoring1c', '__pycache__'}
+
+# Каталоги, которые дополнительно пропускаются всеми скриптами (например, {'backup', 'old'})
+EXTRA_SKIP_DIRECTORIES = set()
+
+
+def iter_files(root, extensions: Optional[Iterable[str]] = None, names: Iterable[str] = (),
+               skip_dirs: Iterable[str] = (), with_entries: bool = False) -> Iterator[Union[str, os.DirEntry]]:
+    """
+    Перебирает файлы дерева каталогов
+
+    Args:
+        root: Корневой каталог
+        extensions: Расширения файлов ('.bsl', '.os', ...), None - все файлы
+        names: Особые имена файлов (например, 'Form.bin'), подходят независимо от расширения
+        skip_dirs: Имена каталогов, которые пропускаются в дополнение к SKIP_DIRECTORIES
+        with_entries: Возвращать os.DirEntry вместо путей
+
+    Returns:
+        Итератор путей (или os.DirEntry) подходящих файлов
+    """
+    skip = SKIP_DIRECTORIES | {name.lower() for name in EXTRA_SKIP_DIRECTORIES} | {name.lower() for name in skip_dirs}
+    if extensions is not None:
+        extensions = {extension.lower() for extension in extensions}
+    names = {name.lower() for name in names}
+
+    stack = [os.fspath(root)]
+    while stack:
+        files = []
+        subdirs = []
+        try:
+            # Каталог читается целиком до выдачи файлов: вызывающий код может создавать в нем файлы
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    name = entry.name.lower()
+                    if is_dir:
+                        if name not in skip:
+                            subdirs.append(entry.path)
+                    elif extensions is None or name in names or os.path.splitext(name)[1] in extensions:
+                        files.append(entry)
+        except OSError:
+            continue
+        for entry in files:
+            yield entry if with_entries else entry.path
+        stack.extend(reversed(subdirs))
@@ -11,39 +11,39 @@
 
 import os
 import re
-import glob
 import sys
 from pathlib import Path
 from bin_file_processor import process_bin_file
-from typing import Tuple
+from file_enumerator import iter_files
+from incremental import IncrementalFilter, parse_incremental_args
+from parallel_runner import parse_jobs_args, run_files
+from profiling import parse_profile_args, phase, report
+from dry_run import finish as finish_dry_run, parse_dry_run_args, write_text
+from bsl_lexer import LINE_ANNOTATION, classify_line, lex_lines
+from typing import Optional, Tuple
 
 # Константы
 MIN_COMMENT_BLOCK_LINES = 20 # Минимальное количество содержательных закомментированных строк в блоке для удаления
 
-# Regex для определения строк комментариев
-COMMENT_REGEX = re.compile(r'^\s*//')
-# Regex для определения пустых строк (включая строки только с пробелами)
-EMPTY_LINE_REGEX = re.compile(r'^\s*$')
-# Regex для определения объявлений процедур и функций
-METHOD_DECLARATION_REGEX = re.compile(r'^\s*(&\w+\s*)?(Процедура|Функция)\s+\w+')
+# Версия правила для манифеста инкрементального режима: увеличить при изменении логики очистки
+RULE_VERSION = "1"
+RULE_KEY = f"comments:{RULE_VERSION}:{MIN_COMMENT_BLOCK_LINES}"
+
+# Классы строк (комментарий, пустая строка, объявление метода, аннотация) определяет общий лексер bsl_lexer.py
 
 def is_comment(line):
     """Проверяет, является ли строка комментарием 1С."""
-    return bool(COMMENT_REGEX.match(line))
+    return classify_line(line).is_comment
 
 def is_empty_line(line):
     """Проверяет, является ли строка пустой (или содержит только пробелы)."""
-    return bool(EMPTY_LINE_REGEX.match(line))
+    return classify_line(line).is_blank
 
 def is_method_declaration(line):
     """Проверяет, является ли строка объявлением Процедуры или Функции.
     Игнорирует строки-комментарии (//...).
     """
-    l = line.lstrip()
-    # Не считать комментарии объявлениями методов
-    if l.startswith('//'):
-        return False
-    return bool(METHOD_DECLARATION_REGEX.match(l))
+    return classify_line(line).declares_method
 
 def count_commented_lines_in_block(lines, start_index, end_index):
     """
@@ -53,11 +53,12 @@ def count_commented_lines_in_block(lines, start_index, end_index):
     # поэтому считаем все строки блока целиком.
     return end_index - start_index + 1
 
-def expand_comment_block(lines, start_index, end_index):
+def expand_comment_block(tokens, start_index, end_index):
     """
     Расширяет блок закомментированного кода вверх и вниз,
     добавляя пустые строки и строки комментариев, пока не встретит код или описание метода.
     Не добавляет в блок первую пустую строку полученного блока, если такой нет - последнюю пустую строку.
+    tokens - поток лексера по строкам модуля (bsl_lexer.lex_lines).
     """
     expanded_start = start_index
     expanded_end = end_index
@@ -66,117 +67,142 @@ def expand_comment_block(lines, start_index, end_index):
     temp_start = start_index - 1
     first_empty_line_found_up = -1
     while temp_start >= 0:
-        line = lines[temp_start]
-        if is_method_declaration(line) or (not is_comment(line) and not is_empty_line(line)):
+        token = tokens[temp_start]
+        if token.declares_method or not token.is_blank_or_comment:
             break
-        if is_empty_line(line):
+        if token.is_blank:
             if first_empty_line_found_up == -1:
                 first_empty_line_found_up = temp_start
             expanded_start = temp_start
-        elif is_comment(line):
+        elif token.is_comment:
             expanded_start = temp_start
         temp_start -= 1
 
     # Если первая пустая строка была найдена и она не является первой строкой блока, исключаем её
-    if first_empty_line_found_up != -1 and first_empty_line_found_up == expanded_start and not is_comment(lines[first_empty_line_found_up + 1]):
+    if first_empty_line_found_up != -1 and first_empty_line_found_up == expanded_start and not tokens[first_empty_line_found_up + 1].is_comment:
         expanded_start += 1
 
     # Расширяем вниз
     temp_end = end_index + 1
     last_empty_line_found_down = -1
-    while temp_end < len(lines):
-        line = lines[temp_end]
-        if is_method_declaration(line) or (not is_comment(line) and not is_empty_line(line)):
+    while temp_end < len(tokens):
+        token = tokens[temp_end]
+        if token.declares_method or not token.is_blank_or_comment:
             break
-        if is_empty_line(line):
+        if token.is_blank:
             if last_empty_line_found_down == -1:
                 last_empty_line_found_down = temp_end
             expanded_end = temp_end
-        elif is_comment(line):
+        elif token.is_comment:
             expanded_end = temp_end
         temp_end += 1
 
     # Если последняя пустая строка была найдена и она не является последней строкой блока, исключаем её
-    if last_empty_line_found_down != -1 and last_empty_line_found_down == expanded_end and not is_comment(lines[last_empty_line_found_down - 1]):
+    if last_empty_line_found_down != -1 and last_empty_line_found_down == expanded_end and not tokens[last_empty_line_found_down - 1].is_comment:
         expanded_end -= 1
 
     return expanded_start, expanded_end
 
-def remove_commented_blocks(file_path: str) -> bool:
-    def _remove_comments_from_content(content: str) -> Tuple[str, bool]:
-        lines = content.splitlines(keepends=True)
-
-        new_lines = []
-        i = 0
-        changed = False
-        while i < len(lines):
-            line = lines[i]
-            if is_comment(line):
-                block_start = i
-                block_end = i
-                while block_end + 1 < len(lines) and (is_comment(lines[block_end + 1]) or is_empty_line(lines[block_end + 1])):
-                    block_end += 1
-
-                # Проверяем, является ли это комментарием метода
-                is_method_comment = False
-                # Блок не может быть шапкой метода, если его последняя строка пустая
-                if not is_empty_line(lines[block_end]):
-                    j = block_end + 1
-                    if j < len(lines):
-                        lj = lines[j].lstrip()
-                        if is_method_declaration(lines[j]):
+def _remove_comments_from_content(content: str) -> Tuple[str, bool]:
+    lines = content.splitlines(keepends=True)
+    tokens = lex_lines(lines)
+
+    new_lines = []
+    i = 0
+    changed = False
+    while i < len(lines):
+        line = lines[i]
+        if tokens[i].is_comment:
+            block_start = i
+            block_end = i
+            while block_end + 1 < len(lines) and tokens[block_end + 1].is_blank_or_comment:
+                block_end += 1
+
+            # Проверяем, является ли это комментарием метода
+            is_method_comment = False
+            # Блок не может быть шапкой метода, если его последняя строка пустая
+            if not tokens[block_end].is_blank:
+                j = block_end + 1
+                if j < len(lines):
+                    if tokens[j].declares_method:
+                        is_method_comment = True
+                    elif tokens[j].kind == LINE_ANNOTATION:
+                        # Допускаем один или несколько атрибутов перед объявлением метода
+                        k = j
+                        while k < len(lines) and tokens[k].kind == LINE_ANNOTATION:
+                            k += 1
+                        if k < len(lines) and tokens[k].declares_method:
                             is_method_comment = True
-                        elif lj.startswith('&'):
-                            # Допускаем один или несколько атрибутов перед объявлением метода
-                            k = j
-                            while k < len(lines) and lines[k].lstrip().startswith('&'):
-                                k += 1
-                            if k < len(lines) and is_method_declaration(lines[k]):
-                                is_method_comment = True
-
-                if not is_method_comment:
-                    num_commented_lines = count_commented_lines_in_block(lines, block_start, block_end)
-
-                    if num_commented_lines >= MIN_COMMENT_BLOCK_LINES:
-                        expanded_start, expanded_end = expand_comment_block(lines, block_start, block_end)
-                        print(f"  Found block to remove from line {expanded_start + 1} to {expanded_end + 1} with {num_commented_lines} commented lines")
-                        # Skip the removed block
-                        i = expanded_end + 1  
-                        changed = True
-                        continue
-
-            new_lines.append(line)
-            i += 1
-
-        return "".join(new_lines), changed
 
+            if not is_method_comment:
+                num_commented_lines = count_commented_lines_in_block(lines, block_start, block_end)
+
+                if num_commented_lines >= MIN_COMMENT_BLOCK_LINES:
+                    expanded_start, expanded_end = expand_comment_block(tokens, block_start, block_end)
+                    print(f"  Found block to remove from line {expanded_start + 1} to {expanded_end + 1} with {num_commented_lines} commented lines")
+                    # Skip the removed block
+                    i = expanded_end + 1  
+                    changed = True
+                    continue
+
+        new_lines.append(line)
+        i += 1
+
+    return "".join(new_lines), changed
+
+
+def _bin_result(file_path: str, was_modified: bool, error_message: Optional[str]) -> Optional[bool]:
+    """Результат обработки Form.bin (process_bin_file или BinJobPool при --bin-jobs)."""
+    if error_message:
+        print(f"!! {file_path}     {error_message}")
+        return None
+    return was_modified
+
+
+def remove_commented_blocks(file_path: str) -> Optional[bool]:
+    """Возвращает True, если файл изменен; None - при ошибке обработки Form.bin."""
     if file_path.lower().endswith('.bin'):
         # Only process form binaries
         if os.path.basename(file_path).lower() != 'form.bin':
             return False
-        was_modified, error_message = process_bin_file(file_path, _remove_comments_from_content)
-        if error_message:
-            print(f"!! {file_path}     {error_message}")
-        return was_modified
+        return _bin_result(file_path, *process_bin_file(file_path, _remove_comments_from_content))
     else:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        with phase("read", file_path), open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read()
 
-        modified_content, changed = _remove_comments_from_content(content)
+        with phase("transform", file_path):
+            modified_content, changed = _remove_comments_from_content(content)
 
         if changed:
             print(f"  Changes detected, writing to file: {file_path}")
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(modified_content)
+            with phase("write", file_path):
+                write_text(file_path, content, modified_content)
         return changed
 
 if __name__ == "__main__":
+    # --jobs N: обработка в N процессах, --bin-jobs N: отдельный предел для Form.bin
+    jobs, bin_jobs, args = parse_jobs_args(sys.argv[1:])
+    # --incremental: пропуск уже чистых файлов, --since <rev>: только файлы, измененные с коммита
+    incremental, since, args = parse_incremental_args(args)
+    # --profile: сводка по фазам и самые медленные файлы
+    args = parse_profile_args(args)
+    # --dry-run: файлы не изменяются, --diff ФАЙЛ: изменения в формате unified diff
+    parse_dry_run_args(args)
     target_path = Path.cwd() # Текущая директория
     print(f"Searching for 1C files in: {target_path}")
-    for file_path in glob.glob(str(target_path / "**/*.bin"), recursive=True):
-        remove_commented_blocks(file_path)
-    for file_path in glob.glob(str(target_path / "**/*.bsl"), recursive=True):
-        remove_commented_blocks(file_path)
-    for file_path in glob.glob(str(target_path / "**/*.os"), recursive=True):
-        remove_commented_blocks(file_path)
-    
+    file_filter = IncrementalFilter([RULE_KEY], incremental, since, str(target_path))
+    with phase("enumerate"):
+        file_paths = list(file_filter.filter(iter_files(target_path, {'.bin', '.bsl', '.os'})))
+    changed_files = 0
+    for file_path, changed in run_files(file_paths, remove_commented_blocks, jobs, bin_jobs,
+                                        (_remove_comments_from_content, _bin_result)):
+        file_filter.record(file_path, changed)
+        if changed:
+            changed_files += 1
+    print(f"Processed files: {len(file_paths)}")
+    print(f"Changed files: {changed_files}")
+    if file_filter.active:
+        print(f"Skipped files: {file_filter.skipped}")
+    file_filter.save()
+    finish_dry_run()
+    report()
@@ -11,47 +11,52 @@
 
 import os
 import re
-import glob
 import sys
 from pathlib import Path
 from bin_file_processor import process_bin_file
-from typing import Tuple
+from file_enumerator import iter_files
+from incremental import IncrementalFilter, parse_incremental_args
+from parallel_runner import parse_jobs_args, run_files
+from profiling import parse_profile_args, phase, report
+from dry_run import finish as finish_dry_run, parse_dry_run_args, write_text
+from bsl_lexer import classify_line, lex_lines
+from typing import Optional, Tuple
 
 # Константы
 MIN_EMPTY_LINES_BLOCK = 10 # Минимальное количество последовательных пустых строк в блоке для удаления
 
-# Regex для определения строк комментариев
-COMMENT_REGEX = re.compile(r'^\s*//')
-# Regex для определения пустых строк (включая строки только с пробелами)
-EMPTY_LINE_REGEX = re.compile(r'^\s*$')
-# Regex для определения объявлений процедур и функций
-METHOD_DECLARATION_REGEX = re.compile(r'^\s*(&\w+\s*)?(Процедура|Функция)\s+\w+')
+# Версия правила для манифеста инкрементального режима: увеличить при изменении логики очистки
+RULE_VERSION = "1"
+RULE_KEY = f"empty:{RULE_VERSION}:{MIN_EMPTY_LINES_BLOCK}"
+
+# Классы строк (пустая строка, комментарий, объявление метода) определяет общий лексер bsl_lexer.py
 
 def is_empty_line(line):
     """Проверяет, является ли строка пустой (или содержит только пробелы)."""
-    return bool(EMPTY_LINE_REGEX.match(line))
+    return classify_line(line).is_blank
 
 def is_comment(line):
     """Проверяет, является ли строка комментарием 1С."""
-    return bool(COMMENT_REGEX.match(line))
+    return classify_line(line).is_comment
 
 def is_method_declaration(line):
     """Проверяет, является ли строка объявлением Процедуры или Функции."""
-    return bool(METHOD_DECLARATION_REGEX.match(line))
+    return classify_line(line).declares_method
 
-def count_empty_lines_in_block(lines, start_index, end_index):
+def count_empty_lines_in_block(tokens, start_index, end_index):
     """Считает количество последовательных пустых строк в заданном блоке."""
     count = 0
     for i in range(start_index, end_index + 1):
-        if is_empty_line(lines[i]):
+        if tokens[i].is_blank:
             count += 1
     return count
 
-def expand_empty_block(lines, start_index, end_index):
+def expand_empty_block(tokens, start_index, end_index):
     """
     Расширяет блок пустых строк вверх и вниз,
     добавляя пустые строки и строки комментариев, пока не встретит код.
     Не добавляет в блок первую пустую строку полученного блока, если такой нет - последнюю пустую строку.
+    tokens - поток лексера по строкам модуля (bsl_lexer.lex_lines).
     """
     expanded_start = start_index
     expanded_end = end_index
@@ -59,17 +64,17 @@ def expand_empty_block(lines, start_index, end_index):
     # Расширяем вверх
     temp_start = start_index - 1
     while temp_start >= 0:
-        line = lines[temp_start]
-        if is_method_declaration(line) or (not is_empty_line(line) and not is_comment(line)):
+        token = tokens[temp_start]
+        if token.declares_method or not token.is_blank_or_comment:
             break  # Останавливаемся на коде или объявлении метода
         expanded_start = temp_start
         temp_start -= 1
 
     # Расширяем вниз
     temp_end = end_index + 1
-    while temp_end < len(lines):
-        line = lines[temp_end]
-        if is_method_declaration(line) or (not is_empty_line(line) and not is_comment(line)):
+    while temp_end < len(tokens):
+        token = tokens[temp_end]
+        if token.declares_method or not token.is_blank_or_comment:
             break  # Останавливаемся на коде или объявлении метода
         expanded_end = temp_end
         temp_end += 1
@@ -80,89 +85,112 @@ def expand_empty_block(lines, start_index, end_index):
 
     # Обрезаем ведущую пустую строку, если за ней следует "код"
     if expanded_start <= expanded_end and \
-       is_empty_line(lines[expanded_start]) and \
+       tokens[expanded_start].is_blank and \
        (expanded_start + 1 <= expanded_end) and \
-       not is_empty_line(lines[expanded_start + 1]) and \
-       not is_comment(lines[expanded_start + 1]) and \
-       not is_method_declaration(lines[expanded_start + 1]):
+       not tokens[expanded_start + 1].is_blank_or_comment and \
+       not tokens[expanded_start + 1].declares_method:
         expanded_start += 1
 
     # Обрезаем конечную пустую строку, если ей предшествует "код"
     if expanded_start <= expanded_end and \
-       is_empty_line(lines[expanded_end]) and \
+       tokens[expanded_end].is_blank and \
        (expanded_end - 1 >= expanded_start) and \
-       not is_empty_line(lines[expanded_end - 1]) and \
-       not is_comment(lines[expanded_end - 1]) and \
-       not is_method_declaration(lines[expanded_end - 1]):
+       not tokens[expanded_end - 1].is_blank_or_comment and \
+       not tokens[expanded_end - 1].declares_method:
         expanded_end -= 1
 
     return expanded_start, expanded_end
 
-def remove_empty_blocks(file_path: str) -> bool:
-    def _remove_empty_blocks_from_content(content: str) -> Tuple[str, bool]:
-        lines = content.splitlines(keepends=True)
-
-        new_lines = []
-        i = 0
-        changed = False
-        while i < len(lines):
-            line = lines[i]
-            if is_empty_line(line):
-                block_start = i
-                block_end = i
-                while block_end + 1 < len(lines) and (is_empty_line(lines[block_end + 1]) or is_comment(lines[block_end + 1])):
-                    block_end += 1
-
-                is_method_comment_block = False
-                j = block_end + 1
-                while j < len(lines) and (is_empty_line(lines[j]) or is_comment(lines[j])):
-                    j += 1
-                if j < len(lines) and is_method_declaration(lines[j]):
-                    is_method_comment_block = True
-
-                if not is_method_comment_block:
-                    num_empty_lines = count_empty_lines_in_block(lines, block_start, block_end)
-
-                    if num_empty_lines >= MIN_EMPTY_LINES_BLOCK:
-                        expanded_start, expanded_end = expand_empty_block(lines, block_start, block_end)
-                        print(f"  Found empty/comment block to remove from line {expanded_start + 1} to {expanded_end + 1} with {num_empty_lines} empty lines")
-                        i = expanded_end + 1  # Пропускаем удаленный блок
-                        changed = True
-                        continue
-
-            new_lines.append(line)
-            i += 1
-
-        return "".join(new_lines), changed
-
+def _remove_empty_blocks_from_content(content: str) -> Tuple[str, bool]:
+    lines = content.splitlines(keepends=True)
+    tokens = lex_lines(lines)
+
+    new_lines = []
+    i = 0
+    changed = False
+    while i < len(lines):
+        line = lines[i]
+        if tokens[i].is_blank:
+            block_start = i
+            block_end = i
+            while block_end + 1 < len(lines) and tokens[block_end + 1].is_blank_or_comment:
+                block_end += 1
+
+            is_method_comment_block = False
+            j = block_end + 1
+            while j < len(lines) and tokens[j].is_blank_or_comment:
+                j += 1
+            if j < len(lines) and tokens[j].declares_method:
+                is_method_comment_block = True
+
+            if not is_method_comment_block:
+                num_empty_lines = count_empty_lines_in_block(tokens, block_start, block_end)
+
+                if num_empty_lines >= MIN_EMPTY_LINES_BLOCK:
+                    expanded_start, expanded_end = expand_empty_block(tokens, block_start, block_end)
+                    print(f"  Found empty/comment block to remove from line {expanded_start + 1} to {expanded_end + 1} with {num_empty_lines} empty lines")
+                    i = expanded_end + 1  # Пропускаем удаленный блок
+                    changed = True
+                    continue
+
+        new_lines.append(line)
+        i += 1
+
+    return "".join(new_lines), changed
+
+
+def _bin_result(file_path: str, was_modified: bool, error_message: Optional[str]) -> Optional[bool]:
+    """Результат обработки Form.bin (process_bin_file или BinJobPool при --bin-jobs)."""
+    if error_message:
+        print(f"!! {file_path}     {error_message}")
+        return None
+    return was_modified
+
+
+def remove_empty_blocks(file_path: str) -> Optional[bool]:
+    """Возвращает True, если файл изменен; None - при ошибке обработки Form.bin."""
     if file_path.lower().endswith('.bin'):
         # Only process form binaries
         if os.path.basename(file_path).lower() != 'form.bin':
             return False
-        was_modified, error_message = process_bin_file(file_path, _remove_empty_blocks_from_content)
-        if error_message:
-            print(f"!! {file_path}     {error_message}")
-        return was_modified
+        return _bin_result(file_path, *process_bin_file(file_path, _remove_empty_blocks_from_content))
     else:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        with phase("read", file_path), open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read()
 
-        modified_content, changed = _remove_empty_blocks_from_content(content)
+        with phase("transform", file_path):
+            modified_content, changed = _remove_empty_blocks_from_content(content)
 
         if changed:
             print(f"  Changes detected, writing to file: {file_path}")
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(modified_content)
+            with phase("write", file_path):
+                write_text(file_path, content, modified_content)
         return changed
 
 if __name__ == "__main__":
+    # --jobs N: обработка в N процессах, --bin-jobs N: отдельный предел для Form.bin
+    jobs, bin_jobs, args = parse_jobs_args(sys.argv[1:])
+    # --incremental: пропуск уже чистых файлов, --since <rev>: только файлы, измененные с коммита
+    incremental, since, args = parse_incremental_args(args)
+    # --profile: сводка по фазам и самые медленные файлы
+    args = parse_profile_args(args)
+    # --dry-run: файлы не изменяются, --diff ФАЙЛ: изменения в формате unified diff
+    parse_dry_run_args(args)
     target_path = Path.cwd() # Текущая директория
     print(f"Searching for files in: {target_path}")
-    for file_path in glob.glob(str(target_path / "**/*.bsl"), recursive=True):
-        remove_empty_blocks(file_path)
-    for file_path in glob.glob(str(target_path / "**/*.prc"), recursive=True):
-        remove_empty_blocks(file_path)
-    for file_path in glob.glob(str(target_path / "**/*.os"), recursive=True):
-        remove_empty_blocks(file_path)
-    for file_path in glob.glob(str(target_path / "**/*.bin"), recursive=True):
-        remove_empty_blocks(file_path)
+    file_filter = IncrementalFilter([RULE_KEY], incremental, since, str(target_path))
+    with phase("enumerate"):
+        file_paths = list(file_filter.filter(iter_files(target_path, {'.bsl', '.prc', '.os', '.bin'})))
+    changed_files = 0
+    for file_path, changed in run_files(file_paths, remove_empty_blocks, jobs, bin_jobs,
+                                        (_remove_empty_blocks_from_content, _bin_result)):
+        file_filter.record(file_path, changed)
+        if changed:
+            changed_files += 1
+    print(f"Processed files: {len(file_paths)}")
+    print(f"Changed files: {changed_files}")
+    if file_filter.active:
+        print(f"Skipped files: {file_filter.skipped}")
+    file_filter.save()
+    finish_dry_run()
+    report()
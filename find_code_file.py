@@ -9,16 +9,22 @@ import re
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 
+from metadata_catalog import load_catalog
+from profiling import phase
+
 
 class CodeFileFinder:
     """Класс для поиска файлов кода по описанию объекта 1С"""
     
-    def __init__(self, base_path: str = None):
+    def __init__(self, base_path: str = None, catalog=None):
         """
         Инициализация
         
         Args:
             base_path: Базовый путь к конфигурации 1С
+            catalog: Каталог метаданных (metadata_catalog.MetadataCatalog): имя объекта берется
+                из него, без поиска подкаталога объекта. Если не задан - загружается от base_path
+                при первом обращении
         """
         if base_path is None:
             # По умолчанию ищем конфигурацию в родительской директории
@@ -31,6 +37,7 @@ class CodeFileFinder:
                 self.base_path = current_dir
         else:
             self.base_path = Path(base_path)
+        self._catalog = catalog
         
         # Маппинг для первого объекта: {русское_имя: каталог, английское_имя: каталог}
         self.first_object_mapping = {
@@ -134,7 +141,9 @@ class CodeFileFinder:
             "Форма": "Forms",
             "Form": "Forms",
             "Подсистема": "Subsystems",
-            "Subsystem": "Subsystems"
+            "Subsystem": "Subsystems",
+            "Команда": "Commands",
+            "Command": "Commands"
         }
         
         # Маппинг для последнего объекта: {русское_имя: [файлы], английское_имя: [файлы]}
@@ -170,6 +179,16 @@ class CodeFileFinder:
             "МодульСеанса": ["Ext/Module.bsl"],
             "SessionModule": ["Ext/Module.bsl"]
         }
+        
+        # Кэш содержимого каталогов: {каталог: ({имя: (путь, это_каталог)}, {имя_в_нижнем_регистре: (путь, это_каталог)})}
+        self._dir_cache: Dict[Path, Tuple[Dict[str, Tuple[Path, bool]], Dict[str, Tuple[Path, bool]]]] = {}
+        # Кэш результатов поиска: {описание_объекта: [файлы]}
+        self._find_cache: Dict[str, List[str]] = {}
+    
+    def clear_cache(self):
+        """Сбрасывает кэш каталогов и результатов (если структура каталогов изменилась)"""
+        self._dir_cache.clear()
+        self._find_cache.clear()
     
     def find_code_file(self, object_path: str) -> List[str]:
         """
@@ -184,10 +203,24 @@ class CodeFileFinder:
         if not object_path:
             return []
         
+        cached = self._find_cache.get(object_path)
+        if cached is None:
+            with phase("resolve"):
+                cached = self._find_code_file(object_path)
+            self._find_cache[object_path] = cached
+        return list(cached)
+    
+    def _find_code_file(self, object_path: str) -> List[str]:
+        """Поиск файла кода без учета кэша результатов (см. find_code_file)"""
         # Проверяем, является ли object_path прямым путем к файлу
-        potential_file_path = self.base_path / object_path
-        if potential_file_path.exists() and potential_file_path.is_file():
-            return [str(potential_file_path)]
+        if Path(object_path).is_absolute():
+            potential_file_path = Path(object_path)
+            if potential_file_path.is_file():
+                return [str(potential_file_path)]
+        else:
+            potential_file = self._resolve_relative(self.base_path, object_path)
+            if potential_file and not potential_file[1]:
+                return [str(potential_file[0])]
 
         # Разбиваем путь на объекты
         objects = object_path.split('.')
@@ -212,6 +245,11 @@ class CodeFileFinder:
         
         # Обрабатываем промежуточные объекты
         i = 1
+        metadata_object = self._catalog_object(main_catalog, objects)
+        if metadata_object is not None:
+            # Имя каталога объекта - из каталога метаданных
+            current_path = current_path / metadata_object.name
+            i = 2
         while i < len(objects) - 1:
             obj = objects[i]
             #print(f"DEBUG: Обрабатываем промежуточный объект: {obj}")
@@ -259,8 +297,9 @@ class CodeFileFinder:
             for file_path in files_to_check:
                 full_path = current_path / file_path
                 #print(f"DEBUG: Проверяем файл: {full_path}")
-                if full_path.exists():
-                    found_files.append(str(full_path))
+                found = self._resolve_relative(current_path, file_path)
+                if found:
+                    found_files.append(str(found[0]))
                     #print(f"DEBUG: Файл найден: {full_path}")
                 #else:
                     #print(f"DEBUG: Файл не найден: {full_path}")
@@ -275,6 +314,84 @@ class CodeFileFinder:
         print(f"DEBUG: Последний объект '{last_object}' не является специальным именем")
         return []
     
+    @property
+    def catalog(self):
+        """Каталог метаданных выгрузки (загружается при первом обращении)."""
+        if self._catalog is None:
+            self._catalog = load_catalog(self.base_path)
+        return self._catalog
+
+    @catalog.setter
+    def catalog(self, catalog):
+        self._catalog = catalog
+
+    def _catalog_object(self, main_catalog: str, objects: List[str]):
+        """Объект каталога метаданных для второго элемента описания (если он не последний)."""
+        if not main_catalog or len(objects) < 3:
+            return None
+        return self.catalog.find(main_catalog, objects[1])
+    
+    def _list_directory(self, dir_path: Path) -> Tuple[Dict[str, Tuple[Path, bool]], Dict[str, Tuple[Path, bool]]]:
+        """
+        Содержимое каталога, прочитанное один раз за время жизни объекта
+        
+        Args:
+            dir_path: Путь к каталогу
+            
+        Returns:
+            Кортеж словарей ({имя: (путь, это_каталог)}, {имя_в_нижнем_регистре: (путь, это_каталог)})
+        """
+        listing = self._dir_cache.get(dir_path)
+        if listing is None:
+            children: Dict[str, Tuple[Path, bool]] = {}
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        children[entry.name] = (dir_path / entry.name, is_dir)
+            except OSError:
+                pass
+            listing = (children, {name.lower(): child for name, child in children.items()})
+            self._dir_cache[dir_path] = listing
+        return listing
+    
+    def _find_child(self, parent_path: Path, name: str) -> Optional[Tuple[Path, bool]]:
+        """
+        Поиск элемента каталога по имени: сначала точное совпадение, затем без учета регистра
+        
+        Returns:
+            Кортеж (путь, это_каталог) или None
+        """
+        children, children_lower = self._list_directory(parent_path)
+        child = children.get(name)
+        if child is None:
+            child = children_lower.get(name.lower())
+        return child
+    
+    def _resolve_relative(self, parent_path: Path, relative_path: str) -> Optional[Tuple[Path, bool]]:
+        """
+        Поиск файла или каталога по относительному пути через кэш каталогов (без exists())
+        
+        Returns:
+            Кортеж (путь, это_каталог) или None
+        """
+        parts = Path(relative_path).parts
+        if '..' in parts:
+            # Переход к родителю по листингам каталогов не найти - проверяем путь как есть
+            path = parent_path / relative_path
+            return (path, path.is_dir()) if path.exists() else None
+        current = (parent_path, True)
+        for part in parts:
+            if not current[1]:
+                return None
+            current = self._find_child(current[0], part)
+            if current is None:
+                return None
+        return current
+    
     def _find_subdirectory(self, parent_path: Path, subdir_name: str) -> Optional[Path]:
         """
         Поиск подкаталога по имени
@@ -286,13 +403,9 @@ class CodeFileFinder:
         Returns:
             Путь к найденному подкаталогу или None
         """
-        if not parent_path.exists() or not parent_path.is_dir():
-            return None
-        
-        # Ищем подкаталог с точным совпадением имени
-        for item in parent_path.iterdir():
-            if item.is_dir() and item.name == subdir_name:
-                return item
+        child = self._find_child(parent_path, subdir_name)
+        if child and child[1]:
+            return child[0]
         
         return None
     
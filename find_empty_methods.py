@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск пустых методов без конфигуратора: создает ПустыеМетодыКУдалению.txt
+
+Каждый модуль выгрузки разбирается лексером один раз (граф ссылок call_graph.py). Пустым считается
+неэкспортный метод, в теле которого только комментарии, пустые строки и аннотации. В список
+для delete_empty_metods.py попадают:
+    Справочник.Имя.МодульОбъекта Пустой обработчик: "ПередЗаписью"   - обработчик события платформы
+    ОбщийМодуль.Имя.Модуль Пустой метод: "ИмяМетода"                 - метод без ссылок
+
+Пустые методы, на которые есть ссылки (вызовы из кода, обработчики событий формы в Form.xml/Form.bin,
+подписок, регламентных заданий, операций в XML объекта), удалять нельзя без правки ссылки - они
+выводятся с пометкой "!!" и в список не попадают (с ключом --bound попадают и привязанные обработчики).
+
+Запуск из корня выгрузки:
+    python Refactoring1C/find_empty_methods.py [каталог] [--bound] [--output файл]
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+from call_graph import BOUND_PLATFORM_EVENT, MethodNode, build_call_graph
+from find_unused_methods import save_methods_file
+from profiling import parse_profile_args, report
+
+OUTPUT_FILE_NAME = "ПустыеМетодыКУдалению.txt"
+
+
+def describe_empty(node: MethodNode) -> str:
+    """Строка списка в формате конфигуратора."""
+    kind = "Пустой обработчик" if node.bound is not None else "Пустой метод"
+    return f'{node.module.object_path} {kind}: "{node.name}"'
+
+
+def find_empty_methods(graph) -> List[MethodNode]:
+    """Пустые неэкспортные методы всех модулей (в порядке модулей и строк)."""
+    return [node for node in graph.iter_methods() if node.entry.empty and not node.export]
+
+
+def main():
+    """Основная функция"""
+    # --profile: сводка по фазам и самые медленные файлы
+    args = parse_profile_args(sys.argv[1:])
+    include_bound = False
+    output_file = Path(".") / "Refactoring1C" / OUTPUT_FILE_NAME
+    rest = []
+    i = 0
+    while i < len(args):
+        option, _, value = args[i].partition('=')
+        if option == '--bound':
+            include_bound = True
+        elif option == '--output':
+            if not value and i + 1 < len(args):
+                i += 1
+                value = args[i]
+            output_file = Path(value)
+        else:
+            rest.append(args[i])
+        i += 1
+    root = rest[0] if rest else os.getcwd()
+
+    print(f"Поиск пустых методов: {root}")
+    graph = build_call_graph(root)
+    for error in graph.errors:
+        print(error)
+
+    lines = []
+    called = 0
+    bound = 0
+    skipped = 0
+    for node in find_empty_methods(graph):
+        if not node.module.object_path:
+            skipped += 1
+            continue
+        if node.callers:
+            # Вызов пустого метода остался бы в коде без определения
+            called += 1
+            continue
+        if node.bound not in (None, BOUND_PLATFORM_EVENT):
+            bound += 1
+            print(f'!! {node.module.path}     Пустой метод "{node.name}": {node.bound}')
+            if not include_bound:
+                continue
+        lines.append(describe_empty(node))
+    save_methods_file(lines, output_file)
+
+    print("=" * 80)
+    print(f"ИТОГО:")
+    print(f"  Модулей: {len(graph.modules)}")
+    print(f"  Пустых методов в списке: {len(lines)}")
+    print(f"  Пустых методов, вызываемых из кода: {called}")
+    if include_bound:
+        print(f"  Из них привязанных обработчиков (--bound): {bound}")
+    else:
+        print(f"  Привязанных обработчиков (не записаны, см. --bound): {bound}")
+    if skipped:
+        print(f"  Не записаны (модуль без описания объекта): {skipped}")
+    print(f"Результаты сохранены в файл: {output_file}")
+    report()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,41 +2,36 @@
 # -*- coding: utf-8 -*-
 """
 Скрипт для поиска и подсчета использования объектов в проекте 1С
+
+Кроме количества вхождений имени целым словом (с переменными, реквизитами и комментариями
+с тем же именем) подсчитываются типизированные ссылки на объект (object_references.py):
+Справочники.Имя, Справочник.Имя, СправочникСсылка.Имя, cfg:CatalogRef.Имя, ОбщийМодуль.Метод().
+В object_usage_statistics.csv - количество ссылок по видам, в object_references.csv - по файлам.
 """
 
 import os
 import re
 import csv
+import sys
 from pathlib import Path
-from typing import List, Dict, Set
-
-def get_object_names_from_xml_files(root_path: str) -> Dict[str, Path]:
-    """
-    Находит все XML файлы в каталогах первого уровня и извлекает имена объектов.
-    Возвращает словарь: имя_объекта -> путь_к_XML_файлу
-    """
-    object_name_to_path: Dict[str, Path] = {}
-    root_path = Path(root_path)
-    
-    # Проходим по всем каталогам первого уровня
-    for first_level_dir in root_path.iterdir():
-        if not first_level_dir.is_dir():
-            continue
-            
-        # Ищем XML файлы в каталогах первого уровня
-        for xml_file in first_level_dir.glob("*.xml"):
-            # Извлекаем имя файла без расширения
-            object_name = xml_file.stem
-            object_name_to_path[object_name] = xml_file
-    
-    return object_name_to_path
+from typing import List, Dict, Optional, Set, Tuple
+from aho_corasick import IdentifierMatcher
+from identifier_index import IdentifierIndex, read_source_text
+from bin_text_cache import BIN_TEXT_CACHE, read_form_module_text
+from file_enumerator import iter_files
+from metadata_catalog import MetadataObject, load_catalog
+from object_references import REFERENCE_KINDS, ObjectReferences, ReferenceExtractor, collect_references
+from profiling import parse_profile_args, phase, report
 
-def should_skip_directory(dir_path: Path) -> bool:
+def get_metadata_objects(root_path: str) -> List[MetadataObject]:
     """
-    Проверяет, нужно ли пропустить директорию
+    Объекты метаданных из XML в каталогах первого уровня (вид, имя, синоним, подчиненные объекты).
+    Каталог метаданных сохраняется между запусками, перечитываются только изменившиеся XML
     """
-    dir_name = dir_path.name.lower()
-    return dir_name in ['.git', 'refactoring1c', '__pycache__']
+    catalog = load_catalog(root_path)
+    for error in catalog.errors:
+        print(error)
+    return catalog.objects()
 
 def search_object_in_file(file_path: Path, object_name: str) -> int:
     """
@@ -45,9 +40,11 @@ def search_object_in_file(file_path: Path, object_name: str) -> int:
     try:
         # Определяем способ открытия файла в зависимости от расширения
         if file_path.name == 'Form.bin':
-            # Для Form.bin файлов используем специальный режим
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            # Для Form.bin ищем в тексте модуля формы (контейнер сжат)
+            content, err = read_form_module_text(str(file_path))
+            if err:
+                print(f"Ошибка при чтении файла {file_path}: {err}")
+                return 0
         else:
             # Для остальных файлов используем обычное чтение
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -64,69 +61,106 @@ def search_object_in_file(file_path: Path, object_name: str) -> int:
         print(f"Ошибка при чтении файла {file_path}: {e}")
         return 0
 
-def count_object_usage(root_path: str, object_names: List[str]) -> Dict[str, int]:
+def build_corpus(files_to_search: List[Path]) -> List[str]:
+    """
+    Читает каждый файл один раз и приводит текст к нижнему регистру один раз.
+    Возвращает список текстов (без склейки в одну строку) в порядке файлов:
+    для непрочитанного файла - пустая строка
+    """
+    corpus: List[str] = []
+    
+    for i, file_path in enumerate(files_to_search, 1):
+        if i % 1000 == 0:
+            print(f"  Обработано файлов: {i}/{len(files_to_search)}")
+            
+        with phase("read", str(file_path)):
+            # Тот же способ чтения, что и у индекса (--index): Form.bin - текст модуля из кэша
+            content, err = read_source_text(file_path)
+        if err:
+            print(f"Ошибка при чтении файла {file_path}: {err}")
+            corpus.append("")
+            continue
+        corpus.append(content.lower())
+    
+    return corpus
+
+def count_word_occurrences(corpus: List[str], object_names: List[str]) -> Dict[str, int]:
+    """
+    Подсчитывает вхождения имен целыми словами (как \\b в search_object_in_file).
+    Все имена ищутся одним автоматом за один проход по каждому тексту корпуса
+    """
+    with phase("match"):
+        matcher = IdentifierMatcher(object_names)
+        return matcher.count_all(corpus, folded=True)
+
+def count_object_usage(root_path: str, object_names: List[str],
+                       extractor: Optional[ReferenceExtractor] = None) -> Tuple[Dict[str, int], Optional[ObjectReferences]]:
     """
     Подсчитывает использование каждого объекта в проекте (оптимизированная версия)
+    
+    Returns:
+        Кортеж (количество вхождений имен, типизированные ссылки или None без extractor)
     """
-    usage_counts = {}
     root_path = Path(root_path)
     
     # Сначала собираем все файлы для поиска (оптимизация)
     print("Сбор файлов для поиска...")
-    files_to_search = []
     
     # Поддерживаемые расширения файлов
     supported_extensions = {'.os', '.xml', '.bsl'}
     
-    for file_path in root_path.rglob("*"):
-        # Пропускаем директории
-        if file_path.is_dir():
-            continue
-            
-        # Пропускаем файлы в исключаемых директориях
-        if any(should_skip_directory(parent) for parent in file_path.parents):
-            continue
-            
-        # Проверяем расширение файла
-        if file_path.suffix.lower() in supported_extensions:
-            files_to_search.append(file_path)
-        elif file_path.name == 'Form.bin':
-            files_to_search.append(file_path)
+    # Служебные каталоги (.git, Refactoring1C, ...) пропускаются при обходе
+    with phase("enumerate"):
+        files_to_search = [Path(path) for path in iter_files(root_path, supported_extensions, {'Form.bin'})]
     
     print(f"Найдено файлов для поиска: {len(files_to_search)}")
     
     # Создаем общий индекс всех объектов для быстрого поиска
     print("Создание индекса для быстрого поиска...")
-    all_content = ""
-    
-    for i, file_path in enumerate(files_to_search, 1):
-        if i % 1000 == 0:
-            print(f"  Обработано файлов: {i}/{len(files_to_search)}")
-            
-        try:
-            if file_path.name == 'Form.bin':
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-            else:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-            
-            # Добавляем содержимое в общий индекс
-            all_content += content + "\n"
-            
-        except Exception as e:
-            print(f"Ошибка при чтении файла {file_path}: {e}")
-            continue
+    corpus = build_corpus(files_to_search)
+    # Все Form.bin прочитаны - записи кэша для удаленных и измененных форм больше не нужны
+    BIN_TEXT_CACHE.prune()
     
     print("Поиск объектов в общем индексе...")
+    word_counts = count_word_occurrences(corpus, object_names)
+    
+    references = None
+    if extractor is not None:
+        # Тексты корпуса уже прочитаны - ссылки ищутся по ним же, без повторного чтения файлов
+        print("Поиск типизированных ссылок...")
+        references = collect_references(
+            extractor, [(file_path.relative_to(root_path).as_posix(), text)
+                        for file_path, text in zip(files_to_search, corpus)])
+    
+    return limit_usage_counts(object_names, word_counts), references
+
+def count_object_usage_indexed(root_path: str, object_names: List[str], object_name_to_path: Dict[str, Path]) -> Dict[str, int]:
+    """
+    Подсчитывает использование объектов по постоянному индексу идентификаторов.
+    Индекс обновляется инкрементально - перечитываются только изменившиеся файлы
+    """
+    with IdentifierIndex() as index:
+        print(f"Обновление индекса: {index.index_path}")
+        with phase("read"):
+            stats = index.update(root_path)
+        print(f"  Переиндексировано файлов: {stats['indexed']}, без изменений: {stats['unchanged']}, удалено: {stats['removed']}")
+        index.set_objects(object_name_to_path)
+        with phase("match"):
+            word_counts = index.count_identifiers(object_names)
+    
+    return limit_usage_counts(object_names, word_counts)
+
+def limit_usage_counts(object_names: List[str], word_counts: Dict[str, int]) -> Dict[str, int]:
+    """
+    Ограничивает количество использований до 100 и выводит результат по каждому объекту
+    """
+    usage_counts = {}
     
-    # Теперь ищем каждый объект в общем индексе
     for i, object_name in enumerate(object_names, 1):
         if i % 5 == 0:
             print(f"Обработано объектов: {i}/{len(object_names)}")
             
-        # Используем простой поиск строки вместо регулярных выражений для скорости
-        count = all_content.lower().count(object_name.lower())
+        count = word_counts[object_name]
         
         # Ограничиваем результат до 100+ если слишком много
         if count > 100:
@@ -139,25 +173,51 @@ def count_object_usage(root_path: str, object_names: List[str]) -> Dict[str, int
     
     return usage_counts
 
-def save_results_to_csv(usage_counts: Dict[str, int], object_name_to_path: Dict[str, Path], output_file: str):
+def save_results_to_csv(usage_counts: Dict[str, int], objects: List[MetadataObject], root_path: Path, output_file: str,
+                        references: Optional[ObjectReferences] = None):
     """
-    Сохраняет результаты в CSV файл
+    Сохраняет результаты в CSV файл (строка на каждый объект, объекты разных видов с одним именем - отдельно).
+    Колонки типизированных ссылок заполняются, если ссылки подсчитаны (без --index)
     """
     with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
         
         # Записываем заголовки
-        writer.writerow(['Имя объекта', 'Путь к XML', 'Количество использований'])
+        writer.writerow(['Имя объекта', 'Путь к XML', 'Количество использований', 'Вид объекта',
+                         'Типизированных ссылок'] + [f'Ссылки: {kind}' for kind in REFERENCE_KINDS]
+                        + ['Ссылок из своих файлов', 'Ссылающихся файлов'])
         
         # Записываем данные
-        for object_name, count in sorted(usage_counts.items(), key=lambda x: x[1], reverse=True):
-            xml_path = str(object_name_to_path.get(object_name, ''))
-            writer.writerow([object_name, xml_path, count])
+        for obj in sorted(objects, key=lambda obj: usage_counts.get(obj.name, 0), reverse=True):
+            xml_path = str(Path(root_path) / obj.xml_path)
+            row = [obj.name, xml_path, usage_counts.get(obj.name, 0), obj.kind]
+            if references is not None:
+                row += ([references.total(obj)] + [references.kind_count(obj, kind) for kind in REFERENCE_KINDS]
+                        + [references.own[obj], len(references.files(obj))])
+            else:
+                row += [''] * (len(REFERENCE_KINDS) + 3)
+            writer.writerow(row)
+
+def save_references_to_csv(references: ObjectReferences, objects: List[MetadataObject], output_file: str):
+    """
+    Сохраняет типизированные ссылки по файлам: строка на объект, вид ссылки и ссылающийся файл
+    """
+    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['Вид объекта', 'Имя объекта', 'Вид ссылки', 'Файл', 'Количество'])
+        for obj in objects:
+            file_counts = references.by_file.get(obj)
+            if not file_counts:
+                continue
+            for (rel_path, kind), count in sorted(file_counts.items()):
+                writer.writerow([obj.kind, obj.name, kind, rel_path, count])
 
 def main():
     """
     Основная функция
     """
+    # --profile: сводка по фазам и самые медленные файлы
+    args = parse_profile_args(sys.argv[1:])
     # Путь к корню проекта (на два уровня выше папки Refactoring1C)
     project_root = Path(__file__).parent.parent
     
@@ -165,7 +225,11 @@ def main():
     
     # Получаем список имен объектов из XML файлов
     print("Извлечение имен объектов из XML файлов...")
-    object_name_to_path = get_object_names_from_xml_files(project_root)
+    with phase("enumerate"):
+        objects = get_metadata_objects(project_root)
+    object_name_to_path: Dict[str, Path] = {}
+    for obj in objects:
+        object_name_to_path.setdefault(obj.name, project_root / obj.xml_path)
     object_names = list(object_name_to_path.keys())
     
     print(f"Найдено объектов: {len(object_names)}")
@@ -175,23 +239,36 @@ def main():
     
     # Подсчитываем использование каждого объекта
     print("Подсчет использования объектов...")
-    usage_counts = count_object_usage(project_root, object_names)
+    references = None
+    if "--index" in args:
+        # Индекс хранит только идентификаторы - типизированные ссылки по нему не подсчитываются
+        usage_counts = count_object_usage_indexed(project_root, object_names, object_name_to_path)
+    else:
+        usage_counts, references = count_object_usage(project_root, object_names, ReferenceExtractor(objects))
     
     # Сохраняем результаты в CSV файл
     output_file = Path(__file__).parent / "object_usage_statistics.csv"
-    save_results_to_csv(usage_counts, object_name_to_path, output_file)
+    save_results_to_csv(usage_counts, objects, project_root, output_file, references)
     
     print(f"Результаты сохранены в файл: {output_file}")
+    if references is not None:
+        references_file = Path(__file__).parent / "object_references.csv"
+        save_references_to_csv(references, objects, references_file)
+        print(f"Ссылки по файлам сохранены в файл: {references_file}")
     
     # Выводим статистику
-    total_objects = len(usage_counts)
-    objects_with_usage = sum(1 for count in usage_counts.values() if count > 0)
+    total_objects = len(objects)
+    objects_with_usage = sum(1 for obj in objects if usage_counts.get(obj.name, 0) > 0)
     max_usage = max(usage_counts.values()) if usage_counts else 0
     
     print(f"\nСтатистика:")
     print(f"Всего объектов: {total_objects}")
     print(f"Объектов с использованием: {objects_with_usage}")
     print(f"Максимальное количество использований: {max_usage}")
+    if references is not None:
+        print(f"Объектов без типизированных ссылок из других файлов: "
+              f"{sum(1 for obj in objects if not references.total(obj))}")
+    report()
 
 if __name__ == "__main__":
     main()
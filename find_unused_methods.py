@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Поиск неиспользуемых методов без конфигуратора: создает МетодыКУдалению.txt
+
+По модулям выгрузки строится граф ссылок (call_graph.py), методы без ссылок и без привязок
+записываются в формате проверки конфигуратора, который читает delete_metods.py:
+    ОбщийМодуль.Имя.Модуль Не обнаружено ссылок на процедуру: "ИмяМетода"
+
+Запуск из корня выгрузки:
+    python Refactoring1C/find_unused_methods.py [каталог] [--export] [--output файл]
+
+  --export   включать экспортные методы (delete_metods.py их не удаляет, по умолчанию не выводятся)
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+from call_graph import MethodNode, build_call_graph
+from profiling import parse_profile_args, report
+
+OUTPUT_FILE_NAME = "МетодыКУдалению.txt"
+
+
+def describe_unused(node: MethodNode) -> str:
+    """Строка списка в формате конфигуратора."""
+    kind = "функцию" if node.entry.function else "процедуру"
+    return f'{node.module.object_path} Не обнаружено ссылок на {kind}: "{node.name}"'
+
+
+def save_methods_file(lines: List[str], output_file: Path):
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + "\n")
+
+
+def main():
+    """Основная функция"""
+    # --profile: сводка по фазам и самые медленные файлы
+    args = parse_profile_args(sys.argv[1:])
+    include_export = False
+    output_file = Path(".") / "Refactoring1C" / OUTPUT_FILE_NAME
+    rest = []
+    i = 0
+    while i < len(args):
+        option, _, value = args[i].partition('=')
+        if option == '--export':
+            include_export = True
+        elif option == '--output':
+            if not value and i + 1 < len(args):
+                i += 1
+                value = args[i]
+            output_file = Path(value)
+        else:
+            rest.append(args[i])
+        i += 1
+    root = rest[0] if rest else os.getcwd()
+
+    print(f"Построение графа ссылок: {root}")
+    graph = build_call_graph(root)
+    for error in graph.errors:
+        print(error)
+
+    unused = graph.unreferenced(include_export)
+    skipped = [node for node in unused if not node.module.object_path]
+    lines = [describe_unused(node) for node in unused if node.module.object_path]
+    save_methods_file(lines, output_file)
+
+    print("=" * 80)
+    print(f"ИТОГО:")
+    print(f"  Модулей: {len(graph.modules)}")
+    print(f"  Методов: {sum(len(module.nodes) for module in graph.modules)}")
+    print(f"  Неиспользуемых методов: {len(lines)}")
+    if skipped:
+        print(f"  Не записаны (модуль без описания объекта): {len(skipped)}")
+    print(f"Результаты сохранены в файл: {output_file}")
+    report()
+
+
+if __name__ == "__main__":
+    main()
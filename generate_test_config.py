@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Генератор синтетической выгрузки конфигурации 1С для замеров производительности
+
+Создает дерево каталогов как у выгрузки в файлы: Configuration.xml, Catalogs, Documents,
+CommonModules, EventSubscriptions, ScheduledJobs с XML объектов, модулями Ext/*.bsl,
+управляемыми формами (Form.xml + Ext/Form/Module.bsl) и обычными формами (Ext/Form.bin).
+Модули содержат длинные методы, вложенные Если/Попытка/Циклы, код после Возврат,
+большие закомментированные блоки, серии пустых строк, пустые и неиспользуемые методы.
+Рядом (в Refactoring1C) записываются МетодыКУдалению.txt и ПустыеМетодыКУдалению.txt
+в формате проверки конфигурации.
+
+Запуск:
+    python generate_test_config.py <каталог> [--objects N] [--seed S]
+"""
+
+import os
+import random
+import sys
+import uuid
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from v8container import FILE_HEADER, V8_DEFAULT_PAGE_SIZE, V8_FF_SIGNATURE, V8Container, V8Element, deflate
+
+NEWLINE = "\r\n"
+
+WORDS = ["Товар", "Склад", "Заказ", "Клиент", "Договор", "Партнер", "Цена", "Остаток", "Оплата", "Поставка",
+         "Сотрудник", "Проект", "Задача", "Счет", "Касса", "Банк", "Валюта", "Номенклатура", "Упаковка", "Маршрут"]
+VERBS = ["Заполнить", "Проверить", "Рассчитать", "Получить", "Обновить", "Записать", "Сформировать", "Обработать",
+         "Загрузить", "Выгрузить", "Установить", "Очистить"]
+
+# Доля объектов каждого вида в выгрузке
+OBJECT_KINDS = [
+    # (вид в описании объекта, каталог, вид в XML, доля)
+    ("Справочник", "Catalogs", "Catalog", 0.4),
+    ("Документ", "Documents", "Document", 0.35),
+    ("ОбщийМодуль", "CommonModules", "CommonModule", 0.25),
+]
+# Модули объектов: имя в описании объекта -> файл
+OBJECT_MODULES = [("МодульОбъекта", "ObjectModule.bsl"), ("МодульМенеджера", "ManagerModule.bsl")]
+# События формы: имя события -> имя обработчика
+FORM_EVENTS = [("OnCreateAtServer", "ПриСозданииНаСервере"), ("OnOpen", "ПриОткрытии"),
+               ("BeforeWrite", "ПередЗаписью"), ("OnClose", "ПриЗакрытии")]
+
+
+def _uuid(r: random.Random) -> str:
+    return str(uuid.UUID(int=r.getrandbits(128), version=4))
+
+
+def _synonym(name: str) -> str:
+    return (f"<Synonym><v8:item><v8:lang>ru</v8:lang><v8:content>{name}</v8:content></v8:item></Synonym>")
+
+
+def _metadata_xml(body: str) -> str:
+    return ('<?xml version="1.0" encoding="UTF-8"?>' + NEWLINE +
+            '<MetaDataObject xmlns="http://v8.1c.ru/8.3/MDClasses" xmlns:v8="http://v8.1c.ru/8.1/data/core" '
+            'xmlns:xr="http://v8.1c.ru/8.3/xcf/readable" xmlns:cfg="http://v8.1c.ru/8.1/data/enterprise/current-config" '
+            'xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+            'version="2.17">' + NEWLINE + body + NEWLINE + '</MetaDataObject>' + NEWLINE)
+
+
+def _write_text(path: Path, text: str, bom: bool = True):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8-sig' if bom else 'utf-8', newline='') as f:
+        f.write(text)
+
+
+def _element_header(name: str) -> bytes:
+    return b'\0' * 20 + name.encode('utf-16-le') + b'\0' * 4
+
+
+def make_form_bin(form_text: str, module_text: str) -> bytes:
+    """Контейнер обычной формы: элементы form и module (сжатые deflate, как у платформы)."""
+    elements = [V8Element(name, _element_header(name), deflate(data.encode('utf-8')))
+                for name, data in (("form", form_text), ("module", module_text))]
+    return V8Container(FILE_HEADER.pack(V8_FF_SIGNATURE, V8_DEFAULT_PAGE_SIZE, 0, 0), elements).to_bytes()
+
+
+class ModuleBuilder:
+    """Генератор текста одного модуля"""
+
+    def __init__(self, r: random.Random, calls: List[str], object_refs: List[str]):
+        """
+        Args:
+            r: Генератор случайных чисел
+            calls: Вызовы, которые можно вставлять в код (Метод или ОбщийМодуль.Метод)
+            object_refs: Обращения к объектам (Справочники.Имя, Документы.Имя)
+        """
+        self.r = r
+        self.calls = calls
+        self.object_refs = object_refs
+        self.lines: List[str] = []
+        self.var = 0
+
+    def _statement(self, indent: str) -> List[str]:
+        r = self.r
+        roll = r.random()
+        self.var += 1
+        if roll < 0.15 and self.calls:
+            return [f"{indent}{r.choice(self.calls)}(Параметры);"]
+        if roll < 0.22 and self.object_refs:
+            return [f"{indent}Объект{self.var} = {r.choice(self.object_refs)}.СоздатьЭлемент();"]
+        if roll < 0.3:
+            return [f"{indent}// {r.choice(VERBS)} {r.choice(WORDS).lower()} перед записью"]
+        if roll < 0.34:
+            return [f'{indent}Запрос.Текст = "ВЫБРАТЬ',
+                    f'{indent}|   Таблица.Ссылка КАК Ссылка',
+                    f'{indent}|ИЗ',
+                    f'{indent}|   Справочник.{r.choice(WORDS)} КАК Таблица";']
+        if roll < 0.38:
+            return [f'{indent}Сообщить("Возврат; // {r.choice(WORDS)}");']
+        return [f"{indent}Переменная{self.var} = Переменная{r.randint(0, self.var)} + {r.randint(1, 99)};"]
+
+    def _block(self, depth: int, count: int) -> List[str]:
+        r = self.r
+        indent = "\t" * depth
+        lines = []
+        for _ in range(count):
+            roll = r.random()
+            if depth < 4 and roll < 0.1:
+                lines.append(f"{indent}Если Условие{r.randint(1, 9)} Тогда")
+                lines += self._block(depth + 1, r.randint(1, 5))
+                if r.random() < 0.4:
+                    lines.append(f"{indent}Иначе")
+                    lines += self._block(depth + 1, r.randint(1, 3))
+                lines.append(f"{indent}КонецЕсли;")
+            elif depth < 4 and roll < 0.15:
+                lines.append(f"{indent}Попытка")
+                lines += self._block(depth + 1, r.randint(1, 4))
+                lines.append(f"{indent}Исключение")
+                lines.append(f"{indent}\tЗаписьЖурналаРегистрации(ОписаниеОшибки());")
+                lines.append(f"{indent}КонецПопытки;")
+            elif depth < 4 and roll < 0.19:
+                lines.append(f"{indent}Для Каждого Элемент Из Коллекция Цикл")
+                lines += self._block(depth + 1, r.randint(1, 4))
+                if r.random() < 0.3:
+                    lines.append(f"{indent}\tВозврат;")
+                lines.append(f"{indent}КонецЦикла;")
+            else:
+                lines += self._statement(indent)
+        return lines
+
+    def comment_block(self, size: int) -> List[str]:
+        """Закомментированный старый код."""
+        return ["//" + line for line in self._block(1, size)][:size]
+
+    def method(self, name: str, export: bool = False, empty: bool = False, function: bool = False,
+               annotation: str = "", params: str = "", size: int = 20, dead_tail: bool = False) -> List[str]:
+        r = self.r
+        kind, end = ("Функция", "КонецФункции") if function else ("Процедура", "КонецПроцедуры")
+        lines = []
+        if r.random() < 0.5:
+            lines += ["// " + f"{r.choice(VERBS)} {r.choice(WORDS).lower()}.", "//",
+                      "// Параметры:", "//  Параметры - Структура - параметры обработки."]
+        if annotation:
+            lines.append(annotation)
+        lines.append(f"{kind} {name}({params}){' Экспорт' if export else ''}")
+        if empty:
+            lines += ["\t// Обработчик оставлен для совместимости", ""][:r.randint(0, 2)]
+        else:
+            lines += self._block(1, size)
+            if r.random() < 0.1:
+                lines += [""] * r.randint(10, 14)
+                lines += self._block(1, 3)
+            if r.random() < 0.1:
+                lines += self.comment_block(r.randint(20, 35))
+            if function:
+                lines.append("\tВозврат Результат;")
+            if dead_tail:
+                lines.append("\tВозврат;" if not function else "\tВозврат Неопределено;")
+                lines += self._block(1, r.randint(2, 6))
+        lines.append(end)
+        lines.append("")
+        return lines
+
+
+class ConfigGenerator:
+    """Генератор выгрузки конфигурации"""
+
+    def __init__(self, root: Path, objects: int = 100, seed: int = 0):
+        """
+        Args:
+            root: Каталог выгрузки (будет создан)
+            objects: Количество объектов метаданных (справочники, документы, общие модули)
+            seed: Зерно генератора (одинаковые параметры дают одинаковое дерево)
+        """
+        self.root = Path(root)
+        self.objects = objects
+        self.r = random.Random(seed)
+        self.dead_methods: List[str] = []
+        self.empty_methods: List[str] = []
+        self.stats: Dict[str, int] = {"objects": 0, "modules": 0, "forms": 0, "form_bins": 0, "methods": 0,
+                                      "files": 0, "bytes": 0}
+        self.children: List[Tuple[str, str]] = []
+
+    def _write(self, path: Path, text: str):
+        _write_text(path, text)
+        self.stats["files"] += 1
+        self.stats["bytes"] += path.stat().st_size
+
+    def _names(self) -> List[Tuple[str, str, str, str]]:
+        """Список объектов: (вид в описании, каталог, вид в XML, имя)."""
+        result = []
+        used = set()
+        for kind, folder, xml_kind, share in OBJECT_KINDS:
+            for _ in range(max(1, int(self.objects * share))):
+                while True:
+                    name = f"{self.r.choice(WORDS)}{self.r.choice(WORDS)}{self.r.randint(1, 9999)}"
+                    if name not in used:
+                        used.add(name)
+                        break
+                result.append((kind, folder, xml_kind, name))
+        return result
+
+    def generate(self) -> Dict[str, int]:
+        """Создает дерево и списки методов к удалению; возвращает статистику."""
+        r = self.r
+        objects = self._names()
+        common_modules = [name for kind, _, _, name in objects if kind == "ОбщийМодуль"]
+        object_refs = [("Справочники." if kind == "Справочник" else "Документы.") + name
+                       for kind, _, _, name in objects if kind != "ОбщийМодуль"]
+
+        # Экспортные методы общих модулей (вызываются из других модулей, подписок и регламентных заданий)
+        exported: Dict[str, List[str]] = {
+            module: [f"{r.choice(VERBS)}{r.choice(WORDS)}{i}" for i in range(r.randint(3, 8))]
+            for module in common_modules
+        }
+        external_calls = [f"{module}.{method}" for module, methods in exported.items() for method in methods]
+        handlers = [(module, methods[-1]) for module, methods in exported.items()]
+
+        for kind, folder, xml_kind, name in objects:
+            self.stats["objects"] += 1
+            self.children.append((xml_kind, name))
+            if kind == "ОбщийМодуль":
+                self._common_module(folder, xml_kind, name, exported[name], external_calls, object_refs)
+            else:
+                self._object(kind, folder, xml_kind, name, external_calls, object_refs)
+
+        for idx, (module, method) in enumerate(handlers):
+            if idx % 2 == 0:
+                self._event_subscription(f"Подписка{idx}", module, method)
+            else:
+                self._scheduled_job(f"Задание{idx}", module, method)
+
+        self._configuration()
+        refactoring = self.root / "Refactoring1C"
+        _write_text(refactoring / "МетодыКУдалению.txt", "\n".join(self.dead_methods) + "\n", bom=False)
+        _write_text(refactoring / "ПустыеМетодыКУдалению.txt", "\n".join(self.empty_methods) + "\n", bom=False)
+        self.stats["dead_methods"] = len(self.dead_methods)
+        self.stats["empty_methods"] = len(self.empty_methods)
+        return self.stats
+
+    def _module_text(self, description: str, calls: List[str], object_refs: List[str],
+                     exported: List[str] = (), handlers: List[str] = (), on_server: bool = False) -> str:
+        """Текст модуля; неиспользуемые и пустые методы попадают в списки к удалению."""
+        r = self.r
+        local = [f"{r.choice(VERBS)}{r.choice(WORDS)}Локально{i}" for i in range(r.randint(2, 6))]
+        builder = ModuleBuilder(r, local + r.sample(calls, min(len(calls), 5)), object_refs)
+        lines = ["#Область СлужебныеПроцедурыИФункции", ""]
+        annotation = "&НаСервере" if on_server else ""
+
+        for name in handlers:
+            empty = r.random() < 0.3
+            lines += builder.method(name, empty=empty, annotation=annotation, params="Отказ", size=r.randint(3, 12))
+            if empty:
+                self.empty_methods.append(f'{description} Пустой обработчик: "{name}"')
+        for name in exported:
+            lines += builder.method(name, export=True, function=r.random() < 0.5, params="Параметры",
+                                    size=r.randint(10, 40), dead_tail=r.random() < 0.2)
+        for name in local:
+            lines += builder.method(name, annotation=annotation, function=r.random() < 0.4, params="Параметры",
+                                    size=r.randint(5, 60), dead_tail=r.random() < 0.25)
+            if r.random() < 0.1:
+                lines += [""] * r.randint(10, 16)
+            if r.random() < 0.1:
+                lines += builder.comment_block(r.randint(20, 40)) + [""]
+        for i in range(r.randint(0, 3)):
+            function = r.random() < 0.4
+            name = f"Неиспользуемая{r.choice(WORDS)}{i}"
+            lines += builder.method(name, annotation=annotation, function=function, size=r.randint(5, 30))
+            self.dead_methods.append(
+                f'{description} Не обнаружено ссылок на {"функцию" if function else "процедуру"}: "{name}"')
+        lines += ["#КонецОбласти", ""]
+        self.stats["methods"] += sum(1 for line in lines if line.startswith(("Процедура ", "Функция ")))
+        self.stats["modules"] += 1
+        return NEWLINE.join(lines)
+
+    def _object(self, kind: str, folder: str, xml_kind: str, name: str, calls: List[str], object_refs: List[str]):
+        r = self.r
+        base = self.root / folder
+        form_name = "ФормаЭлемента" if kind == "Справочник" else "ФормаДокумента"
+        attributes = "".join(
+            f'<Attribute uuid="{_uuid(r)}"><Properties><Name>Реквизит{i}</Name>'
+            f'<Type><v8:Type>cfg:CatalogRef.{r.choice(object_refs).split(".", 1)[1]}</v8:Type></Type>'
+            f'</Properties></Attribute>' for i in range(r.randint(1, 5)))
+        self._write(base / f"{name}.xml", _metadata_xml(
+            f'\t<{xml_kind} uuid="{_uuid(r)}"><Properties><Name>{name}</Name>{_synonym(name)}</Properties>'
+            f'<ChildObjects>{attributes}<Form>{form_name}</Form>'
+            f'<Command uuid="{_uuid(r)}"><Properties><Name>Печать</Name></Properties></Command>'
+            f'</ChildObjects></{xml_kind}>'))
+
+        for module_kind, file_name in OBJECT_MODULES:
+            text = self._module_text(f"{kind}.{name}.{module_kind}", calls, object_refs)
+            self._write(base / name / "Ext" / file_name, text)
+
+        # Форма объекта: управляемая (Form.xml + Module.bsl) или обычная (Form.bin)
+        form_dir = base / name / "Forms"
+        self._write(form_dir / f"{form_name}.xml", _metadata_xml(
+            f'\t<Form uuid="{_uuid(r)}"><Properties><Name>{form_name}</Name>{_synonym(form_name)}'
+            f'<FormType>{"Ordinary" if r.random() < 0.2 else "Managed"}</FormType></Properties></Form>'))
+        events = r.sample(FORM_EVENTS, r.randint(1, len(FORM_EVENTS)))
+        description = f"{kind}.{name}.Форма.{form_name}.Форма"
+        module_text = self._module_text(description, calls, object_refs,
+                                        handlers=[handler for _, handler in events], on_server=True)
+        events_xml = "".join(f'<Event name="{event}">{handler}</Event>' for event, handler in events)
+        form_xml = ('<?xml version="1.0" encoding="UTF-8"?>' + NEWLINE +
+                    '<Form xmlns="http://v8.1c.ru/8.3/xcf/logform" version="2.17">' + NEWLINE +
+                    f'\t<Events>{events_xml}</Events>' + NEWLINE + '</Form>' + NEWLINE)
+        if r.random() < 0.2:
+            data = make_form_bin(form_xml, module_text)
+            path = form_dir / form_name / "Ext" / "Form.bin"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            self.stats["files"] += 1
+            self.stats["bytes"] += len(data)
+            self.stats["form_bins"] += 1
+        else:
+            self._write(form_dir / form_name / "Ext" / "Form.xml", form_xml)
+            self._write(form_dir / form_name / "Ext" / "Form" / "Module.bsl", module_text)
+        self.stats["forms"] += 1
+
+    def _common_module(self, folder: str, xml_kind: str, name: str, exported: List[str],
+                       calls: List[str], object_refs: List[str]):
+        r = self.r
+        base = self.root / folder
+        self._write(base / f"{name}.xml", _metadata_xml(
+            f'\t<{xml_kind} uuid="{_uuid(r)}"><Properties><Name>{name}</Name>{_synonym(name)}'
+            f'<Server>true</Server></Properties></{xml_kind}>'))
+        own = {f"{name}.{method}" for method in exported}
+        text = self._module_text(f"ОбщийМодуль.{name}.Модуль", [call for call in calls if call not in own],
+                                 object_refs, exported=exported)
+        self._write(base / name / "Ext" / "Module.bsl", text)
+
+    def _event_subscription(self, name: str, module: str, method: str):
+        self.children.append(("EventSubscription", name))
+        self._write(self.root / "EventSubscriptions" / f"{name}.xml", _metadata_xml(
+            f'\t<EventSubscription uuid="{_uuid(self.r)}"><Properties><Name>{name}</Name>{_synonym(name)}'
+            f'<Source><v8:Type>cfg:CatalogObject</v8:Type></Source><Event>BeforeWrite</Event>'
+            f'<Handler>CommonModule.{module}.{method}</Handler></Properties></EventSubscription>'))
+
+    def _scheduled_job(self, name: str, module: str, method: str):
+        self.children.append(("ScheduledJob", name))
+        self._write(self.root / "ScheduledJobs" / f"{name}.xml", _metadata_xml(
+            f'\t<ScheduledJob uuid="{_uuid(self.r)}"><Properties><Name>{name}</Name>{_synonym(name)}'
+            f'<MethodName>CommonModule.{module}.{method}</MethodName><Use>true</Use></Properties></ScheduledJob>'))
+
+    def _configuration(self):
+        children = "".join(f"<{kind}>{name}</{kind}>" for kind, name in self.children)
+        self._write(self.root / "Configuration.xml", _metadata_xml(
+            f'\t<Configuration uuid="{_uuid(self.r)}"><Properties><Name>СинтетическаяКонфигурация</Name>'
+            f'</Properties><ChildObjects>{children}</ChildObjects></Configuration>'))
+
+
+def generate_configuration(root: str, objects: int = 100, seed: int = 0) -> Dict[str, int]:
+    """
+    Создает синтетическую выгрузку конфигурации
+
+    Args:
+        root: Каталог выгрузки
+        objects: Количество объектов метаданных
+        seed: Зерно генератора
+
+    Returns:
+        Статистика: объекты, модули, формы, методы, файлы, байты, методы к удалению
+    """
+    return ConfigGenerator(Path(root), objects, seed).generate()
+
+
+def main():
+    """Основная функция"""
+    args = sys.argv[1:]
+    objects = 100
+    seed = 0
+    rest = []
+    i = 0
+    while i < len(args):
+        if args[i] in ("--objects", "--seed") and i + 1 < len(args):
+            if args[i] == "--objects":
+                objects = int(args[i + 1])
+            else:
+                seed = int(args[i + 1])
+            i += 2
+            continue
+        rest.append(args[i])
+        i += 1
+    if not rest:
+        print("Укажите каталог для выгрузки: python generate_test_config.py <каталог> [--objects N] [--seed S]")
+        return
+    root = rest[0]
+    if os.path.exists(root) and os.listdir(root):
+        print(f"Каталог {root} не пуст")
+        return
+    stats = generate_configuration(root, objects, seed)
+    print(f"Создана выгрузка: {root}")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
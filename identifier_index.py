@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Постоянный индекс идентификаторов выгрузки конфигурации 1С (SQLite)
+
+Хранит для каждого идентификатора (в нижнем регистре) вхождения (файл, строка, количество)
+по текстам .bsl, .os, .xml и модулям Form.bin, а также соответствие объект -> XML.
+Обновляется инкрементально: файл перечитывается только если изменились его mtime/размер,
+а токенизируется заново только если изменился SHA-256 содержимого.
+
+Запуск (построение/обновление индекса):
+    python "Refactoring1C\\identifier_index.py" [каталог_выгрузки]
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bin_text_cache import read_form_module_text
+from file_enumerator import iter_files
+
+# Версия токенизатора: при изменении правил разбора индекс перестраивается полностью
+INDEX_VERSION = "1"
+
+INDEX_FILE_NAME = "identifier_index.sqlite"
+
+# Поддерживаемые расширения файлов
+SUPPORTED_EXTENSIONS = {'.os', '.xml', '.bsl'}
+SPECIAL_FILE_NAMES = {'Form.bin'}
+
+# Regex для разбиения текста на идентификаторы
+WORD_REGEX = re.compile(r'\w+')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS identifiers (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS occurrences (
+    identifier_id INTEGER NOT NULL,
+    file_id INTEGER NOT NULL,
+    line INTEGER NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS occurrences_identifier ON occurrences(identifier_id);
+CREATE INDEX IF NOT EXISTS occurrences_file ON occurrences(file_id);
+CREATE TABLE IF NOT EXISTS objects (name TEXT PRIMARY KEY, xml_path TEXT NOT NULL);
+"""
+
+
+def default_index_path() -> Path:
+    """Файл индекса хранится рядом со скриптами."""
+    return Path(__file__).parent / INDEX_FILE_NAME
+
+
+def iter_indexed_files(root_path: Path) -> Iterator[os.DirEntry]:
+    """Перебирает файлы для индексации (служебные каталоги пропускаются при обходе)."""
+    return iter_files(root_path, SUPPORTED_EXTENSIONS, SPECIAL_FILE_NAMES, with_entries=True)
+
+
+def tokenize_text(text: str) -> Dict[Tuple[str, int], int]:
+    """
+    Разбивает текст на идентификаторы
+
+    Returns:
+        Словарь (идентификатор_в_нижнем_регистре, номер_строки) -> количество
+    """
+    occurrences: Counter = Counter()
+    for line_num, line in enumerate(text.lower().splitlines(), 1):
+        for word in WORD_REGEX.findall(line):
+            occurrences[(word, line_num)] += 1
+    return occurrences
+
+
+def read_source_text(file_path: Path, data: Optional[bytes] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Текст файла для поиска имен - один и тот же для индекса и для find_object_usage без --index:
+    для Form.bin текст модуля формы, остальные файлы - UTF-8 (файл с ошибкой декодирования пропускается)
+
+    Args:
+        file_path: Путь к файлу
+        data: Содержимое файла, если уже прочитано
+
+    Returns:
+        Кортеж (текст, ошибка)
+    """
+    if file_path.name in SPECIAL_FILE_NAMES:
+        return read_form_module_text(str(file_path), data)
+    try:
+        if data is None:
+            data = file_path.read_bytes()
+        return data.decode('utf-8'), None
+    except (OSError, UnicodeDecodeError) as e:
+        return None, str(e)
+
+
+def read_indexed_text(file_path: Path, data: bytes) -> Optional[str]:
+    """Текст файла для индексации (см. read_source_text)."""
+    text, err = read_source_text(file_path, data)
+    if err:
+        print(f"Ошибка при чтении файла {file_path}: {err}")
+    return text
+
+
+class IdentifierIndex:
+    """Индекс идентификаторов в SQLite"""
+
+    def __init__(self, index_path: Optional[Path] = None):
+        """
+        Открывает (создает) индекс
+
+        Args:
+            index_path: Путь к файлу SQLite (по умолчанию рядом со скриптами)
+        """
+        self.index_path = Path(index_path) if index_path else default_index_path()
+        self.conn = sqlite3.connect(str(self.index_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.executescript(SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != INDEX_VERSION:
+            self._reset()
+
+    def _reset(self):
+        """Очищает индекс (при смене версии токенизатора)."""
+        with self.conn:
+            for table in ("occurrences", "identifiers", "files", "objects"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (INDEX_VERSION,))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def update(self, root_path: str) -> Dict[str, int]:
+        """
+        Инкрементально обновляет индекс по каталогу выгрузки
+
+        Args:
+            root_path: Корень выгрузки конфигурации
+
+        Returns:
+            Статистика: просмотрено/переиндексировано/без изменений/удалено файлов
+        """
+        root_path = Path(root_path)
+        stats = {"scanned": 0, "indexed": 0, "unchanged": 0, "removed": 0}
+        known = {
+            path: (file_id, mtime_ns, size, sha256)
+            for file_id, path, mtime_ns, size, sha256 in self.conn.execute(
+                "SELECT id, path, mtime_ns, size, sha256 FROM files")
+        }
+        identifier_ids: Dict[str, int] = dict(self.conn.execute("SELECT name, id FROM identifiers"))
+        seen = set()
+
+        with self.conn:
+            for dir_entry in iter_indexed_files(root_path):
+                file_path = Path(dir_entry.path)
+                stats["scanned"] += 1
+                if stats["scanned"] % 1000 == 0:
+                    print(f"  Просмотрено файлов: {stats['scanned']}")
+                rel_path = str(file_path.relative_to(root_path))
+                seen.add(rel_path)
+                try:
+                    st = dir_entry.stat()
+                except OSError:
+                    continue
+
+                entry = known.get(rel_path)
+                if entry and entry[1] == st.st_mtime_ns and entry[2] == st.st_size:
+                    stats["unchanged"] += 1
+                    continue
+
+                try:
+                    data = file_path.read_bytes()
+                except OSError as e:
+                    print(f"Ошибка при чтении файла {file_path}: {e}")
+                    continue
+                sha256 = hashlib.sha256(data).hexdigest()
+
+                if entry and entry[3] == sha256:
+                    # Содержимое не изменилось - обновляем только отметку времени
+                    self.conn.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                                      (st.st_mtime_ns, st.st_size, entry[0]))
+                    stats["unchanged"] += 1
+                    continue
+
+                if entry:
+                    file_id = entry[0]
+                    self.conn.execute("DELETE FROM occurrences WHERE file_id = ?", (file_id,))
+                    self.conn.execute("UPDATE files SET mtime_ns = ?, size = ?, sha256 = ? WHERE id = ?",
+                                      (st.st_mtime_ns, st.st_size, sha256, file_id))
+                else:
+                    file_id = self.conn.execute(
+                        "INSERT INTO files (path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)",
+                        (rel_path, st.st_mtime_ns, st.st_size, sha256)).lastrowid
+
+                text = read_indexed_text(file_path, data)
+                if text:
+                    rows = []
+                    for (word, line_num), count in tokenize_text(text).items():
+                        identifier_id = identifier_ids.get(word)
+                        if identifier_id is None:
+                            identifier_id = self.conn.execute(
+                                "INSERT INTO identifiers (name) VALUES (?)", (word,)).lastrowid
+                            identifier_ids[word] = identifier_id
+                        rows.append((identifier_id, file_id, line_num, count))
+                    self.conn.executemany(
+                        "INSERT INTO occurrences (identifier_id, file_id, line, count) VALUES (?, ?, ?, ?)", rows)
+                stats["indexed"] += 1
+
+            for rel_path, entry in known.items():
+                if rel_path not in seen:
+                    self.conn.execute("DELETE FROM occurrences WHERE file_id = ?", (entry[0],))
+                    self.conn.execute("DELETE FROM files WHERE id = ?", (entry[0],))
+                    stats["removed"] += 1
+
+        return stats
+
+    def set_objects(self, object_name_to_path: Dict[str, Path]):
+        """Сохраняет соответствие объект -> путь к XML."""
+        with self.conn:
+            self.conn.execute("DELETE FROM objects")
+            self.conn.executemany("INSERT OR REPLACE INTO objects (name, xml_path) VALUES (?, ?)",
+                                  [(name, str(path)) for name, path in object_name_to_path.items()])
+
+    def get_objects(self) -> Dict[str, Path]:
+        """Соответствие объект -> путь к XML из индекса."""
+        return {name: Path(xml_path) for name, xml_path in self.conn.execute("SELECT name, xml_path FROM objects")}
+
+    def count_identifiers(self, names: List[str]) -> Dict[str, int]:
+        """
+        Количество вхождений каждого имени (целым словом, без учета регистра)
+
+        Args:
+            names: Имена для подсчета
+
+        Returns:
+            Словарь имя -> количество вхождений
+        """
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (name TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM wanted")
+            self.conn.executemany("INSERT OR IGNORE INTO wanted (name) VALUES (?)", [(name.lower(),) for name in names])
+            totals = dict(self.conn.execute(
+                "SELECT w.name, SUM(o.count) FROM wanted w JOIN identifiers i ON i.name = w.name "
+                "JOIN occurrences o ON o.identifier_id = i.id GROUP BY w.name"))
+        return {name: totals.get(name.lower(), 0) for name in names}
+
+    def find_occurrences(self, name: str) -> List[Tuple[str, int, int]]:
+        """
+        Места использования идентификатора
+
+        Returns:
+            Список кортежей (путь_к_файлу, номер_строки, количество)
+        """
+        return self.conn.execute(
+            "SELECT f.path, o.line, o.count FROM identifiers i "
+            "JOIN occurrences o ON o.identifier_id = i.id JOIN files f ON f.id = o.file_id "
+            "WHERE i.name = ? ORDER BY f.path, o.line", (name.lower(),)).fetchall()
+
+
+def main():
+    """Основная функция"""
+    root_path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent.parent
+    print(f"Обновление индекса идентификаторов: {root_path}")
+    with IdentifierIndex() as index:
+        stats = index.update(root_path)
+    print(f"Просмотрено файлов: {stats['scanned']}")
+    print(f"Переиндексировано: {stats['indexed']}")
+    print(f"Без изменений: {stats['unchanged']}")
+    print(f"Удалено из индекса: {stats['removed']}")
+
+
+if __name__ == "__main__":
+    main()
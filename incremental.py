@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Инкрементальный режим скриптов очистки
+
+  --incremental  - пропускать файлы, которые уже были проверены правилом и оказались чистыми.
+                   Манифест (clean_manifest.json рядом со скриптами) хранит для каждого файла
+                   mtime, размер, SHA-256 содержимого и ключи правил (имя:версия:параметры),
+                   для которых файл чист. Изменение содержимого сбрасывает отметки.
+  --since <rev>  - обрабатывать только файлы, измененные с указанного коммита git
+                   (включая незакоммиченные и новые неотслеживаемые файлы).
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE_NAME = "clean_manifest.json"
+
+
+def default_manifest_path() -> Path:
+    """Манифест хранится рядом со скриптами."""
+    return Path(__file__).parent / MANIFEST_FILE_NAME
+
+
+def _path_key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def file_sha256(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def parse_incremental_args(argv: List[str]) -> Tuple[bool, Optional[str], List[str]]:
+    """
+    Извлекает из аргументов командной строки --incremental и --since <rev>
+
+    Returns:
+        Кортеж (incremental, since, остальные_аргументы)
+    """
+    incremental = False
+    since = None
+    rest = []
+    i = 0
+    while i < len(argv):
+        option, _, value = argv[i].partition('=')
+        if option == '--incremental':
+            incremental = True
+        elif option == '--since':
+            if not value and i + 1 < len(argv):
+                i += 1
+                value = argv[i]
+            since = value or None
+        else:
+            rest.append(argv[i])
+        i += 1
+    return incremental, since, rest
+
+
+def changed_files_since(rev: str, root: str) -> Optional[Set[str]]:
+    """
+    Файлы, измененные с коммита rev: diff с рабочим деревом плюс новые неотслеживаемые файлы
+
+    Returns:
+        Множество ключей путей (см. _path_key) или None, если git не смог ответить
+    """
+    cwd = root if os.path.isdir(root) else os.path.dirname(os.path.abspath(root))
+    try:
+        top = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=cwd,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        diff = subprocess.run(["git", "-c", "core.quotepath=off", "diff", "--name-only", "--no-renames", rev, "--"],
+                              cwd=top, capture_output=True, text=True, encoding='utf-8', check=True).stdout
+        untracked = subprocess.run(["git", "-c", "core.quotepath=off", "ls-files", "--others", "--exclude-standard"],
+                                   cwd=top, capture_output=True, text=True, encoding='utf-8', check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        details = e.stderr.strip() if isinstance(e, subprocess.CalledProcessError) and e.stderr else e
+        print(f"!! Не удалось получить список изменений с {rev}: {details}")
+        return None
+    return {_path_key(os.path.join(top, line)) for line in (diff + untracked).splitlines() if line}
+
+
+class CleanManifest:
+    """Отметки "файл чист для правила" по хешу содержимого"""
+
+    def __init__(self, manifest_path: Optional[Path] = None):
+        self.manifest_path = Path(manifest_path) if manifest_path else default_manifest_path()
+        self.files = {}
+        self.dirty = False
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.files = data.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    def is_clean(self, path: str, rule_keys: Iterable[str]) -> bool:
+        """Файл не менялся с последней проверки и чист для всех указанных правил."""
+        entry = self.files.get(_path_key(path))
+        if not entry or not set(rule_keys) <= set(entry["rules"]):
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return True
+        # Отметка времени изменилась (например, после git checkout) - сверяем содержимое
+        if entry["size"] != st.st_size or file_sha256(path) != entry["sha256"]:
+            return False
+        entry["mtime_ns"] = st.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def mark_clean(self, path: str, rule_keys: Iterable[str]):
+        """Отмечает текущее содержимое файла как чистое для правил."""
+        try:
+            st = os.stat(path)
+            sha256 = file_sha256(path)
+        except OSError:
+            return
+        key = _path_key(path)
+        entry = self.files.get(key)
+        if not entry or entry["sha256"] != sha256:
+            entry = {"rules": []}
+            self.files[key] = entry
+        entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size, sha256=sha256)
+        entry["rules"] = sorted(set(entry["rules"]) | set(rule_keys))
+        self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+        self.dirty = False
+
+
+class IncrementalFilter:
+    """Отбор файлов для обработки по --since и манифесту чистых файлов"""
+
+    def __init__(self, rule_keys: List[str], incremental: bool = False, since: Optional[str] = None,
+                 root: str = ".", manifest_path: Optional[Path] = None):
+        """
+        Args:
+            rule_keys: Ключи правил, которые применяет скрипт
+            incremental: Использовать манифест чистых файлов
+            since: Обрабатывать только файлы, измененные с этого коммита
+            root: Каталог, в котором выполняется обработка (для git)
+            manifest_path: Путь к манифесту (по умолчанию рядом со скриптами)
+        """
+        self.rule_keys = rule_keys
+        self.manifest = CleanManifest(manifest_path) if incremental else None
+        self.changed = changed_files_since(since, root) if since else None
+        self.skipped = 0
+
+    @property
+    def active(self) -> bool:
+        return self.manifest is not None or self.changed is not None
+
+    def should_process(self, path: str, rule_keys: Optional[List[str]] = None) -> bool:
+        """Нужно ли обрабатывать файл (rule_keys - правила для этого файла, по умолчанию все правила скрипта)."""
+        if self.changed is not None and _path_key(path) not in self.changed:
+            self.skipped += 1
+            return False
+        if self.manifest is not None and self.manifest.is_clean(path, rule_keys or self.rule_keys):
+            self.skipped += 1
+            return False
+        return True
+
+    def filter(self, paths: Iterable[str]) -> Iterable[str]:
+        for path in paths:
+            if self.should_process(path):
+                yield path
+
+    def record(self, path: str, changed: Optional[bool], rule_keys: Optional[List[str]] = None):
+        """Результат обработки файла: False - проверен и чист, True - изменен, None - ошибка."""
+        if self.manifest is not None and changed is False:
+            self.manifest.mark_clean(path, rule_keys or self.rule_keys)
+
+    def save(self):
+        if self.manifest is not None:
+            self.manifest.save()
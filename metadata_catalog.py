@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Каталог метаданных конфигурации по XML объектов выгрузки (Catalogs/Имя.xml, Documents/Имя.xml, ...)
+
+Каждый XML читается потоком (xml.etree.ElementTree.iterparse, без построения DOM): вид объекта
+(тег: Catalog, Document, ...), имя, синоним, подчиненные объекты по видам (Form, Command, Template,
+Attribute, TabularSection, реквизиты табличных частей "ТЧ.Реквизит", ...) и обработчик подписки на
+событие (<Handler>) или регламентного задания (<MethodName>).
+
+Каталог сохраняется (pickle) в metadata_catalog.pickle рядом со скриптами; при следующем запуске
+перечитываются только XML с изменившимися mtime/размером.
+
+Запуск (построение/обновление каталога и сводка):
+    python "Refactoring1C\\metadata_catalog.py" [каталог_выгрузки]
+"""
+
+import os
+import pickle
+import sys
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from file_enumerator import SKIP_DIRECTORIES
+from profiling import phase
+
+# Версия формата: при изменении правил разбора каталог перестраивается полностью
+CATALOG_VERSION = 1
+
+CATALOG_FILE_NAME = "metadata_catalog.pickle"
+
+# Теги свойств с обработчиком вида CommonModule.Модуль.Метод
+HANDLER_TAGS = {"Handler", "MethodName"}
+
+
+def default_catalog_path() -> Path:
+    """Каталог хранится рядом со скриптами."""
+    return Path(__file__).parent / CATALOG_FILE_NAME
+
+
+class MetadataObject:
+    """Объект метаданных верхнего уровня (описание из XML)"""
+
+    __slots__ = ('kind', 'name', 'synonym', 'folder', 'xml_path', 'children', 'handler')
+
+    def __init__(self, kind: str, name: str, synonym: str, folder: str, xml_path: str,
+                 children: Dict[str, Tuple[str, ...]], handler: Optional[str]):
+        self.kind = kind                # Тег XML: Catalog, Document, CommonModule, ...
+        self.name = name
+        self.synonym = synonym
+        self.folder = folder            # Каталог выгрузки: Catalogs, Documents, ...
+        self.xml_path = xml_path        # Путь к XML относительно корня выгрузки
+        self.children = children        # Вид подчиненного объекта -> имена
+        self.handler = handler          # CommonModule.Модуль.Метод (подписки, регламентные задания)
+
+    @property
+    def forms(self) -> Tuple[str, ...]:
+        return self.children.get("Form", ())
+
+    @property
+    def commands(self) -> Tuple[str, ...]:
+        return self.children.get("Command", ())
+
+    @property
+    def templates(self) -> Tuple[str, ...]:
+        return self.children.get("Template", ())
+
+    @property
+    def attributes(self) -> Tuple[str, ...]:
+        return self.children.get("Attribute", ())
+
+    @property
+    def tabular_sections(self) -> Tuple[str, ...]:
+        return self.children.get("TabularSection", ())
+
+    def __repr__(self):
+        return f"MetadataObject({self.kind}.{self.name})"
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+def parse_object_xml(xml_path: Path, folder: str, rel_path: str) -> Tuple[Optional[MetadataObject], Optional[str]]:
+    """
+    Читает XML объекта потоком
+
+    Returns:
+        Кортеж (объект или None, ошибка)
+    """
+    stack: List[str] = []
+    kind = None
+    name = ""
+    synonyms: List[Tuple[str, str]] = []
+    lang = ""
+    handler = None
+    children: Dict[str, List[str]] = {}
+    try:
+        for event, elem in ET.iterparse(str(xml_path), events=("start", "end")):
+            if event == "start":
+                stack.append(_local_name(elem.tag))
+                if len(stack) == 2:
+                    kind = stack[1]
+                continue
+
+            depth = len(stack)
+            text = (elem.text or "").strip()
+            if depth == 4 and stack[2] == "Properties":
+                if stack[3] == "Name":
+                    name = text
+                elif stack[3] in HANDLER_TAGS:
+                    handler = text
+            elif depth == 6 and stack[2] == "Properties" and stack[3] == "Synonym":
+                if stack[5] == "lang":
+                    lang = text
+                elif stack[5] == "content":
+                    synonyms.append((lang, text))
+            elif stack[2:3] == ["ChildObjects"]:
+                if depth == 4 and text:
+                    # <Form>Имя</Form>, <Template>Имя</Template>
+                    children.setdefault(stack[3], []).append(text)
+                elif depth == 6 and stack[4:] == ["Properties", "Name"]:
+                    # <Attribute><Properties><Name>Имя</Name>...
+                    children.setdefault(stack[3], []).append(text)
+                elif depth == 8 and stack[4] == "ChildObjects" and stack[6:] == ["Properties", "Name"]:
+                    # Реквизит табличной части: ТабличнаяЧасть.Реквизит
+                    owner = children.get(stack[3], [""])[-1]
+                    children.setdefault(f"{stack[3]}.{stack[5]}", []).append(f"{owner}.{text}")
+            stack.pop()
+            elem.clear()
+    except (ET.ParseError, OSError) as e:
+        return None, f"Ошибка разбора XML: {e}"
+
+    if not kind or not name:
+        return None, None
+    synonym = next((content for lang, content in synonyms if lang == "ru"), synonyms[0][1] if synonyms else "")
+    return MetadataObject(kind, name, synonym, folder, rel_path,
+                          {child_kind: tuple(names) for child_kind, names in children.items()}, handler), None
+
+
+def iter_object_xml_files(root_path: Path) -> Iterator[Tuple[str, os.DirEntry]]:
+    """XML объектов: файлы *.xml в каталогах первого уровня (служебные каталоги пропускаются)."""
+    try:
+        with os.scandir(root_path) as entries:
+            folders = sorted((entry for entry in entries
+                              if entry.is_dir() and entry.name.lower() not in SKIP_DIRECTORIES),
+                             key=lambda entry: entry.name)
+    except OSError:
+        return
+    for folder in folders:
+        try:
+            with os.scandir(folder.path) as entries:
+                files = sorted((entry for entry in entries
+                                if entry.name.lower().endswith('.xml') and entry.is_file()),
+                               key=lambda entry: entry.name)
+        except OSError:
+            continue
+        for entry in files:
+            yield folder.name, entry
+
+
+class MetadataCatalog:
+    """Объекты метаданных выгрузки с поиском по виду (каталогу) и имени"""
+
+    def __init__(self, root_path):
+        self.root_path = Path(root_path)
+        # Путь к XML -> (mtime_ns, размер, объект или None)
+        self.files: Dict[str, Tuple[int, int, Optional[MetadataObject]]] = {}
+        self.errors: List[str] = []
+        self._index: Dict[Tuple[str, str], MetadataObject] = {}
+
+    def update(self) -> Dict[str, int]:
+        """
+        Перечитывает изменившиеся XML объектов
+
+        Returns:
+            Статистика: просмотрено/прочитано/без изменений/удалено файлов
+        """
+        stats = {"scanned": 0, "parsed": 0, "unchanged": 0, "removed": 0}
+        self.errors = []
+        seen = set()
+        with phase("read"):
+            for folder, entry in iter_object_xml_files(self.root_path):
+                stats["scanned"] += 1
+                rel_path = f"{folder}/{entry.name}"
+                seen.add(rel_path)
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                known = self.files.get(rel_path)
+                if known and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+                    stats["unchanged"] += 1
+                    continue
+                obj, err = parse_object_xml(Path(entry.path), folder, rel_path)
+                if err:
+                    self.errors.append(f"!! {entry.path}     {err}")
+                self.files[rel_path] = (st.st_mtime_ns, st.st_size, obj)
+                stats["parsed"] += 1
+        for rel_path in [path for path in self.files if path not in seen]:
+            del self.files[rel_path]
+            stats["removed"] += 1
+        self._build_index()
+        return stats
+
+    def _build_index(self):
+        self._index = {}
+        for _, _, obj in self.files.values():
+            if obj is not None:
+                self._index.setdefault((obj.folder.lower(), obj.name.lower()), obj)
+
+    def __getstate__(self):
+        return {"root_path": str(self.root_path), "files": self.files}
+
+    def __setstate__(self, state):
+        self.root_path = Path(state["root_path"])
+        self.files = state["files"]
+        self.errors = []
+        self._build_index()
+
+    def objects(self, folder: Optional[str] = None) -> List[MetadataObject]:
+        """Все объекты (или объекты одного каталога выгрузки, например "Catalogs") в порядке путей XML."""
+        result = []
+        for rel_path in sorted(self.files):
+            obj = self.files[rel_path][2]
+            if obj is not None and (folder is None or obj.folder.lower() == folder.lower()):
+                result.append(obj)
+        return result
+
+    def find(self, folder: str, name: str) -> Optional[MetadataObject]:
+        """Объект по каталогу выгрузки ("Catalogs") и имени (без учета регистра)."""
+        return self._index.get((folder.lower(), name.lower()))
+
+    def handlers(self) -> List[Tuple[MetadataObject, str]]:
+        """Обработчики подписок на события и регламентных заданий: (объект, "CommonModule.Модуль.Метод")."""
+        return [(obj, obj.handler) for obj in self.objects() if obj.handler]
+
+    def save(self, catalog_path: Optional[Path] = None):
+        catalog_path = Path(catalog_path) if catalog_path else default_catalog_path()
+        temp_path = catalog_path.with_suffix(".tmp")
+        with open(temp_path, 'wb') as f:
+            pickle.dump((CATALOG_VERSION, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, catalog_path)
+
+
+def load_catalog(root_path, catalog_path: Optional[Path] = None, save: bool = True) -> MetadataCatalog:
+    """
+    Каталог метаданных выгрузки: сохраненный ранее (с перечитыванием изменившихся XML) или новый
+
+    Args:
+        root_path: Корень выгрузки конфигурации
+        catalog_path: Файл каталога (по умолчанию metadata_catalog.pickle рядом со скриптами)
+        save: Сохранить каталог, если он изменился
+
+    Returns:
+        Каталог метаданных
+    """
+    catalog_path = Path(catalog_path) if catalog_path else default_catalog_path()
+    catalog = None
+    try:
+        with open(catalog_path, 'rb') as f:
+            version, loaded = pickle.load(f)
+        if version == CATALOG_VERSION and loaded.root_path.resolve() == Path(root_path).resolve():
+            catalog = loaded
+    except Exception:
+        pass
+    if catalog is None:
+        catalog = MetadataCatalog(root_path)
+
+    stats = catalog.update()
+    if save and (stats["parsed"] or stats["removed"]):
+        try:
+            catalog.save(catalog_path)
+        except OSError as e:
+            print(f"Не удалось сохранить каталог метаданных {catalog_path}: {e}")
+    return catalog
+
+
+def main():
+    """Построение/обновление каталога и сводка по видам объектов"""
+    root_path = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    catalog = load_catalog(root_path)
+    for error in catalog.errors:
+        print(error)
+    objects = catalog.objects()
+    print(f"Объектов метаданных: {len(objects)}")
+    for kind, count in sorted(Counter(obj.kind for obj in objects).items()):
+        print(f"  {kind:<28} {count}")
+    print(f"Обработчиков подписок и регламентных заданий: {len(catalog.handlers())}")
+    print(f"Каталог сохранен в файл: {default_catalog_path()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Таблица методов модуля 1С, построенная за один проход лексера
+
+ModuleIndex хранит для каждого метода строку объявления, последнюю строку заголовка,
+строку КонецПроцедуры/КонецФункции, начало блока комментариев и аннотаций над методом,
+признаки Экспорт и "пустой", а также массив смещений начала строк для перевода
+позиции в тексте в номер строки (bisect). Используется скриптами удаления методов.
+"""
+
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional
+
+from bsl_lexer import LINE_ANNOTATION, LINE_BLANK, LINE_COMMENT, LINE_METHOD_END, lex_lines, method_prefix_start
+
+
+class MethodEntry:
+    """Запись таблицы методов (номера строк с 0, end_line включительно)"""
+
+    __slots__ = ('name', 'start_line', 'header_end_line', 'end_line', 'prefix_start_line', 'export', 'empty',
+                 'function')
+
+    def __init__(self, name: str, start_line: int, header_end_line: int, end_line: int,
+                 prefix_start_line: int, export: bool, empty: bool, function: bool = False):
+        self.name = name
+        self.start_line = start_line
+        self.header_end_line = header_end_line
+        self.end_line = end_line
+        # Первая строка комментариев/аннотаций непосредственно над объявлением (удаляется вместе с методом)
+        self.prefix_start_line = prefix_start_line
+        self.export = export
+        # Между заголовком и концом метода только пустые строки, комментарии и аннотации
+        self.empty = empty
+        # Функция (иначе процедура)
+        self.function = function
+
+
+class ModuleIndex:
+    """Разобранный модуль: строки, токены лексера, смещения строк и таблица методов"""
+
+    def __init__(self, content: str):
+        """
+        Разбирает текст модуля
+
+        Args:
+            content: Текст модуля
+        """
+        self.content = content
+        self.lines = content.splitlines(keepends=True)
+        self.tokens = lex_lines(self.lines)
+
+        self.line_offsets: List[int] = []
+        offset = 0
+        for line in self.lines:
+            self.line_offsets.append(offset)
+            offset += len(line)
+
+        self.methods: List[MethodEntry] = []
+        self._by_name: Dict[str, List[MethodEntry]] = {}
+        self._build_method_table()
+        self._method_starts = [entry.start_line for entry in self.methods]
+
+    def _build_method_table(self):
+        tokens = self.tokens
+        start = None
+        for idx, token in enumerate(tokens):
+            if token.method is not None:
+                # Объявление без КонецПроцедуры/КонецФункции перекрывается следующим объявлением
+                start = idx
+            elif token.kind == LINE_METHOD_END and start is not None:
+                header = tokens[start].method
+                empty = all(tokens[i].kind in (LINE_BLANK, LINE_COMMENT, LINE_ANNOTATION)
+                            for i in range(header.end_line + 1, idx))
+                entry = MethodEntry(header.name, start, header.end_line, idx,
+                                    method_prefix_start(tokens, start), header.export, empty, header.function)
+                self.methods.append(entry)
+                self._by_name.setdefault(header.name.lower(), []).append(entry)
+                start = None
+
+    def find_methods(self, name: str) -> List[MethodEntry]:
+        """Все методы с этим именем (без учета регистра) в порядке следования."""
+        return self._by_name.get(name.lower(), [])
+
+    def find_method(self, name: str, occurrence: int = 0) -> Optional[MethodEntry]:
+        """Метод с этим именем (occurrence - номер вхождения при повторах) или None."""
+        entries = self._by_name.get(name.lower(), [])
+        return entries[occurrence] if occurrence < len(entries) else None
+
+    def line_at(self, offset: int) -> int:
+        """Номер строки (с 0), содержащей символ с указанным смещением."""
+        return bisect_right(self.line_offsets, offset) - 1
+
+    def method_at_line(self, line: int) -> Optional[MethodEntry]:
+        """Метод, которому принадлежит строка, или None."""
+        idx = bisect_right(self._method_starts, line) - 1
+        if idx >= 0 and line <= self.methods[idx].end_line:
+            return self.methods[idx]
+        return None
+
+    def without_methods(self, entries: Iterable[MethodEntry]) -> str:
+        """Текст модуля без указанных методов и блоков комментариев/аннотаций над ними."""
+        removed_lines = bytearray(len(self.lines))
+        for entry in entries:
+            for idx in range(entry.prefix_start_line, entry.end_line + 1):
+                removed_lines[idx] = 1
+        return "".join(line for line, removed in zip(self.lines, removed_lines) if not removed)
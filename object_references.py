@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Типизированные ссылки на объекты метаданных в модулях и XML выгрузки
+
+В отличие от подсчета имени целым словом, учитываются только ссылки, по которым понятно,
+на какой объект они указывают:
+    менеджер    Справочники.Имя, Documents.Имя, РегистрыСведений.Имя                  (код)
+    метаданные  Справочник.Имя (тексты запросов), ОбщийМодуль.Имя, Метаданные.Справочники.Имя,
+                Catalog.Имя в XML (состав подсистем, права ролей, обработчики)
+    тип         СправочникСсылка.Имя, Тип("ДокументОбъект.Имя"), cfg:CatalogRef.Имя в XML
+    модуль      Имя.Метод() - обращение к общему модулю Имя                              (код)
+
+Виды объектов (Справочник/Catalog -> Catalogs, ...) берутся из CodeFileFinder.first_object_mapping.
+Текст просматривается за один проход по точкам: идентификаторы слева и справа от каждой точки
+проверяются по словарям префиксов и имен объектов. Ссылки в комментариях модулей не учитываются.
+Ссылки из собственных файлов объекта (его XML, модули, формы) считаются отдельно.
+"""
+
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bsl_lexer import strip_comment
+from find_code_file import CodeFileFinder
+from metadata_catalog import MetadataObject
+from profiling import phase
+
+REFERENCE_MANAGER = "менеджер"
+REFERENCE_METADATA = "метаданные"
+REFERENCE_TYPE = "тип"
+REFERENCE_MODULE = "модуль"
+
+REFERENCE_KINDS = (REFERENCE_MANAGER, REFERENCE_METADATA, REFERENCE_TYPE, REFERENCE_MODULE)
+
+# Менеджеры объектов в коде: Справочники.Имя (по-английски имя менеджера совпадает с каталогом выгрузки)
+MANAGER_NAMES = {
+    "AccountingRegisters": "РегистрыБухгалтерии",
+    "AccumulationRegisters": "РегистрыНакопления",
+    "CalculationRegisters": "РегистрыРасчета",
+    "InformationRegisters": "РегистрыСведений",
+    "BusinessProcesses": "БизнесПроцессы",
+    "Catalogs": "Справочники",
+    "ChartsOfAccounts": "ПланыСчетов",
+    "ChartsOfCalculationTypes": "ПланыВидовРасчета",
+    "ChartsOfCharacteristicTypes": "ПланыВидовХарактеристик",
+    "Constants": "Константы",
+    "DataProcessors": "Обработки",
+    "DocumentJournals": "ЖурналыДокументов",
+    "Documents": "Документы",
+    "Enums": "Перечисления",
+    "ExchangePlans": "ПланыОбмена",
+    "ExternalDataSources": "ВнешниеИсточникиДанных",
+    "FilterCriteria": "КритерииОтбора",
+    "Reports": "Отчеты",
+    "Sequences": "Последовательности",
+    "SettingsStorages": "ХранилищаНастроек",
+    "Tasks": "Задачи",
+}
+
+# Окончания имен типов: СправочникСсылка, CatalogRef, РегистрСведенийНаборЗаписей, ...
+TYPE_SUFFIXES = (
+    ("Ссылка", "Ref"),
+    ("Объект", "Object"),
+    ("Менеджер", "Manager"),
+    ("Выборка", "Selection"),
+    ("Список", "List"),
+    ("НаборЗаписей", "RecordSet"),
+    ("МенеджерЗаписи", "RecordManager"),
+    ("Запись", "Record"),
+    ("КлючЗаписи", "RecordKey"),
+    ("ТабличнаяЧасть", "TabularSection"),
+    ("СтрокаТабличнойЧасти", "TabularSectionRow"),
+    ("МенеджерЗначения", "ValueManager"),
+)
+
+# Идентификатор перед точкой ищется в перевернутом тексте, после точки - с начала фрагмента
+_HEAD_RE = re.compile(r'\w+')
+_NAME_RE = re.compile(r'[^\W\d]\w*')
+_CYRILLIC_RE = re.compile(r'[а-яё]', re.IGNORECASE)
+
+
+def build_prefixes(first_object_mapping: Dict[str, str]) -> Dict[str, Tuple[str, str]]:
+    """
+    Префиксы ссылок в нижнем регистре
+
+    Returns:
+        Словарь префикс -> (каталог выгрузки в нижнем регистре, вид ссылки)
+    """
+    prefixes: Dict[str, Tuple[str, str]] = {}
+    for folder, manager in MANAGER_NAMES.items():
+        prefixes.setdefault(manager.lower(), (folder.lower(), REFERENCE_MANAGER))
+        prefixes.setdefault(folder.lower(), (folder.lower(), REFERENCE_MANAGER))
+    for first_object, folder in first_object_mapping.items():
+        if not folder:
+            continue
+        prefixes.setdefault(first_object.lower(), (folder.lower(), REFERENCE_METADATA))
+        if folder not in MANAGER_NAMES:
+            continue
+        russian = _CYRILLIC_RE.search(first_object) is not None
+        for ru_suffix, en_suffix in TYPE_SUFFIXES:
+            suffix = ru_suffix if russian else en_suffix
+            prefixes.setdefault((first_object + suffix).lower(), (folder.lower(), REFERENCE_TYPE))
+    return prefixes
+
+
+class ReferenceExtractor:
+    """Поиск типизированных ссылок на известные объекты метаданных"""
+
+    def __init__(self, objects: Iterable[MetadataObject], first_object_mapping: Optional[Dict[str, str]] = None):
+        if first_object_mapping is None:
+            first_object_mapping = CodeFileFinder().first_object_mapping
+        self.prefixes = build_prefixes(first_object_mapping)
+        self.objects: Dict[Tuple[str, str], MetadataObject] = {}
+        self.modules: Dict[str, MetadataObject] = {}
+        for obj in objects:
+            self.objects.setdefault((obj.folder.lower(), obj.name.lower()), obj)
+            if obj.folder.lower() == "commonmodules":
+                self.modules.setdefault(obj.name.lower(), obj)
+
+    def extract(self, text: str, code: bool = True) -> List[Tuple[MetadataObject, str]]:
+        """
+        Ссылки на объекты в тексте модуля (code=True) или XML
+
+        Returns:
+            Список (объект, вид ссылки) в порядке текста
+        """
+        text = text.lower()
+        comments = code and '//' in text
+        prefixes = self.prefixes
+        objects = self.objects
+        modules = self.modules if code else {}
+        found = []
+        parts = text.split('.')
+        dot = -1
+        for i in range(len(parts) - 1):
+            part = parts[i]
+            dot += len(part) + 1
+            head_match = _HEAD_RE.match(part[::-1])
+            if head_match is None:
+                continue
+            head = head_match.group()[::-1]
+            name_match = _NAME_RE.match(parts[i + 1])
+            if name_match is None or head[0].isdigit():
+                continue
+            if len(head) < len(part):
+                before = part[-len(head) - 1]
+            else:
+                before = "." if i else ""
+
+            prefix = prefixes.get(head)
+            if prefix is not None:
+                folder, kind = prefix
+                obj = objects.get((folder, name_match.group()))
+                if obj is None:
+                    continue
+                if before == ":":
+                    # cfg:CatalogRef.Имя, cfg:DefinedType.Имя
+                    kind = REFERENCE_TYPE
+                elif before == "." and kind == REFERENCE_MANAGER:
+                    # Метаданные.Справочники.Имя
+                    kind = REFERENCE_METADATA
+            elif before != ".":
+                obj = modules.get(head)
+                if obj is None:
+                    continue
+                kind = REFERENCE_MODULE
+            else:
+                continue
+            if comments and _in_comment(text, dot - len(head)):
+                continue
+            found.append((obj, kind))
+        return found
+
+
+def _in_comment(text: str, pos: int) -> bool:
+    """Позиция находится в // комментарии (проверяется начало строки до позиции)."""
+    line = text[text.rfind('\n', 0, pos) + 1:pos]
+    return '//' in line and len(strip_comment(line)) < len(line)
+
+
+def is_own_file(obj: MetadataObject, rel_path: str) -> bool:
+    """Файл относится к самому объекту: его XML или файл в каталоге объекта."""
+    rel_path = rel_path.lower()
+    return (rel_path == obj.xml_path.lower()
+            or rel_path.startswith(f"{obj.folder}/{obj.name}/".lower()))
+
+
+class ObjectReferences:
+    """Ссылки на объекты: по видам ссылок и по ссылающимся файлам"""
+
+    def __init__(self):
+        # Объект -> вид ссылки -> количество (без собственных файлов объекта)
+        self.by_kind: Dict[MetadataObject, Counter] = defaultdict(Counter)
+        # Объект -> (путь файла относительно корня, вид ссылки) -> количество
+        self.by_file: Dict[MetadataObject, Counter] = defaultdict(Counter)
+        # Объект -> ссылки из собственных файлов
+        self.own: Counter = Counter()
+
+    def add(self, rel_path: str, references: Iterable[Tuple[MetadataObject, str]]):
+        for (obj, kind), count in Counter(references).items():
+            if is_own_file(obj, rel_path):
+                self.own[obj] += count
+            else:
+                self.by_kind[obj][kind] += count
+                self.by_file[obj][(rel_path, kind)] += count
+
+    def total(self, obj: MetadataObject) -> int:
+        """Количество ссылок на объект из других файлов."""
+        kinds = self.by_kind.get(obj)
+        return sum(kinds.values()) if kinds else 0
+
+    def kind_count(self, obj: MetadataObject, kind: str) -> int:
+        kinds = self.by_kind.get(obj)
+        return kinds[kind] if kinds else 0
+
+    def files(self, obj: MetadataObject) -> List[str]:
+        """Ссылающиеся файлы (кроме собственных) в порядке путей."""
+        return sorted({rel_path for rel_path, _ in self.by_file.get(obj, ())})
+
+
+def collect_references(extractor: ReferenceExtractor, files: List[Tuple[str, str]]) -> ObjectReferences:
+    """
+    Собирает ссылки по всем файлам
+
+    Args:
+        extractor: Поиск ссылок
+        files: Пары (путь относительно корня выгрузки через "/", текст файла)
+
+    Returns:
+        Ссылки на объекты
+    """
+    references = ObjectReferences()
+    with phase("match"):
+        for rel_path, text in files:
+            if text:
+                references.add(rel_path, extractor.extract(text, code=not rel_path.lower().endswith('.xml')))
+    return references
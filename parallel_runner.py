@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Параллельная обработка файлов для скриптов очистки (режим --jobs N)
+
+Список файлов делится между процессами: модули (.bsl, .os, ...) обрабатываются в пуле
+из N процессов, Form.bin - в отдельном пуле меньшего размера (--bin-jobs), чтобы
+распаковка/упаковка (v8unpack) не перегружала машину. Вывод каждого файла
+перехватывается в процессе-обработчике и печатается в исходном порядке файлов,
+поэтому результат не зависит от числа процессов.
+
+При --jobs 1 и --bin-jobs N > 1 Form.bin распаковываются и упаковываются в N потоках текущего
+процесса (BinJobPool), если скрипт передал run_files() свое преобразование текста модуля (bin_pipeline).
+"""
+
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import dry_run
+import profiling
+from bin_file_processor import BinJobPool
+
+# Размер пула для Form.bin по умолчанию (не больше --jobs)
+DEFAULT_BIN_JOBS = 4
+
+# Сколько файлов передается процессу за раз (меньше накладных расходов на пересылку)
+MAX_CHUNK_SIZE = 64
+
+
+def parse_jobs_args(argv: List[str]) -> Tuple[int, int, List[str]]:
+    """
+    Извлекает из аргументов командной строки --jobs N и --bin-jobs N
+
+    Args:
+        argv: Аргументы (без имени скрипта)
+
+    Returns:
+        Кортеж (jobs, bin_jobs, остальные_аргументы)
+    """
+    jobs = 1
+    bin_jobs = None
+    rest = []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        option, _, value = arg.partition('=')
+        if option in ('--jobs', '-j', '--bin-jobs'):
+            if not value:
+                i += 1
+                value = argv[i] if i < len(argv) else ''
+            try:
+                number = max(1, int(value))
+            except ValueError:
+                print(f"Некорректное значение {option}: {value}")
+                number = 1
+            if option == '--bin-jobs':
+                bin_jobs = number
+            else:
+                jobs = number
+        else:
+            rest.append(arg)
+        i += 1
+    if bin_jobs is None:
+        bin_jobs = min(jobs, DEFAULT_BIN_JOBS)
+    return jobs, bin_jobs, rest
+
+
+def is_bin_file(path: str) -> bool:
+    return path.lower().endswith('.bin')
+
+
+def is_form_bin(path: str) -> bool:
+    return os.path.basename(path).lower() == 'form.bin'
+
+
+def _run_captured(func: Callable[[str], Any], path: str, profile: bool,
+                  dry_run_settings: Optional[Tuple]) -> Tuple[Any, str, Optional[Dict], Optional[Tuple[int, str]]]:
+    """
+    Выполняется в процессе-обработчике: результат, весь вывод обработки файла,
+    замеры фаз (при --profile) и diff (при --dry-run/--diff)
+    """
+    if profile:
+        profiling.enable()
+        profiling.PROFILER.reset()
+    if dry_run_settings:
+        dry_run.begin_capture(dry_run_settings)
+    output = io.StringIO()
+    with redirect_stdout(output):
+        result = func(path)
+    snapshot = profiling.PROFILER.snapshot() if profile else None
+    captured = dry_run.end_capture() if dry_run_settings else None
+    return result, output.getvalue(), snapshot, captured
+
+
+def _chunk_size(count: int, jobs: int) -> int:
+    return max(1, min(MAX_CHUNK_SIZE, count // (jobs * 8)))
+
+
+def _run_with_bin_pool(paths: List[str], func: Callable[[str], Any], bin_jobs: int,
+                       bin_pipeline: Tuple[Callable, Callable]) -> Iterator[Tuple[str, Any]]:
+    """Form.bin обрабатываются конвейером BinJobPool, остальные файлы - func в текущем потоке (в порядке paths)."""
+    modification_func, result_func = bin_pipeline
+    with BinJobPool(bin_jobs) as pool:
+        bin_results = pool.process([path for path in paths if is_form_bin(path)], modification_func)
+        for path in paths:
+            if is_form_bin(path):
+                _, (was_modified, error_message) = next(bin_results)
+                yield path, result_func(path, was_modified, error_message)
+            else:
+                yield path, func(path)
+
+
+def run_files(paths: List[str], func: Callable[[str], Any], jobs: int = 1,
+              bin_jobs: Optional[int] = None,
+              bin_pipeline: Optional[Tuple[Callable, Callable]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Обрабатывает файлы функцией func и возвращает результаты в порядке paths
+
+    При jobs == 1 файлы обрабатываются в текущем процессе, как раньше. Иначе func
+    (функция уровня модуля) выполняется в пулах процессов, а ее вывод печатается
+    здесь в порядке файлов; замеры --profile из процессов складываются в общий профиль
+    (cProfile фазы собирается только в текущем процессе), diff --dry-run пишется в порядке файлов.
+
+    Args:
+        paths: Пути к файлам
+        func: Обработчик одного файла
+        jobs: Число процессов для модулей
+        bin_jobs: Число процессов для .bin (по умолчанию min(jobs, DEFAULT_BIN_JOBS))
+        bin_pipeline: (modification_func, result_func) для BinJobPool при jobs == 1: преобразование
+            текста модуля и result_func(путь, was_modified, error_message) -> результат, как у func
+
+    Returns:
+        Итератор кортежей (путь, результат func)
+    """
+    if jobs <= 1:
+        if bin_pipeline and bin_jobs and bin_jobs > 1:
+            yield from _run_with_bin_pool(paths, func, bin_jobs, bin_pipeline)
+            return
+        for path in paths:
+            yield path, func(path)
+        return
+
+    if bin_jobs is None:
+        bin_jobs = min(jobs, DEFAULT_BIN_JOBS)
+    text_paths = [path for path in paths if not is_bin_file(path)]
+    bin_paths = [path for path in paths if is_bin_file(path)]
+
+    with ProcessPoolExecutor(max_workers=jobs) as text_pool, \
+            ProcessPoolExecutor(max_workers=max(1, bin_jobs)) as bin_pool:
+        profile = profiling.is_enabled()
+        dry_run_settings = dry_run.worker_settings()
+        text_results = text_pool.map(_run_captured, [func] * len(text_paths), text_paths,
+                                     [profile] * len(text_paths), [dry_run_settings] * len(text_paths),
+                                     chunksize=_chunk_size(len(text_paths), jobs))
+        bin_results = bin_pool.map(_run_captured, [func] * len(bin_paths), bin_paths,
+                                   [profile] * len(bin_paths), [dry_run_settings] * len(bin_paths))
+        for path in paths:
+            result, output, snapshot, captured = next(bin_results) if is_bin_file(path) else next(text_results)
+            if output:
+                sys.stdout.write(output)
+            if snapshot:
+                profiling.PROFILER.merge(snapshot)
+            if captured:
+                dry_run.merge_captured(captured)
+            yield path, result
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Замеры по фазам для всех скриптов (ключ --profile)
+
+Фазы: enumerate (обход каталогов), resolve (поиск файла по описанию объекта), read, parse (лексер),
+transform (правила очистки), unpack/pack (Form.bin), write, match (поиск имен объектов).
+Код оборачивает фазы в `with phase("read", path):`; время и количество вызовов копятся по фазам,
+а время с указанием файла - еще и по файлам (для списка самых медленных файлов).
+Пока профилирование не включено, phase() возвращает общий пустой контекст, накладные расходы -
+один вызов функции.
+
+Ключи командной строки:
+  --profile[=N]            сводка по фазам и N самых медленных файлов (по умолчанию 10)
+  --profile-phase ИМЯ      дополнительно cProfile только внутри фазы ИМЯ
+  --profile-output ФАЙЛ    сохранить данные cProfile в файл (pstats) вместо печати
+
+Фазы могут выполняться в потоках (пул Form.bin, --bin-jobs): накопители защищены блокировкой.
+cProfile включается только в основном потоке (в Python 3.12+ второй профилировщик в другом
+потоке включить нельзя): фазы в потоках пула замеряются по времени, но без cProfile.
+"""
+
+import cProfile
+import pstats
+import threading
+from collections import Counter
+from time import perf_counter
+from typing import Dict, List, Optional
+
+# Порядок фаз в сводке (остальные печатаются после, по алфавиту)
+PHASES = ["enumerate", "resolve", "read", "parse", "transform", "match", "unpack", "pack", "write"]
+DEFAULT_TOP_FILES = 10
+
+
+class _NullPhase:
+    """Контекст-заглушка, когда профилирование выключено"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'path', 'start')
+
+    def __init__(self, profiler: 'Profiler', name: str, path: Optional[str]):
+        self.profiler = profiler
+        self.name = name
+        self.path = path
+
+    def __enter__(self):
+        if self.name == self.profiler.cprofile_phase:
+            self.profiler._cprofile_enter()
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = perf_counter() - self.start
+        profiler = self.profiler
+        with profiler.lock:
+            totals = profiler.phases.get(self.name)
+            if totals is None:
+                profiler.phases[self.name] = [elapsed, 1]
+            else:
+                totals[0] += elapsed
+                totals[1] += 1
+            if self.path is not None:
+                profiler.files[self.path] = profiler.files.get(self.path, 0.0) + elapsed
+        if self.name == profiler.cprofile_phase:
+            profiler._cprofile_exit()
+        return False
+
+
+class Profiler:
+    """Накопитель времени по фазам и файлам"""
+
+    def __init__(self):
+        self.enabled = False
+        self.top_files = DEFAULT_TOP_FILES
+        self.cprofile_phase: Optional[str] = None
+        self.cprofile_output: Optional[str] = None
+        self.lock = threading.Lock()
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._cprofile_depth = 0
+        # Вызовы фазы cProfile в других потоках (замерены только по времени)
+        self.cprofile_skipped = 0
+        self.reset()
+
+    def reset(self):
+        # фаза -> [секунды, вызовы]
+        self.phases: Dict[str, List[float]] = {}
+        self.counters: Counter = Counter()
+        # файл -> секунды
+        self.files: Dict[str, float] = {}
+
+    def _cprofile_enter(self):
+        if threading.current_thread() is not threading.main_thread():
+            with self.lock:
+                self.cprofile_skipped += 1
+            return
+        if self._cprofile_depth == 0:
+            if self._cprofile is None:
+                self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._cprofile_depth += 1
+
+    def _cprofile_exit(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        self._cprofile_depth -= 1
+        if self._cprofile_depth == 0:
+            self._cprofile.disable()
+
+    def snapshot(self) -> Dict:
+        """Данные для передачи из процесса-обработчика (см. parallel_runner)."""
+        return {"phases": self.phases, "counters": dict(self.counters), "files": self.files}
+
+    def merge(self, snapshot: Dict):
+        with self.lock:
+            for name, (seconds, calls) in snapshot["phases"].items():
+                totals = self.phases.setdefault(name, [0.0, 0])
+                totals[0] += seconds
+                totals[1] += calls
+            self.counters.update(snapshot["counters"])
+            for path, seconds in snapshot["files"].items():
+                self.files[path] = self.files.get(path, 0.0) + seconds
+
+    def report(self):
+        """Печатает сводку по фазам, счетчики, самые медленные файлы и данные cProfile."""
+        if not self.enabled:
+            return
+        print("=" * 80)
+        print("Профиль по фазам:")
+        order = [name for name in PHASES if name in self.phases] + \
+            sorted(name for name in self.phases if name not in PHASES)
+        for name in order:
+            seconds, calls = self.phases[name]
+            print(f"  {name:<10} {seconds:10.3f} с  {calls:8d} вызовов")
+        if self.counters:
+            print("Счетчики:")
+            for name, value in sorted(self.counters.items()):
+                print(f"  {name:<24} {value}")
+        if self.files and self.top_files:
+            print(f"Самые медленные файлы (top {self.top_files}):")
+            for path, seconds in sorted(self.files.items(), key=lambda item: item[1], reverse=True)[:self.top_files]:
+                print(f"  {seconds:8.3f} с  {path}")
+        if self.cprofile_skipped:
+            print(f"Фаза {self.cprofile_phase} в потоках пула: {self.cprofile_skipped} вызовов "
+                  f"замерены по времени, без cProfile")
+        if self._cprofile is not None:
+            stats = pstats.Stats(self._cprofile)
+            if self.cprofile_output:
+                stats.dump_stats(self.cprofile_output)
+                print(f"cProfile фазы {self.cprofile_phase} сохранен в файл: {self.cprofile_output}")
+            else:
+                print(f"cProfile фазы {self.cprofile_phase}:")
+                stats.sort_stats("cumulative").print_stats(25)
+
+
+PROFILER = Profiler()
+
+
+def phase(name: str, path: Optional[str] = None):
+    """Контекст замера фазы (path - файл, к которому относится время, если известен)."""
+    if not PROFILER.enabled:
+        return _NULL_PHASE
+    return _Phase(PROFILER, name, path)
+
+
+def count(name: str, value: int = 1):
+    """Увеличивает счетчик (например, количество вызовов v8unpack)."""
+    if PROFILER.enabled:
+        with PROFILER.lock:
+            PROFILER.counters[name] += value
+
+
+def is_enabled() -> bool:
+    return PROFILER.enabled
+
+
+def enable(top_files: int = DEFAULT_TOP_FILES, cprofile_phase: Optional[str] = None,
+           cprofile_output: Optional[str] = None):
+    PROFILER.enabled = True
+    PROFILER.top_files = top_files
+    PROFILER.cprofile_phase = cprofile_phase
+    PROFILER.cprofile_output = cprofile_output
+
+
+def parse_profile_args(argv: List[str]) -> List[str]:
+    """
+    Извлекает из аргументов --profile[=N], --profile-phase ИМЯ, --profile-output ФАЙЛ и включает профилирование
+
+    Returns:
+        Остальные аргументы
+    """
+    enabled = False
+    top_files = DEFAULT_TOP_FILES
+    cprofile_phase = None
+    cprofile_output = None
+    rest = []
+    i = 0
+    while i < len(argv):
+        option, _, value = argv[i].partition('=')
+        if option == '--profile':
+            enabled = True
+            if value.isdigit():
+                top_files = int(value)
+        elif option in ('--profile-phase', '--profile-output'):
+            if not value and i + 1 < len(argv):
+                i += 1
+                value = argv[i]
+            if option == '--profile-phase':
+                cprofile_phase = value or None
+            else:
+                cprofile_output = value or None
+            enabled = True
+        else:
+            rest.append(argv[i])
+        i += 1
+    if enabled:
+        enable(top_files, cprofile_phase, cprofile_output)
+    return rest
+
+
+def report():
+    PROFILER.report()
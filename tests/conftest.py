@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""Скрипты лежат в корне репозитория и импортируют друг друга по имени модуля."""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Регрессионный корпус cleanup_return_1c: для каждого fixtures/cleanup_returns/ИМЯ.bsl
+результат _cleanup_returns_in_content должен совпадать с ИМЯ.expected.bsl байт в байт.
+Ожидаемые файлы получены исходной (построчной) реализацией скрипта.
+"""
+
+import pytest
+
+from conftest import FIXTURES
+from cleanup_return_1c import _cleanup_returns_in_content
+
+CORPUS_DIR = FIXTURES / "cleanup_returns"
+SOURCES = sorted(path for path in CORPUS_DIR.glob("*.bsl") if not path.name.endswith(".expected.bsl"))
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("source", SOURCES, ids=[path.stem for path in SOURCES])
+def test_cleanup_returns_matches_expected(source):
+    expected = _read(source.with_name(source.stem + ".expected.bsl"))
+    result, changed = _cleanup_returns_in_content(_read(source))
+    assert result == expected
+    assert changed == (result != _read(source))
+
+
+@pytest.mark.parametrize("source", SOURCES, ids=[path.stem for path in SOURCES])
+def test_cleanup_returns_is_idempotent(source):
+    expected = _read(source.with_name(source.stem + ".expected.bsl"))
+    result, changed = _cleanup_returns_in_content(expected)
+    assert result == expected
+    assert not changed
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""Прямые пути к файлам в CodeFileFinder.find_code_file (в том числе с сегментами ..)."""
+
+from find_code_file import CodeFileFinder
+
+
+def test_direct_relative_paths(tmp_path):
+    module = tmp_path / "Catalogs" / "Товары" / "Ext" / "ObjectModule.bsl"
+    module.parent.mkdir(parents=True)
+    module.write_text("", encoding="utf-8")
+    finder = CodeFileFinder(tmp_path)
+
+    assert finder.find_code_file("Catalogs/Товары/Ext/ObjectModule.bsl") == [str(module)]
+    assert finder.find_code_file("Catalogs/../Catalogs/Товары/Ext/ObjectModule.bsl") == \
+        [str(tmp_path / "Catalogs/../Catalogs/Товары/Ext/ObjectModule.bsl")]
+    assert finder.find_code_file("Catalogs/../Catalogs/Товары/Ext") == []
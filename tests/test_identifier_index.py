@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Подсчет имен по индексу (find_object_usage.py --index) и по корпусу текстов (без --index)
+должен давать одинаковый результат на одной и той же выгрузке.
+"""
+
+from pathlib import Path
+
+import pytest
+
+import bin_file_processor
+from bin_text_cache import BIN_TEXT_CACHE
+from file_enumerator import iter_files
+from find_object_usage import build_corpus, count_word_occurrences
+from generate_test_config import generate_configuration
+from identifier_index import SPECIAL_FILE_NAMES, SUPPORTED_EXTENSIONS, IdentifierIndex
+from metadata_catalog import load_catalog
+
+
+@pytest.fixture
+def configuration(tmp_path, monkeypatch):
+    monkeypatch.setattr(bin_file_processor, "BIN_BACKEND", "native")
+    monkeypatch.setattr(BIN_TEXT_CACHE, "cache_dir", tmp_path / "bin_text_cache")
+    root = tmp_path / "config"
+    generate_configuration(str(root), 20, 1)
+    # Файл с некорректной последовательностью UTF-8 (в обоих режимах пропускается)
+    module = next(root.glob("CommonModules/*/Ext/Module.bsl"))
+    module.write_bytes(module.read_bytes() + b"\n// \xff\xfe\n")
+    return root
+
+
+def test_index_counts_match_corpus_counts(configuration, tmp_path):
+    catalog = load_catalog(configuration, tmp_path / "catalog.pickle")
+    names = sorted({obj.name for obj in catalog.objects()})
+    names += ["Возврат", "Процедура", "НетТакогоИмени"]
+
+    files = [Path(path) for path in iter_files(configuration, SUPPORTED_EXTENSIONS, SPECIAL_FILE_NAMES)]
+    expected = count_word_occurrences(build_corpus(files), names)
+
+    with IdentifierIndex(tmp_path / "index.sqlite") as index:
+        index.update(configuration)
+        actual = index.count_identifiers(names)
+
+    assert actual == expected
+    assert any(count for count in expected.values())
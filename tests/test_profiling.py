@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""cProfile фазы собирается только в основном потоке; в потоках пула фаза замеряется по времени."""
+
+import threading
+
+from profiling import Profiler, _Phase
+
+
+def test_cprofile_phase_in_worker_threads():
+    profiler = Profiler()
+    profiler.enabled = True
+    profiler.cprofile_phase = "pack"
+
+    def _pack():
+        with _Phase(profiler, "pack", "Form.bin"):
+            sum(range(1000))
+
+    workers = [threading.Thread(target=_pack) for _ in range(4)]
+    with _Phase(profiler, "pack", None):
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    assert profiler.phases["pack"][1] == 5
+    assert profiler.cprofile_skipped == 4
+    assert profiler._cprofile is not None and profiler._cprofile_depth == 0
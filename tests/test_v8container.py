@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Встроенный разбор контейнера (v8container.py) на Form.bin, выгруженных платформой
+(tests/fixtures/form_bin/*.bin): неизмененный контейнер упаковывается в те же байты,
+а замененный текст модуля читается обратно из упакованного файла.
+"""
+
+import pytest
+
+from conftest import FIXTURES
+from v8container import V8Container, V8ModuleFile
+
+FORM_BINS = sorted((FIXTURES / "form_bin").glob("*.bin"))
+
+pytestmark = pytest.mark.skipif(not FORM_BINS, reason="нет Form.bin, выгруженных платформой, в tests/fixtures/form_bin")
+
+
+@pytest.mark.parametrize("path", FORM_BINS, ids=lambda path: path.name)
+def test_container_round_trip(path):
+    data = path.read_bytes()
+    assert V8Container.from_bytes(data).to_bytes() == data
+
+
+@pytest.mark.parametrize("path", FORM_BINS, ids=lambda path: path.name)
+def test_module_rewrite(path):
+    module_file = V8ModuleFile(path.read_bytes())
+    new_text = module_file.read_text() + "\r\n// Проверка записи модуля\r\n"
+    written = module_file.to_bytes(new_text)
+    assert V8ModuleFile(written).read_text() == new_text
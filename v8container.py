@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Native reader/writer for the 1C v8 container format (Form.bin, *.cf, *.epf)
+
+Layout (the 32-bit variant written by the platform and by v8unpack):
+  file header    : next_page_addr, page_size, storage_ver, reserved (4 x uint32 LE)
+  block header   : "\\r\\n" data_size " " page_size " " next_page_addr " \\r\\n" (8 hex digits each)
+  TOC document   : (header_addr, data_addr, 0x7fffffff) uint32 triples, one per element
+  element header : date_creation (8), date_modification (8), reserved (4), UTF-16LE name, 4 zero bytes
+  element data   : stored as is, raw-deflated, or itself a nested container
+
+A document occupies one or more pages chained by next_page_addr. to_bytes() reproduces
+v8unpack's -pack layout, so an unchanged container round-trips to the same bytes it would write.
+"""
+
+import struct
+import zlib
+from typing import List, Optional, Tuple
+
+V8_FF_SIGNATURE = 0x7FFFFFFF
+V8_DEFAULT_PAGE_SIZE = 512
+
+FILE_HEADER = struct.Struct('<IIII')
+ELEM_ADDR = struct.Struct('<III')
+BLOCK_HEADER_SIZE = 31
+ELEM_HEADER_BEGIN_SIZE = 20
+
+MODULE_ELEMENT_NAME = "module"
+
+# Способы хранения данных элемента
+STORED_RAW = "raw"
+STORED_DEFLATE = "deflate"
+STORED_CONTAINER = "container"
+
+
+def _read_block_header(data: bytes, offset: int) -> Tuple[int, int, int]:
+    """Parse a block header at offset into (data_size, page_size, next_page_addr)."""
+    raw = data[offset:offset + BLOCK_HEADER_SIZE]
+    if (len(raw) != BLOCK_HEADER_SIZE or raw[0:2] != b'\r\n' or raw[10:11] != b' '
+            or raw[19:20] != b' ' or raw[28:31] != b' \r\n'):
+        raise ValueError(f"Некорректный заголовок блока по смещению {offset}")
+    try:
+        return int(raw[2:10], 16), int(raw[11:19], 16), int(raw[20:28], 16)
+    except ValueError:
+        raise ValueError(f"Некорректный заголовок блока по смещению {offset}")
+
+
+def _block_header(data_size: int, page_size: int, next_page_addr: int = V8_FF_SIGNATURE) -> bytes:
+    return b'\r\n%08x %08x %08x \r\n' % (data_size, page_size, next_page_addr)
+
+
+def read_document(data: bytes, offset: int) -> bytes:
+    """Read a document starting at offset, following the page chain."""
+    doc_size, page_size, next_page_addr = _read_block_header(data, offset)
+    parts = []
+    remaining = doc_size
+    # Ограничиваем число страниц, чтобы зацикленная цепочка не повесила разбор
+    max_pages = len(data) // BLOCK_HEADER_SIZE + 1
+    while True:
+        start = offset + BLOCK_HEADER_SIZE
+        chunk = data[start:start + min(page_size, remaining)]
+        parts.append(chunk)
+        remaining -= len(chunk)
+        if remaining <= 0 or next_page_addr == V8_FF_SIGNATURE:
+            break
+        max_pages -= 1
+        if max_pages <= 0:
+            raise ValueError("Зацикленная цепочка страниц")
+        offset = next_page_addr
+        _, page_size, next_page_addr = _read_block_header(data, offset)
+    if remaining > 0:
+        raise ValueError(f"Документ по смещению {offset} обрезан")
+    return b''.join(parts)
+
+
+def _write_block(out: bytearray, block: bytes, page_size: int = V8_DEFAULT_PAGE_SIZE):
+    """Append a single-page block the way v8unpack's SaveBlockData does."""
+    page_size = max(page_size, len(block))
+    out += _block_header(len(block), page_size)
+    out += block
+    out += b'\0' * (page_size - len(block))
+
+
+def is_v8_container(data: bytes) -> bool:
+    """Check the file header signature and the first block header."""
+    if len(data) < FILE_HEADER.size + BLOCK_HEADER_SIZE:
+        return False
+    if FILE_HEADER.unpack_from(data)[0] != V8_FF_SIGNATURE:
+        return False
+    try:
+        _read_block_header(data, FILE_HEADER.size)
+    except ValueError:
+        return False
+    return True
+
+
+def inflate(data: bytes) -> Optional[bytes]:
+    """Raw-inflate data; None if it is not one complete deflate stream."""
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    try:
+        result = decompressor.decompress(data) + decompressor.flush()
+    except zlib.error:
+        return None
+    if not decompressor.eof or decompressor.unused_data:
+        return None
+    return result
+
+
+def deflate(data: bytes) -> bytes:
+    """Raw-deflate data (no zlib header), as the platform stores compressed elements."""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def unwrap_data(data: bytes) -> Tuple[str, bytes]:
+    """Detect how element data is stored and return (storage, payload)."""
+    if is_v8_container(data):
+        return STORED_CONTAINER, data
+    inflated = inflate(data)
+    if inflated is not None:
+        if is_v8_container(inflated):
+            return STORED_CONTAINER + "+" + STORED_DEFLATE, inflated
+        return STORED_DEFLATE, inflated
+    return STORED_RAW, data
+
+
+def wrap_data(storage: str, payload: bytes) -> bytes:
+    """Inverse of unwrap_data."""
+    if storage.endswith(STORED_DEFLATE):
+        return deflate(payload)
+    return payload
+
+
+class V8Element:
+    """Element of a container: raw header bytes and data exactly as stored."""
+
+    __slots__ = ('name', 'header', 'data')
+
+    def __init__(self, name: str, header: bytes, data: bytes):
+        self.name = name
+        self.header = header
+        self.data = data
+
+    @staticmethod
+    def parse_name(header: bytes) -> str:
+        name = header[ELEM_HEADER_BEGIN_SIZE:].decode('utf-16-le', errors='ignore')
+        return name.split('\0', 1)[0]
+
+
+class V8Container:
+    """In-memory container: file header plus ordered list of elements."""
+
+    def __init__(self, file_header: bytes, elements: List[V8Element]):
+        self.file_header = file_header
+        self.elements = elements
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'V8Container':
+        if not is_v8_container(data):
+            raise ValueError("Данные не являются контейнером 1С v8")
+        file_header = bytes(data[:FILE_HEADER.size])
+        toc = read_document(data, FILE_HEADER.size)
+        elements = []
+        for i in range(len(toc) // ELEM_ADDR.size):
+            header_addr, data_addr, _ = ELEM_ADDR.unpack_from(toc, i * ELEM_ADDR.size)
+            header = read_document(data, header_addr)
+            elem_data = read_document(data, data_addr) if data_addr != V8_FF_SIGNATURE else b''
+            elements.append(V8Element(V8Element.parse_name(header), header, elem_data))
+        return cls(file_header, elements)
+
+    def to_bytes(self) -> bytes:
+        """Serialize with v8unpack's PackFromFolder layout."""
+        _, page_size, storage_ver, reserved = FILE_HEADER.unpack(self.file_header)
+        toc_size = ELEM_ADDR.size * len(self.elements)
+
+        cur_block_addr = FILE_HEADER.size + BLOCK_HEADER_SIZE + max(toc_size, V8_DEFAULT_PAGE_SIZE)
+        toc = bytearray()
+        for element in self.elements:
+            header_addr = cur_block_addr
+            cur_block_addr += BLOCK_HEADER_SIZE + len(element.header)
+            data_addr = cur_block_addr
+            cur_block_addr += BLOCK_HEADER_SIZE + max(len(element.data), V8_DEFAULT_PAGE_SIZE)
+            toc += ELEM_ADDR.pack(header_addr, data_addr, V8_FF_SIGNATURE)
+
+        out = bytearray(FILE_HEADER.pack(V8_FF_SIGNATURE, page_size, storage_ver, reserved))
+        _write_block(out, bytes(toc))
+        for element in self.elements:
+            _write_block(out, element.header, len(element.header))
+            _write_block(out, element.data)
+        return bytes(out)
+
+    def find_paths(self, name: str, _prefix: Tuple[int, ...] = ()) -> List[Tuple[int, ...]]:
+        """Index paths of all non-container elements called name, nested containers included."""
+        paths = []
+        for idx, element in enumerate(self.elements):
+            storage, payload = unwrap_data(element.data)
+            if storage.startswith(STORED_CONTAINER):
+                paths.extend(V8Container.from_bytes(payload).find_paths(name, _prefix + (idx,)))
+            elif element.name.lower() == name.lower():
+                paths.append(_prefix + (idx,))
+        return paths
+
+    def get_payload(self, path: Tuple[int, ...]) -> bytes:
+        element = self.elements[path[0]]
+        _, payload = unwrap_data(element.data)
+        if len(path) == 1:
+            return payload
+        return V8Container.from_bytes(payload).get_payload(path[1:])
+
+    def set_payload(self, path: Tuple[int, ...], new_payload: bytes):
+        """Replace payload at path, keeping how each level was stored (raw/deflate/nested)."""
+        element = self.elements[path[0]]
+        storage, payload = unwrap_data(element.data)
+        if len(path) > 1:
+            nested = V8Container.from_bytes(payload)
+            nested.set_payload(path[1:], new_payload)
+            new_payload = nested.to_bytes()
+        element.data = wrap_data(storage, new_payload)
+
+
+class V8ModuleFile:
+    """Module text of a form container, located once and rewritten in memory."""
+
+    def __init__(self, data: bytes, element_name: str = MODULE_ELEMENT_NAME):
+        self.container = V8Container.from_bytes(data)
+        paths = self.container.find_paths(element_name)
+        if len(paths) > 1:
+            # Как и при распаковке v8unpack, предпочитаем src/module
+            preferred = [p for p in paths if self._names(p) == ["src", element_name]]
+            if len(preferred) != 1:
+                raise ValueError(f"Найдено несколько элементов {element_name}. Уточните выбор.")
+            paths = preferred
+        if not paths:
+            raise ValueError(f"Не удалось найти элемент {element_name} в контейнере.")
+        self.path = paths[0]
+
+    def _names(self, path: Tuple[int, ...]) -> List[str]:
+        names = []
+        container = self.container
+        for depth, idx in enumerate(path):
+            element = container.elements[idx]
+            names.append(element.name.lower())
+            if depth + 1 < len(path):
+                container = V8Container.from_bytes(unwrap_data(element.data)[1])
+        return names
+
+    def read_text(self, encoding: str = 'utf-8') -> str:
+        return self.container.get_payload(self.path).decode(encoding, errors='ignore')
+
+    def to_bytes(self, text: str, encoding: str = 'utf-8') -> bytes:
+        payload = text.encode(encoding)
+        self.container.set_payload(self.path, payload)
+        data = self.container.to_bytes()
+        # Способ хранения элементов определяется по содержимому (unwrap_data): перечитываем
+        # результат, чтобы не записать контейнер, из которого модуль читается иначе
+        written = V8Container.from_bytes(data)
+        if written.find_paths(MODULE_ELEMENT_NAME) != self.container.find_paths(MODULE_ELEMENT_NAME) \
+                or written.get_payload(self.path) != payload:
+            raise ValueError("Текст модуля в упакованном контейнере не совпадает с записанным")
+        return data